@@ -12,9 +12,39 @@ Copyright (c) 2009-2024 Benoît Chesneau <benoitc@gunicorn.org>
 Copyright (c) 2009-2015 Paul J. Davis <paul.joseph.davis@gmail.com>
 """
 
+from .binary import BinarySink
 from .config import SpewConfig
-from .spewer import SpewContext, spew, unspew
+from .jsonl import JsonLinesSink
+from .middleware import ASGIMiddleware, WSGIMiddleware
+from .recorder import FlightRecorder
+from .render import ValueRenderer
+from .sinks import AsyncSink, FileSink, MemorySink, NullSink, Sink, StreamSink
+from .spewer import SpewContext, spew, spew_function, unspew
+from .tasks import trace_task
+from .toggle import install_signal_toggle, load_config
 from .trace import TraceHook
 
 __version__ = "0.1.0"
-__all__ = ["SpewConfig", "SpewContext", "TraceHook", "spew", "unspew"]
+__all__ = [
+    "ASGIMiddleware",
+    "AsyncSink",
+    "BinarySink",
+    "FileSink",
+    "FlightRecorder",
+    "JsonLinesSink",
+    "MemorySink",
+    "NullSink",
+    "Sink",
+    "SpewConfig",
+    "SpewContext",
+    "StreamSink",
+    "TraceHook",
+    "ValueRenderer",
+    "WSGIMiddleware",
+    "install_signal_toggle",
+    "load_config",
+    "spew",
+    "spew_function",
+    "trace_task",
+    "unspew",
+]
@@ -0,0 +1,7 @@
+"""Allow running spewer with ``python -m spewer``."""
+
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,386 @@
+"""Compact binary trace format for spewer debugging library.
+
+A binary trace starts with an 8-byte header and is followed by records,
+each introduced by a one-byte tag:
+
+- ``STRING``: ``<BII`` tag, string id, byte length, then UTF-8 bytes.
+  Module names, filenames, function names and source lines are written
+  once and referred to by id afterwards.
+- ``CODE``: ``<BIIII`` tag, code id, module, filename and function
+  string ids.
+- ``THREAD``: ``<BIQI`` tag, thread index, thread ident, name string id.
+- ``TEXT``: ``<BI`` tag, byte length, then preformatted UTF-8 output.
+- ``PROCESS``: ``<BI`` tag and id of the process writing the trace,
+  right after the header.
+- events: ``<BIIIIQ`` tag, code id, line number, source line string id,
+  thread index and ``time.time_ns()`` timestamp. The tag is
+  ``EVENT_FLAG | kind``. With ``LABEL_FLAG`` set it is followed by the
+  ``<I`` string id of the event's label; with ``PREFIX_FLAG`` set, then by
+  the ``<I`` string id of its line prefix; with ``PAYLOAD_FLAG`` set, then
+  by ``<I`` length and the UTF-8 rendering of the event's values.
+
+Id 0 means "none" for both strings and code objects.
+"""
+
+from __future__ import annotations
+
+import heapq
+import os
+import struct
+import threading
+import time
+from typing import IO, TYPE_CHECKING, NamedTuple, Optional, Union
+
+from .events import (
+    C_CALL,
+    CALL,
+    EXCEPTION,
+    LINE,
+    RETURN,
+    format_parts,
+    label_lines,
+    render_payload,
+)
+from .sinks import (
+    DEFAULT_BUFFER_SIZE,
+    PID_PLACEHOLDER,
+    Sink,
+    _live_sinks,
+    pid_path,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+MAGIC = b"SPEWBIN"
+VERSION = 1
+HEADER = MAGIC + bytes([VERSION])
+
+TAG_STRING = 1
+TAG_CODE = 2
+TAG_THREAD = 3
+TAG_TEXT = 4
+TAG_PROCESS = 5
+KIND_MASK = 0x0F
+PREFIX_FLAG = 0x10
+LABEL_FLAG = 0x20
+EVENT_FLAG = 0x40
+PAYLOAD_FLAG = 0x80
+
+_KINDS = (LINE, CALL, C_CALL, RETURN, EXCEPTION)
+_KIND_CODES = {kind: code for code, kind in enumerate(_KINDS)}
+
+_STRING = struct.Struct("<BII")
+_CODE = struct.Struct("<BIIII")
+_THREAD = struct.Struct("<BIQI")
+_TEXT = struct.Struct("<BI")
+_PROCESS = struct.Struct("<BI")
+_EVENT = struct.Struct("<BIIIIQ")
+_LENGTH = struct.Struct("<I")
+
+
+class DecodedEvent(NamedTuple):
+    """An event read back from a binary trace."""
+
+    kind: str
+    module: str
+    filename: str
+    func_name: str
+    lineno: int
+    text: Optional[str]
+    thread_ident: int
+    thread_name: str
+    timestamp: int
+    detail: Optional[str]
+    label: Optional[str] = None
+    pid: Optional[int] = None
+    prefix: Optional[str] = None
+
+    def format(self) -> str:
+        """Format the event in spewer's text format."""
+        output = format_parts(
+            self.kind,
+            self.module,
+            self.func_name,
+            self.lineno,
+            self.text,
+            self.detail,
+        )
+        return label_lines(output, self.label, self.prefix)
+
+
+class BinarySink(Sink):
+    """Write trace events to a file in spewer's binary format.
+
+    Strings are interned, so each event costs a fixed-size record plus the
+    rendered values when ``show_values`` is on. Decode the file with
+    ``spewer decode`` or :func:`decode`.
+
+    If ``path`` contains ``{pid}``, it is replaced by the process id, and a
+    forked child process starts a trace file of its own; ``spewer merge``
+    combines them. Without ``{pid}`` a forked child stops writing, since
+    two processes cannot share one binary trace.
+
+    Every record carries its thread and a timestamp, so when tracing all
+    threads the events are written as they happen and ``spewer merge``
+    can order them.
+    """
+
+    records_threads = True
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+    ):
+        """Open ``path`` and write the file header."""
+        if not isinstance(buffer_size, int) or buffer_size < 0:
+            msg = "buffer_size must be a non-negative integer"
+            raise ValueError(msg)
+        self.template = str(path)
+        self.buffer_size = buffer_size
+        self._open()
+        _live_sinks.add(self)
+
+    def _open(self) -> None:
+        """Start a new trace file for the current process."""
+        self.path = pid_path(self.template)
+        self._file: Optional[IO[bytes]] = self.path.open("wb")
+        self._buffer = bytearray(HEADER) + _PROCESS.pack(TAG_PROCESS, os.getpid())
+        self._strings: dict[str, int] = {}
+        self._codes: dict[object, int] = {}
+        self._threads: dict[int, int] = {}
+        # Guards the buffer, which traced threads append to concurrently
+        self._lock = threading.Lock()
+
+    def _string_id(self, text: str) -> int:
+        string_id = self._strings.get(text)
+        if string_id is None:
+            with self._lock:
+                string_id = self._strings.get(text)
+                if string_id is None:
+                    string_id = len(self._strings) + 1
+                    data = text.encode("utf-8", "surrogatepass")
+                    self._buffer += _STRING.pack(TAG_STRING, string_id, len(data))
+                    self._buffer += data
+                    self._strings[text] = string_id
+        return string_id
+
+    def _code_id(self, info: object) -> int:
+        code_id = self._codes.get(info)
+        if code_id is None:
+            ids = (
+                self._string_id(info.name),
+                self._string_id(info.filename),
+                self._string_id(info.func_name),
+            )
+            with self._lock:
+                code_id = self._codes.get(info)
+                if code_id is None:
+                    code_id = len(self._codes) + 1
+                    self._buffer += _CODE.pack(TAG_CODE, code_id, *ids)
+                    self._codes[info] = code_id
+        return code_id
+
+    def _thread_index(self) -> int:
+        ident = threading.get_ident()
+        index = self._threads.get(ident)
+        if index is None:
+            name_id = self._string_id(threading.current_thread().name)
+            with self._lock:
+                index = self._threads.get(ident)
+                if index is None:
+                    index = len(self._threads) + 1
+                    self._buffer += _THREAD.pack(TAG_THREAD, index, ident, name_id)
+                    self._threads[ident] = index
+        return index
+
+    def submit(self, event: tuple) -> None:
+        """Encode a raw event as a fixed-size record."""
+        kind, info, lineno, text, payload = event[:5]
+        if kind == C_CALL:
+            module, func_name = payload
+            code_id = 0
+            text_id = self._string_id(f"{module}: {func_name}()")
+        else:
+            code_id = self._code_id(info)
+            text_id = 0 if text is None else self._string_id(text)
+
+        flags = EVENT_FLAG | _KIND_CODES[kind]
+        extra = b""
+        if len(event) > 5 and event[5] is not None:
+            flags |= LABEL_FLAG
+            extra = _LENGTH.pack(self._string_id(event[5]))
+        if len(event) > 6 and event[6]:
+            flags |= PREFIX_FLAG
+            extra += _LENGTH.pack(self._string_id(event[6]))
+        detail = render_payload(kind, payload, self.renderer)
+        if detail is not None:
+            flags |= PAYLOAD_FLAG
+            data = detail.encode("utf-8", "surrogatepass")
+            extra += _LENGTH.pack(len(data)) + data
+        thread_index = self._thread_index()
+        self._append(
+            _EVENT.pack(
+                flags,
+                code_id,
+                lineno,
+                text_id,
+                thread_index,
+                time.time_ns(),
+            )
+            + extra
+        )
+
+    def write(self, text: str) -> None:
+        """Store preformatted output verbatim."""
+        data = text.encode("utf-8", "surrogatepass")
+        self._append(_TEXT.pack(TAG_TEXT, len(data)) + data)
+
+    def _append(self, record: bytes) -> None:
+        with self._lock:
+            self._buffer += record
+            full = len(self._buffer) >= self.buffer_size
+        if full:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write buffered records to the file."""
+        with self._lock:
+            if self._file is None:
+                return
+            buffer, self._buffer = self._buffer, bytearray()
+            if buffer:
+                self._file.write(buffer)
+            self._file.flush()
+
+    def close(self) -> None:
+        """Flush and close the file."""
+        if self._file is None:
+            return
+        self.flush()
+        self._file.close()
+        self._file = None
+        _live_sinks.discard(self)
+
+    def _after_fork(self) -> None:
+        if self._file is None:
+            return
+        # Another thread may have held the lock when the process forked
+        self._lock = threading.Lock()
+        # Everything was flushed before the fork, so this loses nothing
+        self._file.close()
+        if PID_PLACEHOLDER in self.template:
+            self._open()
+        else:
+            self._file = None
+            _live_sinks.discard(self)
+
+
+def _read_exact(stream: IO[bytes], size: int) -> bytes:
+    data = stream.read(size)
+    if len(data) != size:
+        msg = "truncated spewer binary trace"
+        raise ValueError(msg)
+    return data
+
+
+def _read_string_ref(stream: IO[bytes], strings: dict[int, str]) -> str:
+    (string_id,) = _LENGTH.unpack(_read_exact(stream, _LENGTH.size))
+    return strings[string_id]
+
+
+def read_events(stream: IO[bytes]) -> Iterator[Union[DecodedEvent, str]]:
+    """Read a binary trace, yielding events and preformatted text chunks."""
+    if stream.read(len(HEADER)) != HEADER:
+        msg = "not a spewer binary trace"
+        raise ValueError(msg)
+
+    pid = None
+    strings: dict[int, str] = {0: ""}
+    codes: dict[int, tuple[str, str, str]] = {0: ("", "", "")}
+    threads: dict[int, tuple[int, str]] = {}
+
+    while True:
+        tag_byte = stream.read(1)
+        if not tag_byte:
+            return
+        tag = tag_byte[0]
+
+        if tag & EVENT_FLAG:
+            fields = _EVENT.unpack(tag_byte + _read_exact(stream, _EVENT.size - 1))
+            _, code_id, lineno, text_id, thread_index, timestamp = fields
+            label = _read_string_ref(stream, strings) if tag & LABEL_FLAG else None
+            prefix = _read_string_ref(stream, strings) if tag & PREFIX_FLAG else None
+            detail = None
+            if tag & PAYLOAD_FLAG:
+                (length,) = _LENGTH.unpack(_read_exact(stream, _LENGTH.size))
+                detail = _read_exact(stream, length).decode("utf-8", "surrogatepass")
+            module, filename, func_name = codes[code_id]
+            thread_ident, thread_name = threads[thread_index]
+            yield DecodedEvent(
+                _KINDS[tag & KIND_MASK],
+                module,
+                filename,
+                func_name,
+                lineno,
+                strings[text_id] if text_id else None,
+                thread_ident,
+                thread_name,
+                timestamp,
+                detail,
+                label,
+                pid,
+                prefix,
+            )
+        elif tag == TAG_STRING:
+            rest = _read_exact(stream, _STRING.size - 1)
+            _, string_id, length = _STRING.unpack(tag_byte + rest)
+            data = _read_exact(stream, length)
+            strings[string_id] = data.decode("utf-8", "surrogatepass")
+        elif tag == TAG_CODE:
+            rest = _read_exact(stream, _CODE.size - 1)
+            _, code_id, module, filename, func_name = _CODE.unpack(tag_byte + rest)
+            codes[code_id] = (strings[module], strings[filename], strings[func_name])
+        elif tag == TAG_THREAD:
+            rest = _read_exact(stream, _THREAD.size - 1)
+            _, index, ident, name = _THREAD.unpack(tag_byte + rest)
+            threads[index] = (ident, strings[name])
+        elif tag == TAG_PROCESS:
+            rest = _read_exact(stream, _PROCESS.size - 1)
+            _, pid = _PROCESS.unpack(tag_byte + rest)
+        elif tag == TAG_TEXT:
+            (length,) = _LENGTH.unpack(_read_exact(stream, _LENGTH.size))
+            yield _read_exact(stream, length).decode("utf-8", "surrogatepass")
+        else:
+            msg = f"unknown record tag {tag} in spewer binary trace"
+            raise ValueError(msg)
+
+
+def decode(stream: IO[bytes]) -> Iterator[str]:
+    """Decode a binary trace into spewer's text format, chunk by chunk."""
+    for item in read_events(stream):
+        yield item if isinstance(item, str) else item.format()
+
+
+def merge(streams: list[IO[bytes]]) -> Iterator[str]:
+    """Merge the binary traces of several processes by timestamp.
+
+    Events are decoded into spewer's text format, prefixed with the id of
+    the process that wrote them.
+    """
+
+    def timed(stream: IO[bytes]) -> Iterator[tuple[int, str]]:
+        timestamp = 0
+        for item in read_events(stream):
+            if isinstance(item, str):
+                # Preformatted text stays after the event before it
+                yield timestamp, item
+                continue
+            timestamp = item.timestamp
+            text = item.format()
+            yield timestamp, text if item.pid is None else f"[{item.pid}] {text}"
+
+    for _, text in heapq.merge(*map(timed, streams), key=lambda entry: entry[0]):
+        yield text
@@ -0,0 +1,122 @@
+"""Per-code-object metadata cache for spewer trace hooks."""
+
+from __future__ import annotations
+
+import inspect
+import linecache
+from collections import OrderedDict
+from typing import Any, Callable, NamedTuple, Optional
+
+
+class CacheInfo(NamedTuple):
+    """Cache statistics, in the style of ``functools.lru_cache``."""
+
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class CodeInfo:
+    """Metadata resolved once per code object."""
+
+    __slots__ = ("filename", "first_line", "func_name", "lines", "name", "traced")
+
+    def __init__(  # noqa: PLR0913, PLR0917
+        self,
+        name: str,
+        filename: str,
+        traced: bool,
+        lines: Optional[list[str]],
+        first_line: int = 1,
+        func_name: str = "<unknown>",
+    ):
+        self.name = name
+        self.filename = filename
+        self.traced = traced
+        self.lines = lines
+        self.first_line = first_line
+        self.func_name = func_name
+
+    def line(self, lineno: int) -> Optional[str]:
+        """Return the source text of a line, or None if source is unavailable."""
+        if self.lines is None:
+            return None
+        index = lineno - self.first_line
+        if 0 <= index < len(self.lines):
+            return self.lines[index]
+        return ""
+
+
+class CodeInfoCache:
+    """Bounded cache of CodeInfo keyed by code object.
+
+    Looking up a code object that has been seen before costs a dict probe
+    and moving the entry to the end. When the cache is full the least
+    recently used entry is evicted, so code objects created dynamically
+    cannot grow it without bound, nor push out the code that runs most.
+    """
+
+    def __init__(self, verdict: Callable[[str, str], bool], maxsize: int = 4096):
+        """Initialize the cache with a ``(module, filename) -> traced`` verdict."""
+        self._verdict = verdict
+        self._entries: OrderedDict[Any, CodeInfo] = OrderedDict()
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, frame: Any) -> CodeInfo:
+        """Return the metadata for the code object executing in a frame."""
+        code = frame.f_code
+        entries = self._entries
+        info = entries.get(code)
+        if info is not None:
+            self.hits += 1
+            # Not contextlib.suppress(), which would cost a call on every hit
+            try:  # noqa: SIM105
+                entries.move_to_end(code)
+            except KeyError:
+                # Evicted by another traced thread in the meantime
+                pass
+            return info
+
+        self.misses += 1
+        info = self._resolve(frame)
+        if entries and len(entries) >= self.maxsize:
+            entries.popitem(last=False)
+        entries[code] = info
+        return info
+
+    def _resolve(self, frame: Any) -> CodeInfo:
+        """Build the metadata for a frame's code object."""
+        func_name = frame.f_code.co_name
+
+        # Get filename and handle compiled files
+        if "__file__" in frame.f_globals:
+            filename = frame.f_globals["__file__"]
+            if filename.endswith((".pyc", ".pyo")):
+                filename = filename[:-1]
+            name = frame.f_globals.get("__name__", "[unknown]")
+            lines = linecache.getlines(filename)
+            traced = self._verdict(name, filename)
+            return CodeInfo(name, filename, traced, lines, func_name=func_name)
+
+        name = "[unknown]"
+        filename = "[unknown]"
+        traced = self._verdict(name, filename)
+        try:
+            lines, start = inspect.getsourcelines(frame)
+        except (OSError, TypeError):
+            return CodeInfo(name, filename, traced, None, func_name=func_name)
+        # Module-level source starts at 0, function source at its first line
+        return CodeInfo(name, filename, traced, lines, start or 1, func_name)
+
+    def clear(self) -> None:
+        """Drop all entries and reset the counters."""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def info(self) -> CacheInfo:
+        """Return hit and miss counters along with the cache size."""
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
@@ -0,0 +1,47 @@
+"""Chaining of spewer trace hooks to previously installed trace functions."""
+
+from __future__ import annotations
+
+from typing import Any, Optional
+
+
+class ChainedTracer:
+    """Trace function that passes every event to two trace functions.
+
+    ``first`` is spewer's hook and ``second`` the trace or profile function
+    it was installed over, such as coverage.py or a debugger. Each returns
+    its own local trace function for a frame. While both return the
+    functions they were called as, as spewer's hook and most tracers do,
+    the chain is its own local trace function and an event costs two
+    calls. A frame where only one of them keeps tracing gets that one's
+    local function directly, and only frames where they differ get a new
+    chain of their local functions.
+    """
+
+    __slots__ = ("first", "second")
+
+    def __init__(self, first: Optional[Any], second: Optional[Any]):
+        """Initialize the chain; either function may be None."""
+        self.first = first
+        self.second = second
+
+    def __call__(self, frame: Any, event: str, arg: Any) -> Any:
+        """Pass the event to both functions and combine their local tracers."""
+        first, second = self.first, self.second
+        if first is not None:
+            if second is None:
+                return first(frame, event, arg)
+            lines = frame.f_trace_lines
+            first = first(frame, event, arg)
+            # Spewer switches off line events of frames it only watches for
+            # their return, which the second function may still need
+            frame.f_trace_lines = lines
+        if second is not None:
+            second = second(frame, event, arg)
+        if first is self.first and second is self.second:
+            return self
+        if first is None:
+            return second
+        if second is None:
+            return first
+        return ChainedTracer(first, second)
@@ -0,0 +1,83 @@
+"""Command line interface for spewer debugging library."""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import sys
+from pathlib import Path
+from typing import Optional
+
+from .binary import decode, merge
+from .recorder import read_recording
+
+
+def _decode(args: argparse.Namespace) -> int:
+    with Path(args.trace).open("rb") as stream:
+        if args.output is None:
+            for chunk in decode(stream):
+                sys.stdout.write(chunk)
+            return 0
+        with Path(args.output).open("w", encoding="utf-8") as out:
+            for chunk in decode(stream):
+                out.write(chunk)
+    return 0
+
+
+def _merge(args: argparse.Namespace) -> int:
+    with contextlib.ExitStack() as stack:
+        streams = [stack.enter_context(Path(trace).open("rb")) for trace in args.traces]
+        out = (
+            sys.stdout
+            if args.output is None
+            else stack.enter_context(Path(args.output).open("w", encoding="utf-8"))
+        )
+        for chunk in merge(streams):
+            out.write(chunk)
+    return 0
+
+
+def _dump(args: argparse.Namespace) -> int:
+    sys.stdout.write("".join(read_recording(args.recording)))
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser for the ``spewer`` command."""
+    parser = argparse.ArgumentParser(prog="spewer", description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    decode_parser = commands.add_parser(
+        "decode", help="print a binary trace in spewer's text format"
+    )
+    decode_parser.add_argument("trace", help="binary trace written by BinarySink")
+    decode_parser.add_argument(
+        "-o", "--output", help="write to this file instead of stdout"
+    )
+    decode_parser.set_defaults(handler=_decode)
+
+    merge_parser = commands.add_parser(
+        "merge", help="interleave the binary traces of several processes by time"
+    )
+    merge_parser.add_argument("traces", nargs="+", help="binary traces to merge")
+    merge_parser.add_argument(
+        "-o", "--output", help="write to this file instead of stdout"
+    )
+    merge_parser.set_defaults(handler=_merge)
+
+    dump_parser = commands.add_parser(
+        "dump", help="print a memory-mapped flight recording, oldest first"
+    )
+    dump_parser.add_argument("recording", help="file given to FlightRecorder(path=)")
+    dump_parser.set_defaults(handler=_dump)
+    return parser
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Run the ``spewer`` command."""
+    args = build_parser().parse_args(argv)
+    try:
+        return args.handler(args)
+    except (OSError, ValueError) as exc:
+        print(f"spewer: {exc}", file=sys.stderr)
+        return 1
@@ -3,7 +3,17 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Callable, Optional
+
+from .sinks import Sink
+from .triggers import parse_trigger
+
+BACKENDS = ("auto", "settrace", "monitoring")
+VALUES_MODES = ("all", "diff")
+
+
+def _is_number(value: object) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
 
 
 @dataclass
@@ -15,6 +25,25 @@ class SpewConfig:
     functions_only: bool = False
     trace_returns: bool = False
     trace_exceptions: bool = False
+    exclude_names: Optional[list[str]] = None
+    backend: str = "auto"
+    sink: Optional[Sink] = None
+    sample_every: int = 1
+    sample_rate: float = 1.0
+    rate_limit: Optional[float] = None
+    code_rate_limit: Optional[float] = None
+    summary_interval: float = 1.0
+    all_threads: bool = False
+    task_scoped: bool = False
+    renderer: Optional[Callable[[Any], str]] = None
+    values_mode: str = "all"
+    indent: str = ""
+    max_depth: Optional[int] = None
+    stats: bool = False
+    heatmap: bool = False
+    triggers: Optional[list[str]] = None
+    trigger_limit: Optional[int] = None
+    chain: bool = False
 
     def __post_init__(self):
         """Validate configuration after initialization."""
@@ -22,6 +51,10 @@ class SpewConfig:
             msg = "trace_names must be a list or None"
             raise TypeError(msg)
 
+        if self.exclude_names is not None and not isinstance(self.exclude_names, list):
+            msg = "exclude_names must be a list or None"
+            raise TypeError(msg)
+
         if not isinstance(self.show_values, bool):
             msg = "show_values must be a boolean"
             raise TypeError(msg)
@@ -37,3 +70,112 @@ class SpewConfig:
         if not isinstance(self.trace_exceptions, bool):
             msg = "trace_exceptions must be a boolean"
             raise TypeError(msg)
+
+        for name in (
+            "all_threads",
+            "task_scoped",
+            "stats",
+            "heatmap",
+            "chain",
+        ):
+            if not isinstance(getattr(self, name), bool):
+                msg = f"{name} must be a boolean"
+                raise TypeError(msg)
+
+        if self.backend not in BACKENDS:
+            msg = f"backend must be one of {', '.join(BACKENDS)}"
+            raise ValueError(msg)
+
+        if self.values_mode not in VALUES_MODES:
+            msg = f"values_mode must be one of {', '.join(VALUES_MODES)}"
+            raise ValueError(msg)
+
+        if self.sink is not None and not isinstance(self.sink, Sink):
+            msg = "sink must be a Sink instance or None"
+            raise TypeError(msg)
+
+        if self.renderer is not None and not callable(self.renderer):
+            msg = "renderer must be callable or None"
+            raise TypeError(msg)
+
+        self._validate_sampling()
+        self._validate_rate_limits()
+        self._validate_depth()
+        self._validate_triggers()
+
+    def _validate_sampling(self):
+        """Validate the sampling options."""
+        if not isinstance(self.sample_every, int) or isinstance(
+            self.sample_every, bool
+        ):
+            msg = "sample_every must be an integer"
+            raise TypeError(msg)
+
+        if self.sample_every < 1:
+            msg = "sample_every must be at least 1"
+            raise ValueError(msg)
+
+        if not _is_number(self.sample_rate):
+            msg = "sample_rate must be a number"
+            raise TypeError(msg)
+
+        if not 0.0 <= self.sample_rate <= 1.0:
+            msg = "sample_rate must be between 0 and 1"
+            raise ValueError(msg)
+
+    def _validate_rate_limits(self):
+        """Validate the rate limiting options."""
+        for name in ("rate_limit", "code_rate_limit", "summary_interval"):
+            value = getattr(self, name)
+            if value is None and name != "summary_interval":
+                continue
+            if not _is_number(value):
+                msg = f"{name} must be a number"
+                raise TypeError(msg)
+            if value <= 0:
+                msg = f"{name} must be positive"
+                raise ValueError(msg)
+
+    def _validate_depth(self):
+        """Validate the call depth options."""
+        if not isinstance(self.indent, str):
+            msg = "indent must be a string"
+            raise TypeError(msg)
+
+        if self.max_depth is None:
+            return
+        if not isinstance(self.max_depth, int) or isinstance(self.max_depth, bool):
+            msg = "max_depth must be an integer or None"
+            raise TypeError(msg)
+        if self.max_depth < 1:
+            msg = "max_depth must be at least 1"
+            raise ValueError(msg)
+
+    def _validate_triggers(self):
+        """Validate the trigger options."""
+        if self.triggers is not None:
+            if not isinstance(self.triggers, list):
+                msg = "triggers must be a list or None"
+                raise TypeError(msg)
+            for spec in self.triggers:
+                if not isinstance(spec, str):
+                    msg = "triggers must be module:qualname strings"
+                    raise TypeError(msg)
+                module, qualname = parse_trigger(spec)
+                if not module or not qualname:
+                    msg = f"trigger {spec!r} is not of the form module:qualname"
+                    raise ValueError(msg)
+
+        if self.trigger_limit is None:
+            return
+        if not isinstance(self.trigger_limit, int) or isinstance(
+            self.trigger_limit, bool
+        ):
+            msg = "trigger_limit must be an integer or None"
+            raise TypeError(msg)
+        if self.trigger_limit < 1:
+            msg = "trigger_limit must be at least 1"
+            raise ValueError(msg)
+        if self.triggers is None:
+            msg = "trigger_limit requires triggers"
+            raise ValueError(msg)
@@ -0,0 +1,62 @@
+"""Call depth tracking for spewer trace hooks."""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Optional
+
+
+class _DepthState(threading.local):
+    depth: int = 0
+    # Outermost frame beyond the depth limit running on this thread
+    cut: Any = None
+
+
+class CallDepth:
+    """Count the traced calls running on each thread.
+
+    The count goes up when a traced frame starts and down when it returns,
+    so it never walks ``f_back``. Frames that were already running when
+    tracing started are at depth 0.
+
+    With ``max_depth``, a call that would go deeper than ``max_depth`` is
+    cut off: :meth:`enter` refuses it and every call it makes, until it
+    returns.
+    """
+
+    def __init__(self, max_depth: Optional[int] = None):
+        """Initialize the counters."""
+        self.max_depth = max_depth
+        self._state = _DepthState()
+
+    @property
+    def depth(self) -> int:
+        """Number of traced calls running on this thread."""
+        return self._state.depth
+
+    @property
+    def cut_active(self) -> bool:
+        """Whether a cut-off call is running on this thread."""
+        return self._state.cut is not None
+
+    def enter(self, frame: Any) -> bool:
+        """Record a traced call and return whether it is within the limit.
+
+        Must not be called while :attr:`cut_active`.
+        """
+        state = self._state
+        if self.max_depth is not None and state.depth >= self.max_depth:
+            state.cut = frame
+            return False
+        state.depth += 1
+        return True
+
+    def leave(self, frame: Any) -> None:
+        """Record that a frame returned."""
+        state = self._state
+        if state.cut is not None:
+            if frame is state.cut:
+                state.cut = None
+        elif state.depth > 0:
+            # Frames from before tracing started may report their return
+            state.depth -= 1
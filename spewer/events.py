@@ -0,0 +1,145 @@
+"""Raw trace events and their text formatting.
+
+TraceHook records each event as a small tuple holding references to the
+objects involved; turning it into text (including every ``repr()``) is
+left to the sink, which may do it on another thread. Sinks render values
+with their ``renderer``, a :class:`~spewer.render.ValueRenderer` unless
+configured otherwise.
+
+An event is ``(kind, info, lineno, text, payload)``:
+
+- ``LINE``: ``text`` is the source line, ``payload`` the ``(name, value)``
+  pairs used on it, or None without ``show_values``.
+- ``CALL``: ``payload`` holds the ``(name, value)`` arguments, or None.
+- ``C_CALL``: ``info`` is None and ``payload`` is ``(module, func_name)``.
+- ``RETURN``: ``payload`` is ``(value,)``, or None without ``show_values``.
+- ``EXCEPTION``: ``payload`` is ``(exc_type, exc_value)``, or None.
+
+For ``RETURN`` and ``EXCEPTION``, ``text`` is the source line, or None when
+the event is reported against the function name instead.
+
+An event may carry a sixth element, a label such as the name of the asyncio
+task that produced it, which is shown in brackets before the event, and a
+seventh, a prefix such as the indentation for its call depth, which starts
+each of its lines. The label may be None when there is a prefix.
+"""
+
+from __future__ import annotations
+
+import contextlib
+from typing import Any, Callable, Optional
+
+LINE = "line"
+CALL = "call"
+C_CALL = "c_call"
+RETURN = "return"
+EXCEPTION = "exception"
+
+
+def format_args(
+    args: Optional[tuple[tuple[str, Any], ...]],
+    render: Callable[[Any], str] = repr,
+) -> str:
+    """Format function arguments as an indented line, or return ''."""
+    if not args:
+        return ""
+    parts = []
+    for key, value in args:
+        try:
+            parts.append(f"{key}={render(value)}")
+        except (AttributeError, TypeError, RecursionError):
+            parts.append(f"{key}=<{type(value).__name__} object>")
+    return f"\targs: {', '.join(parts)}\n"
+
+
+def format_values(
+    values: Optional[tuple[tuple[str, Any], ...]],
+    render: Callable[[Any], str] = repr,
+) -> str:
+    """Format variable values as an indented line, or return ''."""
+    if not values:
+        return ""
+    details = []
+    for name, value in values:
+        # TODO: explore how to handle this better
+        with contextlib.suppress(AttributeError, TypeError, RecursionError):
+            details.append(f"{name}={render(value)}")
+    if details:
+        return f"\t{' '.join(details)}\n"
+    return ""
+
+
+def format_event(event: tuple, render: Callable[[Any], str] = repr) -> str:
+    """Format a raw event in spewer's text format."""
+    kind, info, lineno, text, payload = event[:5]
+    label = event[5] if len(event) > 5 else None
+    prefix = event[6] if len(event) > 6 else None
+
+    if kind == C_CALL:
+        module, func_name = payload
+        output = f"{module}: {func_name}()\n"
+    else:
+        output = format_parts(
+            kind,
+            info.name,
+            info.func_name,
+            lineno,
+            text,
+            render_payload(kind, payload, render),
+        )
+    return label_lines(output, label, prefix)
+
+
+def label_lines(output: str, label: Optional[str], prefix: Optional[str]) -> str:
+    """Start every line of ``output`` with ``prefix``, and the first with ``label``."""
+    if prefix:
+        output = "".join(prefix + line for line in output.splitlines(keepends=True))
+    return output if label is None else f"[{label}] {output}"
+
+
+def render_payload(
+    kind: str,
+    payload: Optional[tuple],
+    render: Callable[[Any], str] = repr,
+) -> Optional[str]:
+    """Render the values, arguments or outcome of an event as text.
+
+    Returns None when there is nothing to render.
+    """
+    if kind == LINE:
+        return format_values(payload, render) or None
+    if kind == CALL:
+        return format_args(payload, render) or None
+    if kind == C_CALL or payload is None:
+        return None
+    if kind == RETURN:
+        return render(payload[0])
+    exc_type, exc_value = payload
+    return f"{exc_type.__name__}({render(exc_value)})"
+
+
+def format_parts(  # noqa: PLR0913, PLR0917
+    kind: str,
+    name: str,
+    func_name: str,
+    lineno: int,
+    text: Optional[str],
+    detail: Optional[str],
+) -> str:
+    """Format an event from its parts and its rendered payload."""
+    if kind == C_CALL:
+        return f"{text}\n"
+
+    if kind == LINE:
+        return f"{name}:{lineno}: {text.rstrip()}\n" + (detail or "")
+
+    if kind == CALL:
+        return f"{name}:{lineno}: {func_name}()\n" + (detail or "")
+
+    if text is None:
+        prefix = f"{name}:{lineno}: {func_name}()"
+    else:
+        prefix = f"{name}:{lineno}: {text.rstrip()}"
+    if detail is None:
+        detail = "<return>" if kind == RETURN else "<exception>"
+    return f"{prefix} -> {detail}\n"
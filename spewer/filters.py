@@ -0,0 +1,149 @@
+"""Module filtering rules for spewer debugging library."""
+
+from __future__ import annotations
+
+import fnmatch
+import os
+import re
+import site
+import sysconfig
+from pathlib import Path
+from typing import Optional
+
+_GLOB_CHARS = frozenset("*?[")
+
+
+def _stdlib_paths() -> list[str]:
+    paths = sysconfig.get_paths()
+    return [paths["stdlib"], paths["platstdlib"]]
+
+
+def _site_packages_paths() -> list[str]:
+    paths = sysconfig.get_paths()
+    found = [paths["purelib"], paths["platlib"]]
+    if hasattr(site, "getsitepackages"):
+        found.extend(site.getsitepackages())
+    if site.ENABLE_USER_SITE and site.USER_SITE:
+        found.append(site.USER_SITE)
+    return found
+
+
+# Symbolic rules that expand to file-path prefixes
+PATH_ALIASES = {
+    "<stdlib>": _stdlib_paths,
+    "<site-packages>": _site_packages_paths,
+}
+
+
+def _prefixes(paths: list[str]) -> tuple[str, ...]:
+    """Return path prefixes that only match whole path components."""
+    return tuple(path if path.endswith(os.sep) else path + os.sep for path in paths)
+
+
+class _CompiledRules:
+    """One set of rules compiled for fast matching."""
+
+    def __init__(self, rules: list[str]):
+        self.names: set[str] = set()
+        self.paths: tuple[str, ...] = ()
+        # Standard library prefixes, and the site-packages directories that
+        # sit inside them outside virtual environments and do not match
+        self.stdlib_paths: tuple[str, ...] = ()
+        self.stdlib_holes: tuple[str, ...] = ()
+        self.glob: Optional[re.Pattern[str]] = None
+
+        paths = []
+        globs = []
+        for rule in rules:
+            if rule == "<stdlib>":
+                self.stdlib_paths = _prefixes(_stdlib_paths())
+            elif rule in PATH_ALIASES:
+                paths.extend(PATH_ALIASES[rule]())
+            elif "/" in rule or os.sep in rule or rule.startswith("~"):
+                paths.append(str(Path(rule).expanduser().absolute()))
+            else:
+                # Also taken literally: "[unknown]" names code without a
+                # module, even though it reads as a character class
+                self.names.add(rule)
+                if _GLOB_CHARS.intersection(rule):
+                    globs.append(fnmatch.translate(rule))
+
+        self.paths = _prefixes(paths)
+        if self.stdlib_paths:
+            self.stdlib_holes = tuple(
+                path
+                for path in _prefixes(_site_packages_paths())
+                if path.startswith(self.stdlib_paths)
+            )
+        if globs:
+            self.glob = re.compile("|".join(globs))
+
+    def __bool__(self) -> bool:
+        return bool(self.names or self.paths or self.stdlib_paths or self.glob)
+
+    def match(self, name: str, filename: str) -> bool:
+        """Return whether a module matches any rule."""
+        names = self.names
+        if names:
+            # "pkg" matches "pkg" and every submodule "pkg.sub.mod"
+            if name in names:
+                return True
+            dot = name.rfind(".")
+            while dot > 0:
+                name_prefix = name[:dot]
+                if name_prefix in names:
+                    return True
+                dot = name_prefix.rfind(".")
+        if self.paths and filename.startswith(self.paths):
+            return True
+        if (
+            self.stdlib_paths
+            and filename.startswith(self.stdlib_paths)
+            and not (self.stdlib_holes and filename.startswith(self.stdlib_holes))
+        ):
+            return True
+        return self.glob is not None and self.glob.match(name) is not None
+
+
+class ModuleFilter:
+    """Include and exclude rules compiled into a per-module verdict.
+
+    Each rule is one of:
+
+    - a module or package name (``"myapp"``), matching the module and all of
+      its submodules;
+    - a glob over module names (``"myapp.*.views"``);
+    - a file-path prefix (``"/srv/app/"``), or one of the aliases
+      ``"<stdlib>"`` and ``"<site-packages>"``. ``"<stdlib>"`` never
+      matches site-packages, even when it lies inside the standard library
+      directory, as it does outside virtual environments.
+
+    A module is traced when it matches an include rule (or there are none)
+    and matches no exclude rule. Verdicts are cached per module.
+    """
+
+    def __init__(
+        self,
+        include: Optional[list[str]] = None,
+        exclude: Optional[list[str]] = None,
+    ):
+        """Compile the include and exclude rules."""
+        self._include = _CompiledRules(include) if include is not None else None
+        self._exclude = _CompiledRules(exclude or [])
+        self._verdicts: dict[tuple[str, str], bool] = {}
+
+    @property
+    def matches_all(self) -> bool:
+        """Whether every module is traced, so no lookup is needed."""
+        return self._include is None and not self._exclude
+
+    def __call__(self, name: str, filename: str) -> bool:
+        """Return whether a module should be traced."""
+        key = (name, filename)
+        verdict = self._verdicts.get(key)
+        if verdict is None:
+            verdict = (
+                self._include is None or self._include.match(name, filename)
+            ) and not self._exclude.match(name, filename)
+            self._verdicts[key] = verdict
+        return verdict
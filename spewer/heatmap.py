@@ -0,0 +1,86 @@
+"""Line hit counts for spewer trace hooks."""
+
+from __future__ import annotations
+
+import dis
+import linecache
+from array import array
+from typing import Any, Callable
+
+from .cache import CodeInfo  # noqa: TC001
+
+
+def _line_numbers(code: Any) -> list[int]:
+    """Return the line numbers that start instructions of a code object."""
+    return [line for _, line in dis.findlinestarts(code) if line is not None]
+
+
+class LineHeatmap:
+    """Count how often each traced line runs.
+
+    Every code object gets an ``array("Q")`` of counters covering its line
+    range, allocated the first time one of its lines runs, so counting a
+    line costs a dict lookup and an increment. Counters are shared by all
+    threads; concurrent increments of the same line may occasionally be
+    lost, which does not matter for finding hot lines.
+    """
+
+    def __init__(self, describe: Callable[[Any], CodeInfo]):
+        """Initialize empty counters; ``describe`` maps a frame to its CodeInfo."""
+        self._describe = describe
+        # code object -> (CodeInfo, first line, counters)
+        self._codes: dict[Any, tuple[CodeInfo, int, array]] = {}
+
+    def _add(self, frame: Any) -> tuple[CodeInfo, int, array]:
+        code = frame.f_code
+        lines = _line_numbers(code) or [code.co_firstlineno]
+        first = min(code.co_firstlineno, *lines)
+        entry = (
+            self._describe(frame),
+            first,
+            array("Q", [0]) * (max(lines) - first + 1),
+        )
+        self._codes[code] = entry
+        return entry
+
+    def count(self, frame: Any) -> None:
+        """Count one execution of the frame's current line."""
+        entry = self._codes.get(frame.f_code)
+        if entry is None:
+            entry = self._add(frame)
+        _, first, counts = entry
+        index = frame.f_lineno - first
+        if 0 <= index < len(counts):
+            counts[index] += 1
+
+    def hits(self) -> dict[str, tuple[str, dict[int, int]]]:
+        """Return ``{filename: (module, {line: hits})}`` for every traced file.
+
+        Lines that start instructions but never ran are included with 0 hits.
+        """
+        files: dict[str, tuple[str, dict[int, int]]] = {}
+        for code, (info, first, counts) in list(self._codes.items()):
+            _, lines = files.setdefault(info.filename, (info.name, {}))
+            for line in _line_numbers(code):
+                lines.setdefault(line, 0)
+            for index, hits in enumerate(counts):
+                if hits:
+                    line = first + index
+                    lines[line] = lines.get(line, 0) + hits
+        return files
+
+    def listing(self) -> str:
+        """Format the source of every traced file annotated with line hits."""
+        chunks = []
+        for filename, (module, hits) in sorted(self.hits().items()):
+            chunks.append(f"[spewer] line hits in {module} ({filename}):\n")
+            source = linecache.getlines(filename)
+            if not source:
+                chunks.extend(
+                    f"{hits[line]:>10}  line {line}\n" for line in sorted(hits)
+                )
+                continue
+            for line, text in enumerate(source, 1):
+                count = f"{hits[line]:>10}" if line in hits else " " * 10
+                chunks.append(f"{count}  {text.rstrip()}\n")
+        return "".join(chunks)
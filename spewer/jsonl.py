@@ -0,0 +1,167 @@
+"""JSON Lines trace format for spewer debugging library.
+
+Every event becomes one JSON object on a line of its own::
+
+    {"event": "line", "module": "app", "function": "handle",
+     "file": "/srv/app.py", "line": 12, "source": "total += item",
+     "thread": "MainThread", "thread_id": 140..., "timestamp": 1.7e9,
+     "values": {"item": "3", "total": "6"}}
+
+``event`` is one of ``line``, ``call``, ``c_call``, ``return`` and
+``exception``. Depending on the event, the object also has:
+
+- ``values``: rendered variable values of a line, or arguments of a call,
+  by name, with ``show_values``.
+- ``value``: rendered return value, with ``show_values``.
+- ``exception``: ``{"type": ..., "value": ...}`` of a raised exception.
+- ``task``: name of the asyncio task, with ``task_scoped``.
+
+``source`` is null when the source is unavailable, or when a return or
+exception is reported against the function. Preformatted output, such as
+reports and rate limit summaries, becomes ``{"event": "text", "text": ...}``
+with the thread and timestamp. Values are rendered by the sink's renderer
+like in the text format, so every value is a string.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from json.encoder import encode_basestring_ascii as _encode
+from typing import Optional
+
+from .events import C_CALL, CALL, EXCEPTION, LINE, RETURN
+from .sinks import Sink, StreamSink, _live_sinks
+
+# Templates are dropped once there are this many, e.g. after code objects
+# were evicted from the hook's cache and came back under new metadata
+MAX_TEMPLATES = 1 << 16
+
+_KEYS = {kind: _encode(kind) for kind in (LINE, CALL, C_CALL, RETURN, EXCEPTION)}
+
+
+def _template(kind: str, info: object, lineno: int, text: Optional[str]) -> str:
+    """Pre-serialize the parts of an event that are fixed for its line."""
+    source = "null" if text is None else _encode(text.strip())
+    return (
+        f'{{"event":{_KEYS[kind]},"module":{_encode(info.name)},'
+        f'"function":{_encode(info.func_name)},"file":{_encode(info.filename)},'
+        f'"line":{lineno},"source":{source}'
+    )
+
+
+class JsonLinesSink(Sink):
+    """Write trace events as JSON Lines to another sink.
+
+    The fields of an event that only depend on its code object and line,
+    such as the module, function and source line, are serialized once and
+    reused, so each event only adds the thread, the timestamp and its
+    values. Lines are written to ``sink``, a ``StreamSink`` on
+    ``sys.stdout`` by default; wrap a ``FileSink`` to write a file.
+
+    Events are serialized on the traced thread, with the thread and
+    timestamp taken as they happen, so no per-thread buffering is needed
+    when tracing all threads.
+    """
+
+    records_threads = True
+
+    def __init__(self, sink: Optional[Sink] = None):
+        """Initialize the sink in front of ``sink``."""
+        if sink is not None and not isinstance(sink, Sink):
+            msg = "sink must be a Sink instance or None"
+            raise TypeError(msg)
+        self.sink = sink if sink is not None else StreamSink()
+        self._templates: dict[tuple, str] = {}
+        self._threads: dict[int, str] = {}
+        self._lock = threading.Lock()
+        _live_sinks.add(self)
+
+    def _thread(self) -> str:
+        ident = threading.get_ident()
+        fields = self._threads.get(ident)
+        if fields is None:
+            name = threading.current_thread().name
+            fields = f',"thread":{_encode(name)},"thread_id":{ident}'
+            self._threads[ident] = fields
+        return fields
+
+    def _values(self, pairs: Optional[tuple]) -> str:
+        if not pairs:
+            return ""
+        render = self.renderer
+        items = []
+        for name, value in pairs:
+            try:
+                rendered = render(value)
+            except (AttributeError, TypeError, RecursionError):
+                rendered = f"<{type(value).__name__} object>"
+            items.append(f"{_encode(name)}:{_encode(rendered)}")
+        return f',"values":{{{",".join(items)}}}'
+
+    def _outcome(self, kind: str, payload: Optional[tuple]) -> str:
+        if payload is None:
+            return ""
+        if kind == RETURN:
+            return f',"value":{_encode(self.renderer(payload[0]))}'
+        exc_type, exc_value = payload
+        return (
+            f',"exception":{{"type":{_encode(exc_type.__name__)},'
+            f'"value":{_encode(self.renderer(exc_value))}}}'
+        )
+
+    def submit(self, event: tuple) -> None:
+        """Serialize a raw event as a JSON line and write it."""
+        kind, info, lineno, text, payload = event[:5]
+        if kind == C_CALL:
+            key: tuple = (kind, *payload)
+        else:
+            key = (kind, info, lineno, text)
+        head = self._templates.get(key)
+        if head is None:
+            if len(self._templates) >= MAX_TEMPLATES:
+                self._templates.clear()
+            if kind == C_CALL:
+                module, func_name = payload
+                head = (
+                    f'{{"event":{_KEYS[kind]},"module":{_encode(module)},'
+                    f'"function":{_encode(func_name)}'
+                )
+            else:
+                head = _template(kind, info, lineno, text)
+            self._templates[key] = head
+
+        if kind in (LINE, CALL):
+            detail = self._values(payload)
+        elif kind == C_CALL:
+            detail = ""
+        else:
+            detail = self._outcome(kind, payload)
+        label = event[5] if len(event) > 5 else None
+        task = "" if label is None else f',"task":{_encode(label)}'
+        line = f'{head}{self._thread()},"timestamp":{time.time()!r}{task}{detail}}}\n'
+        with self._lock:
+            self.sink.write(line)
+
+    def write(self, text: str) -> None:
+        """Write preformatted output as a ``text`` event."""
+        line = (
+            f'{{"event":"text","text":{_encode(text)}{self._thread()},'
+            f'"timestamp":{time.time()!r}}}\n'
+        )
+        with self._lock:
+            self.sink.write(line)
+
+    def flush(self) -> None:
+        """Flush the wrapped sink."""
+        self.sink.flush()
+
+    def close(self) -> None:
+        """Close the wrapped sink."""
+        self.sink.close()
+        _live_sinks.discard(self)
+
+    def _after_fork(self) -> None:
+        # Only the forking thread survives, and the lock may have been held
+        self._threads.clear()
+        self._lock = threading.Lock()
@@ -0,0 +1,289 @@
+"""WSGI and ASGI middleware tracing selected requests."""
+
+from __future__ import annotations
+
+import contextvars
+import dataclasses
+import random
+import sys
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+from . import spewer as _spewer
+from .config import SpewConfig
+from .sinks import Sink
+from .tasks import tracing
+from .trace import TraceHook
+
+DEFAULT_TRIGGER_HEADER = "X-Spewer-Trace"
+DEFAULT_REQUEST_ID_HEADER = "X-Request-ID"
+DEFAULT_MAX_TRACES = 100
+
+# Id of the traced request running in the current context
+current_request: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "spewer_request", default=None
+)
+
+
+class RequestSink(Sink):
+    """Collect the output of each traced request in a buffer of its own.
+
+    Output is routed by ``current_request``; output from contexts without
+    an open request is dropped.
+    """
+
+    def __init__(self):
+        """Initialize the sink without any open request."""
+        self._buffers: dict[str, list[str]] = {}
+
+    def open(self, request_id: str) -> None:
+        """Start collecting the output of a request."""
+        self._buffers[request_id] = []
+
+    def write(self, text: str) -> None:
+        """Append trace output to the current request's buffer."""
+        request_id = current_request.get()
+        if request_id is not None:
+            buffer = self._buffers.get(request_id)
+            if buffer is not None:
+                buffer.append(text)
+
+    def close_request(self, request_id: str) -> str:
+        """Stop collecting a request's output and return it."""
+        return "".join(self._buffers.pop(request_id, ()))
+
+
+def _header_enabled(value: Optional[str]) -> bool:
+    return value is not None and value.strip().lower() not in ("", "0", "false")
+
+
+class _Middleware:
+    """Selection of traced requests and storage of their traces."""
+
+    def __init__(  # noqa: PLR0913, PLR0917
+        self,
+        app: Any,
+        config: Optional[SpewConfig],
+        trigger_header: Optional[str],
+        sample_rate: float,
+        request_id_header: str,
+        max_traces: int,
+        task_scoped: bool,
+    ):
+        if not 0.0 <= sample_rate <= 1.0:
+            msg = "sample_rate must be between 0 and 1"
+            raise ValueError(msg)
+        if not isinstance(max_traces, int) or max_traces < 1:
+            msg = "max_traces must be a positive integer"
+            raise ValueError(msg)
+        config = config if config is not None else SpewConfig()
+        self.app = app
+        self.trigger_header = trigger_header
+        self.sample_rate = sample_rate
+        self.request_id_header = request_id_header
+        self.max_traces = max_traces
+        # Finished traces are written here as well as kept in traces
+        self.output = config.sink
+        self.sink = RequestSink()
+        # One hook serves every request; it is only installed while a traced
+        # request runs, always with sys.settrace in that request's thread
+        self.hook = TraceHook(
+            dataclasses.replace(
+                config,
+                sink=self.sink,
+                backend="settrace",
+                all_threads=False,
+                task_scoped=task_scoped,
+            )
+        )
+        self.traces: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self._random = random.random
+
+    def _selected(self, trigger: Optional[str]) -> bool:
+        """Return whether a request is traced, given its trigger header."""
+        if _header_enabled(trigger):
+            return True
+        return self.sample_rate > 0.0 and self._random() < self.sample_rate
+
+    def _finish(self, request_id: str) -> None:
+        """Store the trace of a finished request and write it to the output."""
+        text = self.sink.close_request(request_id)
+        with self._lock:
+            self.traces[request_id] = text
+            self.traces.move_to_end(request_id)
+            while len(self.traces) > self.max_traces:
+                self.traces.popitem(last=False)
+        if self.output is not None:
+            self.output.write(f"[spewer] request {request_id}:\n{text}")
+            self.output.flush()
+
+
+class _ThreadHook(threading.local):
+    """Install a hook in one thread, for as long as it has users there."""
+
+    users = 0
+    previous: Any = None
+
+    def acquire(self, hook: TraceHook) -> None:
+        self.users += 1
+        if self.users == 1:
+            profile = _spewer._uses_profile(hook.config)
+            self.previous = sys.getprofile() if profile else sys.gettrace()
+            tracer = _spewer._tracer(hook, self.previous)
+            (sys.setprofile if profile else sys.settrace)(tracer)
+
+    def release(self, hook: TraceHook) -> None:
+        self.users -= 1
+        if not self.users:
+            profile = _spewer._uses_profile(hook.config)
+            (sys.setprofile if profile else sys.settrace)(self.previous)
+            self.previous = None
+
+
+class WSGIMiddleware(_Middleware):
+    """Trace the WSGI requests carrying a trigger header, or a sample of them.
+
+    A traced request gets the hook installed in its thread with
+    ``sys.settrace`` while the application is called; its output goes to a
+    buffer of its own and ends up in ``traces`` under the request's id,
+    taken from ``request_id_header`` or generated. A generated id is sent
+    back in the same response header. Other requests only pay for the
+    header check and, with ``sample_rate``, a random number. Response
+    bodies produced after the application returns are not traced.
+    """
+
+    def __init__(  # noqa: PLR0913, PLR0917
+        self,
+        app: Callable,
+        config: Optional[SpewConfig] = None,
+        trigger_header: Optional[str] = DEFAULT_TRIGGER_HEADER,
+        sample_rate: float = 0.0,
+        request_id_header: str = DEFAULT_REQUEST_ID_HEADER,
+        max_traces: int = DEFAULT_MAX_TRACES,
+    ):
+        """Wrap a WSGI application; ``config`` defaults to ``SpewConfig()``."""
+        super().__init__(
+            app,
+            config,
+            trigger_header,
+            sample_rate,
+            request_id_header,
+            max_traces,
+            task_scoped=False,
+        )
+        self._trigger_key = (
+            None if trigger_header is None else _environ_key(trigger_header)
+        )
+        self._request_id_key = _environ_key(request_id_header)
+        self._thread_hook = _ThreadHook()
+
+    def __call__(self, environ: dict, start_response: Callable) -> Any:
+        """Call the application, tracing the request if it is selected."""
+        trigger = None if self._trigger_key is None else environ.get(self._trigger_key)
+        if not self._selected(trigger):
+            return self.app(environ, start_response)
+
+        request_id = environ.get(self._request_id_key)
+        if not request_id:
+            request_id = uuid.uuid4().hex
+            header = (self.request_id_header, request_id)
+
+            def start_response_with_id(status, headers, exc_info=None):
+                return start_response(status, [*headers, header], exc_info)
+
+            start = start_response_with_id
+        else:
+            start = start_response
+
+        token = current_request.set(request_id)
+        self.sink.open(request_id)
+        self._thread_hook.acquire(self.hook)
+        try:
+            return self.app(environ, start)
+        finally:
+            self._thread_hook.release(self.hook)
+            current_request.reset(token)
+            self._finish(request_id)
+
+
+def _environ_key(header: str) -> str:
+    """Return the WSGI environ key of an HTTP request header."""
+    return "HTTP_" + header.upper().replace("-", "_")
+
+
+class ASGIMiddleware(_Middleware):
+    """Trace the ASGI requests carrying a trigger header, or a sample of them.
+
+    Works like ``WSGIMiddleware``, but requests share the event loop's
+    thread: the hook is installed there while at least one traced request
+    is running, and reports only events from the contexts of traced
+    requests, as with ``task_scoped=True``. While no traced request runs,
+    other requests only pay for the header check.
+    """
+
+    def __init__(  # noqa: PLR0913, PLR0917
+        self,
+        app: Callable,
+        config: Optional[SpewConfig] = None,
+        trigger_header: Optional[str] = DEFAULT_TRIGGER_HEADER,
+        sample_rate: float = 0.0,
+        request_id_header: str = DEFAULT_REQUEST_ID_HEADER,
+        max_traces: int = DEFAULT_MAX_TRACES,
+    ):
+        """Wrap an ASGI application; ``config`` defaults to ``SpewConfig()``."""
+        super().__init__(
+            app,
+            config,
+            trigger_header,
+            sample_rate,
+            request_id_header,
+            max_traces,
+            task_scoped=True,
+        )
+        self._trigger_name = (
+            None if trigger_header is None else trigger_header.lower().encode()
+        )
+        self._request_id_name = request_id_header.lower().encode()
+        self._thread_hook = _ThreadHook()
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        """Call the application, tracing the request if it is selected."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or ())
+        trigger = None
+        if self._trigger_name is not None and self._trigger_name in headers:
+            trigger = headers[self._trigger_name].decode("latin-1")
+        if not self._selected(trigger):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = headers.get(self._request_id_name, b"").decode("latin-1")
+        if not request_id:
+            request_id = uuid.uuid4().hex
+            header = (self._request_id_name, request_id.encode("latin-1"))
+            app_send = send
+
+            async def send(message: dict) -> None:
+                if message["type"] == "http.response.start":
+                    message = {
+                        **message,
+                        "headers": [*message.get("headers", ()), header],
+                    }
+                await app_send(message)
+
+        request_token = current_request.set(request_id)
+        tracing_token = tracing.set(True)
+        self.sink.open(request_id)
+        self._thread_hook.acquire(self.hook)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self._thread_hook.release(self.hook)
+            tracing.reset(tracing_token)
+            current_request.reset(request_token)
+            self._finish(request_id)
@@ -0,0 +1,260 @@
+"""sys.monitoring (PEP 669) backend for spewer on Python 3.12+."""
+
+from __future__ import annotations
+
+import sys
+import threading
+import types
+from typing import Any
+
+from .sinks import writer_threads
+from .trace import TraceHook  # noqa: TC001
+
+AVAILABLE = hasattr(sys, "monitoring")
+
+# Tool ids tried in order: the one reserved for debuggers first, then the
+# ids CPython leaves unassigned.
+_TOOL_IDS = (0, 3, 4)
+_TOOL_NAME = "spewer"
+
+
+class MonitoringBackend:
+    """Feed a TraceHook from sys.monitoring events instead of sys.settrace.
+
+    Only the events the hook's configuration needs are registered, and code
+    locations whose module is filtered out return ``sys.monitoring.DISABLE``
+    so the interpreter stops reporting them.
+
+    Events match sys.settrace's: frames that were already running when the
+    backend was installed, like the one that called ``spew()``, are not
+    traced, and a frame left by an exception reports a return of None.
+    """
+
+    def __init__(self, hook: TraceHook):
+        """Initialize the backend for the given trace hook."""
+        self.hook = hook
+        self.tool_id: int | None = None
+        self._mask = 0
+        self._paused = False
+        # Owner thread whose events are reported, or None for all threads
+        self._thread = None if hook.config.all_threads else threading.get_ident()
+        # Frames running at install time, and their code objects
+        self._running: set[Any] = set()
+        self._running_codes: set[Any] = set()
+
+    def _events(self) -> dict[int, Any]:
+        """Return the event callbacks required by the hook's configuration."""
+        events = sys.monitoring.events
+        config = self.hook.config
+        callbacks = {}
+        if config.heatmap or not (config.functions_only or config.stats):
+            callbacks[events.LINE] = self._on_line
+        elif not config.stats:
+            callbacks[events.PY_START] = self._on_py_start
+            callbacks[events.CALL] = self._on_call
+        sampler, depth = self.hook._sampler, self.hook._depth
+        # Stats count calls between their start and exit, like depth tracking
+        tracks_calls = depth is not None or config.stats
+        if sampler is not None or tracks_calls or self.hook._triggers is not None:
+            # Sampling, call tracking and triggers decide at PY_START
+            callbacks[events.PY_START] = self._on_py_start
+        if tracks_calls:
+            # Like sys.settrace, report a yield as a return and a resumption
+            # as a call, so suspended generators do not count as running
+            callbacks[events.PY_RESUME] = self._on_py_start
+            callbacks[events.PY_YIELD] = self._on_py_return
+        if (
+            sampler is not None
+            or tracks_calls
+            or self.hook._shadow is not None
+            or self.hook._triggers is not None
+        ):
+            # Per-frame state is dropped when the frame exits
+            callbacks[events.PY_RETURN] = self._on_py_return
+            callbacks[events.PY_UNWIND] = self._on_py_unwind
+        elif config.trace_returns:
+            callbacks[events.PY_RETURN] = self._on_py_return
+            callbacks[events.PY_UNWIND] = self._on_py_unwind
+        if config.trace_exceptions:
+            callbacks[events.RAISE] = self._on_raise
+        return callbacks
+
+    def install(self) -> None:
+        """Claim a tool id and start receiving events."""
+        if not AVAILABLE:
+            msg = "sys.monitoring is not available on this Python version"
+            raise RuntimeError(msg)
+
+        monitoring = sys.monitoring
+        for tool_id in _TOOL_IDS:
+            if monitoring.get_tool(tool_id) is None:
+                monitoring.use_tool_id(tool_id, _TOOL_NAME)
+                self.tool_id = tool_id
+                break
+        else:
+            msg = "no free sys.monitoring tool id"
+            raise RuntimeError(msg)
+
+        self._collect_running(sys._getframe(1))
+        self._mask = 0
+        for event, callback in self._events().items():
+            monitoring.register_callback(self.tool_id, event, callback)
+            self._mask |= event
+        # Locations disabled by an earlier session may be traced by this one.
+        monitoring.restart_events()
+        monitoring.set_events(self.tool_id, self._current_events())
+        if self.hook._triggers is not None:
+            self.hook._triggers.listener = self._switch_events
+
+    def _current_events(self) -> int:
+        """Return the event set to register in the hook's current state."""
+        if self._paused:
+            return 0
+        triggers = self.hook._triggers
+        if triggers is None or triggers.running:
+            return self._mask
+        if triggers.exhausted:
+            return 0
+        # Dormant until a trigger function starts
+        return sys.monitoring.events.PY_START
+
+    def _switch_events(self, awake: bool) -> None:
+        """Register every event while a trigger call runs, else only PY_START."""
+        if self.tool_id is None:
+            return
+        if awake:
+            # Bring back the locations disabled while the hook was dormant
+            sys.monitoring.restart_events()
+        sys.monitoring.set_events(self.tool_id, self._current_events())
+
+    def pause(self) -> None:
+        """Stop receiving events until resume() is called."""
+        self._paused = True
+        if self.tool_id is not None:
+            sys.monitoring.set_events(self.tool_id, 0)
+
+    def resume(self) -> None:
+        """Receive events again after pause()."""
+        self._paused = False
+        if self.tool_id is not None:
+            sys.monitoring.set_events(self.tool_id, self._current_events())
+
+    def uninstall(self) -> None:
+        """Stop receiving events and release the tool id."""
+        if self.tool_id is None:
+            return
+        monitoring = sys.monitoring
+        if self.hook._triggers is not None:
+            self.hook._triggers.listener = None
+        monitoring.set_events(self.tool_id, 0)
+        for event in self._events():
+            monitoring.register_callback(self.tool_id, event, None)
+        monitoring.free_tool_id(self.tool_id)
+        self.tool_id = None
+        self._running.clear()
+        self._running_codes.clear()
+
+    def _collect_running(self, caller: Any) -> None:
+        """Remember the frames that sys.settrace would leave untraced."""
+        if self._thread is None:
+            tops = list(sys._current_frames().values())
+        else:
+            tops = [caller]
+        for top in tops:
+            frame = top
+            while frame is not None:
+                self._running.add(frame)
+                self._running_codes.add(frame.f_code)
+                frame = frame.f_back
+
+    def _was_running(self, code: Any, frame: Any) -> bool:
+        """Return whether a frame was already running at install time."""
+        return code in self._running_codes and frame in self._running
+
+    def _skip_thread(self) -> bool:
+        """Return whether events from the current thread are ignored."""
+        ident = threading.get_ident()
+        if self._thread is None:
+            return ident in writer_threads
+        return ident != self._thread
+
+    def _on_line(self, code: Any, line_number: int) -> Any:
+        if self._skip_thread():
+            return None
+        frame = sys._getframe(1)
+        if self._was_running(code, frame):
+            return None
+        if not self.hook._is_traced(frame):
+            return sys.monitoring.DISABLE
+        self.hook(frame, "line", None)
+        return None
+
+    def _on_py_start(self, code: Any, instruction_offset: int) -> Any:
+        if self._skip_thread():
+            return None
+        frame = sys._getframe(1)
+        if not self.hook._is_traced(frame):
+            return sys.monitoring.DISABLE
+        triggers = self.hook._triggers
+        if (
+            triggers is not None
+            and not triggers.running
+            and not triggers.matches(frame)
+        ):
+            # Dormant: stop reporting functions that cannot wake the hook
+            return sys.monitoring.DISABLE
+        self.hook(frame, "call", None)
+        return None
+
+    def _on_call(
+        self, code: Any, instruction_offset: int, callable_: Any, arg0: Any
+    ) -> Any:
+        if self._skip_thread():
+            return None
+        frame = sys._getframe(1)
+        if self._was_running(code, frame):
+            return None
+        if not self.hook._is_traced(frame):
+            return sys.monitoring.DISABLE
+        # Python callees are reported by PY_START, like "c_call" under setprofile
+        if isinstance(callable_, types.BuiltinFunctionType):
+            self.hook(frame, "c_call", callable_)
+        return None
+
+    def _on_py_return(self, code: Any, instruction_offset: int, retval: Any) -> Any:
+        if self._skip_thread():
+            return None
+        frame = sys._getframe(1)
+        if self._was_running(code, frame):
+            # Like sys.settrace, trace a running generator once it resumes
+            self._running.discard(frame)
+            return None
+        if not self.hook._is_traced(frame):
+            return sys.monitoring.DISABLE
+        self.hook(frame, "return", retval)
+        return None
+
+    def _on_py_unwind(self, code: Any, instruction_offset: int, exception: Any) -> None:
+        # PY_UNWIND cannot be disabled per location either
+        if self._skip_thread():
+            return
+        frame = sys._getframe(1)
+        if self._was_running(code, frame):
+            self._running.discard(frame)
+        elif self.hook.config.trace_returns and self.hook._is_traced(frame):
+            # sys.settrace reports a frame left by an exception as returning None
+            self.hook(frame, "return", None)
+        else:
+            self.hook._frame_exited(frame)
+
+    def _on_raise(self, code: Any, instruction_offset: int, exception: Any) -> None:
+        # RAISE cannot be disabled per location, so filtered frames just return
+        if self._skip_thread():
+            return
+        frame = sys._getframe(1)
+        if self.hook._is_traced(frame) and not self._was_running(code, frame):
+            self.hook(
+                frame,
+                "exception",
+                (type(exception), exception, exception.__traceback__),
+            )
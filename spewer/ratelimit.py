@@ -0,0 +1,114 @@
+"""Event rate limiting for spewer trace hooks."""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, Optional
+
+# Locations listed in a summary line, busiest first
+SUMMARY_LOCATIONS = 5
+
+
+class TokenBucket:
+    """Token bucket refilled at ``rate`` tokens per second.
+
+    The bucket holds at most one second's worth of tokens, so bursts up to
+    ``rate`` events pass after a quiet period.
+    """
+
+    __slots__ = ("capacity", "rate", "stamp", "tokens")
+
+    def __init__(self, rate: float, now: float):
+        """Initialize a full bucket."""
+        self.rate = rate
+        self.capacity = max(rate, 1.0)
+        self.tokens = self.capacity
+        self.stamp = now
+
+    def take(self, now: float) -> bool:
+        """Take a token if one is available."""
+        tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if tokens >= 1.0:
+            self.tokens = tokens - 1.0
+            return True
+        self.tokens = tokens
+        return False
+
+
+def _location(key: Any) -> str:
+    """Describe where an event came from: a CodeInfo or a (module, name) pair."""
+    if isinstance(key, tuple):
+        return f"{key[0]}:{key[1]}"
+    return f"{key.name}:{key.func_name}"
+
+
+class RateLimiter:
+    """Budget trace events globally and per code object.
+
+    Events over budget are only counted. Once ``interval`` seconds have
+    passed since the last summary, ``summary_due`` is set and
+    :meth:`summary` describes what was suppressed in the meantime.
+    """
+
+    def __init__(
+        self,
+        rate: Optional[float] = None,
+        code_rate: Optional[float] = None,
+        interval: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize the limiter; a rate of None means no limit."""
+        self._clock = clock
+        now = clock()
+        self._bucket = TokenBucket(rate, now) if rate is not None else None
+        self._code_rate = code_rate
+        self._code_buckets: dict[Any, TokenBucket] = {}
+        self.interval = interval
+        self.suppressed: dict[Any, int] = {}
+        self.summary_due = False
+        self._last_summary = now
+
+    def allow(self, key: Any) -> bool:
+        """Return whether an event from ``key`` is within budget."""
+        now = self._clock()
+        allowed = True
+        if self._code_rate is not None:
+            bucket = self._code_buckets.get(key)
+            if bucket is None:
+                bucket = self._code_buckets[key] = TokenBucket(self._code_rate, now)
+            allowed = bucket.take(now)
+        if allowed and self._bucket is not None:
+            allowed = self._bucket.take(now)
+
+        if not allowed:
+            self.suppressed[key] = self.suppressed.get(key, 0) + 1
+        if self.suppressed and now - self._last_summary >= self.interval:
+            self.summary_due = True
+        return allowed
+
+    def summary(self) -> Optional[str]:
+        """Return a line describing suppressed events and reset the counts.
+
+        Returns None when nothing was suppressed.
+        """
+        now = self._clock()
+        elapsed = now - self._last_summary
+        self._last_summary = now
+        self.summary_due = False
+        suppressed, self.suppressed = self.suppressed, {}
+        if not suppressed:
+            return None
+
+        counts: dict[str, int] = {}
+        for key, count in suppressed.items():
+            location = _location(key)
+            counts[location] = counts.get(location, 0) + count
+        busiest = sorted(counts.items(), key=lambda item: -item[1])
+        details = ", ".join(
+            f"{location} ({count})" for location, count in busiest[:SUMMARY_LOCATIONS]
+        )
+        if len(busiest) > SUMMARY_LOCATIONS:
+            details += f", {len(busiest) - SUMMARY_LOCATIONS} more"
+        total = sum(counts.values())
+        return f"[spewer] suppressed {total} events in {elapsed:.1f}s: {details}\n"
@@ -0,0 +1,249 @@
+"""Flight recorder sink for spewer debugging library."""
+
+from __future__ import annotations
+
+import itertools
+import mmap
+import signal
+import struct
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Callable, Optional, Union
+
+from .events import format_event
+from .sinks import PID_PLACEHOLDER, Sink, StreamSink, _live_sinks, pid_path
+
+DEFAULT_CAPACITY = 10000
+DEFAULT_SLOT_SIZE = 256
+
+_RING_MAGIC = b"SPEWRING"
+# Magic, capacity, slot size and number of events recorded so far
+_RING_HEADER = struct.Struct("<8sIIQ")
+_SLOT_LENGTH = struct.Struct("<H")
+
+
+def _format(item: Union[tuple, str, None], render: Callable[[Any], str]) -> str:
+    if item is None:
+        return ""
+    if isinstance(item, str):
+        return item
+    try:
+        return format_event(item, render)
+    except Exception as exc:
+        # Dumping usually happens while something is already going wrong
+        return f"<spewer: unformattable {item[0]} event: {exc!r}>\n"
+
+
+class FlightRecorder(Sink):
+    """Keep the last ``capacity`` trace events and emit them only on demand.
+
+    Events go into a preallocated ring buffer; nothing is formatted or
+    written until :meth:`dump` is called, an unhandled exception reaches
+    ``sys.excepthook`` or ``threading.excepthook`` (with
+    ``dump_on_exception``), or ``dump_signal`` is received. Buffered values
+    are rendered at dump time.
+
+    With ``path``, the ring lives in a memory-mapped file instead, so it
+    survives a crash of the process; read it back with ``spewer dump``.
+    Each event is then formatted when recorded and truncated to
+    ``slot_size`` bytes. ``{pid}`` in ``path`` is replaced by the process
+    id; a forked child maps a file of its own, or without ``{pid}`` keeps
+    its ring in memory. Either way the child starts with an empty ring.
+
+    When tracing all threads, events are recorded as they happen, so the
+    ring always holds the last ``capacity`` events of the whole process.
+    """
+
+    records_threads = True
+
+    def __init__(  # noqa: PLR0913, PLR0917
+        self,
+        capacity: int = DEFAULT_CAPACITY,
+        path: Optional[Union[str, Path]] = None,
+        slot_size: int = DEFAULT_SLOT_SIZE,
+        output: Optional[Sink] = None,
+        dump_on_exception: bool = True,
+        dump_signal: Optional[int] = None,
+    ):
+        """Allocate the ring buffer and install the dump triggers."""
+        if not isinstance(capacity, int) or capacity < 1:
+            msg = "capacity must be a positive integer"
+            raise ValueError(msg)
+        if not isinstance(slot_size, int) or not 16 <= slot_size <= 0xFFFF:
+            msg = "slot_size must be an integer between 16 and 65535"
+            raise ValueError(msg)
+        if output is not None and not isinstance(output, Sink):
+            msg = "output must be a Sink instance"
+            raise TypeError(msg)
+
+        self.capacity = capacity
+        self.slot_size = slot_size
+        self.output = output
+        self.template = str(path) if path is not None else None
+        self.path = pid_path(path) if path is not None else None
+        self._counter = itertools.count()
+        self._recorded = 0
+        self._slots: list[Any] = [None] * capacity
+        self._mmap: Optional[mmap.mmap] = None
+        if self.path is not None:
+            self._mmap = self._map_file(self.path)
+        _live_sinks.add(self)
+
+        self._previous_excepthook = None
+        self._previous_threading_excepthook = None
+        if dump_on_exception:
+            self._previous_excepthook = sys.excepthook
+            self._previous_threading_excepthook = threading.excepthook
+            sys.excepthook = self._excepthook
+            threading.excepthook = self._threading_excepthook
+
+        self.dump_signal = dump_signal
+        self._previous_signal_handler = None
+        if dump_signal is not None:
+            self._previous_signal_handler = signal.signal(
+                dump_signal, self._signal_handler
+            )
+
+    def _map_file(self, path: Path) -> mmap.mmap:
+        size = _RING_HEADER.size + self.capacity * self.slot_size
+        with path.open("w+b") as file:
+            file.truncate(size)
+            mapped = mmap.mmap(file.fileno(), size)
+        _RING_HEADER.pack_into(mapped, 0, _RING_MAGIC, self.capacity, self.slot_size, 0)
+        return mapped
+
+    @property
+    def recorded(self) -> int:
+        """Number of events recorded so far, including overwritten ones."""
+        return self._recorded
+
+    def submit(self, event: tuple) -> None:
+        """Record a raw event, overwriting the oldest one when full."""
+        index = next(self._counter)
+        if self._mmap is None:
+            self._slots[index % self.capacity] = event
+        else:
+            self._store(index, _format(event, self.renderer))
+        self._recorded = index + 1
+
+    def write(self, text: str) -> None:
+        """Record already formatted output as a single entry."""
+        index = next(self._counter)
+        if self._mmap is None:
+            self._slots[index % self.capacity] = text
+        else:
+            self._store(index, text)
+        self._recorded = index + 1
+
+    def _store(self, index: int, text: str) -> None:
+        data = text.encode("utf-8", "replace")[: self.slot_size - _SLOT_LENGTH.size]
+        offset = _RING_HEADER.size + (index % self.capacity) * self.slot_size
+        _SLOT_LENGTH.pack_into(self._mmap, offset, len(data))
+        end = offset + _SLOT_LENGTH.size + len(data)
+        self._mmap[offset + _SLOT_LENGTH.size : end] = data
+        _RING_HEADER.pack_into(
+            self._mmap, 0, _RING_MAGIC, self.capacity, self.slot_size, index + 1
+        )
+
+    def entries(self) -> list[str]:
+        """Return the recorded entries as text, oldest first."""
+        if self._mmap is not None:
+            return _read_ring(self._mmap)
+        recorded = self._recorded
+        start = max(recorded - self.capacity, 0)
+        # Copy first so events recorded while formatting cannot interfere
+        slots = list(self._slots)
+        return [
+            _format(slots[i % self.capacity], self.renderer)
+            for i in range(start, recorded)
+        ]
+
+    def dump(self, sink: Optional[Sink] = None) -> None:
+        """Write the recorded entries to ``sink``, ``output`` or ``sys.stderr``."""
+        target = sink or self.output or StreamSink(sys.stderr)
+        entries = self.entries()
+        target.write(
+            f"--- spewer flight recorder: last {len(entries)} "
+            f"of {self._recorded} events ---\n"
+        )
+        target.write("".join(entries))
+        target.write("--- end of flight recorder ---\n")
+        target.flush()
+
+    def clear(self) -> None:
+        """Forget every recorded entry."""
+        self._counter = itertools.count()
+        self._recorded = 0
+        self._slots = [None] * self.capacity
+        if self._mmap is not None:
+            _RING_HEADER.pack_into(
+                self._mmap, 0, _RING_MAGIC, self.capacity, self.slot_size, 0
+            )
+
+    def _after_fork(self) -> None:
+        if self._mmap is not None:
+            # The mapping is shared with the parent; stop writing to it
+            self._mmap.close()
+            self._mmap = None
+            self.path = None
+            if PID_PLACEHOLDER in self.template:
+                self.path = pid_path(self.template)
+                self._mmap = self._map_file(self.path)
+        self.clear()
+
+    def _excepthook(self, exc_type, exc_value, exc_tb) -> None:
+        self.dump()
+        self._previous_excepthook(exc_type, exc_value, exc_tb)
+
+    def _threading_excepthook(self, args) -> None:
+        self.dump()
+        self._previous_threading_excepthook(args)
+
+    def _signal_handler(self, signum, frame) -> None:
+        self.dump()
+
+    def flush(self) -> None:
+        """Sync the memory-mapped ring to disk; nothing is dumped."""
+        if self._mmap is not None:
+            self._mmap.flush()
+
+    def close(self) -> None:
+        """Remove the dump triggers and release the memory-mapped file."""
+        if sys.excepthook == self._excepthook:
+            sys.excepthook = self._previous_excepthook
+        if threading.excepthook == self._threading_excepthook:
+            threading.excepthook = self._previous_threading_excepthook
+        if (
+            self.dump_signal is not None
+            and signal.getsignal(self.dump_signal) == self._signal_handler
+        ):
+            signal.signal(self.dump_signal, self._previous_signal_handler)
+        if self._mmap is not None:
+            self._mmap.flush()
+            self._mmap.close()
+            self._mmap = None
+        _live_sinks.discard(self)
+
+
+def _read_ring(buffer: Any) -> list[str]:
+    if len(buffer) < _RING_HEADER.size:
+        msg = "not a spewer flight recording"
+        raise ValueError(msg)
+    magic, capacity, slot_size, recorded = _RING_HEADER.unpack_from(buffer, 0)
+    if magic != _RING_MAGIC:
+        msg = "not a spewer flight recording"
+        raise ValueError(msg)
+    entries = []
+    for index in range(max(recorded - capacity, 0), recorded):
+        offset = _RING_HEADER.size + (index % capacity) * slot_size
+        (length,) = _SLOT_LENGTH.unpack_from(buffer, offset)
+        start = offset + _SLOT_LENGTH.size
+        text = bytes(buffer[start : start + length]).decode("utf-8", "ignore")
+        entries.append(text if text.endswith("\n") else text + "\n")
+    return entries
+
+
+def read_recording(path: Union[str, Path]) -> list[str]:
+    """Read the entries of a memory-mapped flight recording, oldest first."""
+    return _read_ring(Path(path).read_bytes())
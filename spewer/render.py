@@ -0,0 +1,207 @@
+"""Bounded rendering of traced values.
+
+Tracing may report the same large value on every line, so values are not
+shown with plain ``repr()``. :class:`ValueRenderer` builds on
+:class:`reprlib.Repr`: only the first few items of a container are looked
+at, nesting stops at a fixed depth and long strings are cut off, which
+keeps both the output and the cost of producing it small.
+"""
+
+from __future__ import annotations
+
+import builtins
+import functools
+import reprlib
+from itertools import islice
+from typing import Any, Optional
+
+DEFAULT_MAX_LENGTH = 240
+DEFAULT_MAX_DEPTH = 3
+DEFAULT_MAX_ITEMS = 10
+DEFAULT_MAX_STRING = 80
+DEFAULT_CACHE_SIZE = 1024
+
+# Renderings of values of these types never change, so they are cached
+_CACHED_TYPES = frozenset({str, bytes, int, float, complex})
+# Cached only up to max_string long, since the cache keeps its keys alive
+# and hashes them in full
+_STRING_TYPES = frozenset({str, bytes})
+
+# Containers whose size is shown when not all of their items are
+_SIZED_TYPES = frozenset({tuple, list, dict, set, frozenset})
+
+
+class ValueRenderer(reprlib.Repr):
+    """Render values for trace output within fixed limits.
+
+    - ``max_length``: characters in a rendering; longer ones end in ``...``.
+    - ``max_depth``: levels of nested containers shown.
+    - ``max_items``: items shown per container. Bigger containers show the
+      first ones followed by their size, e.g. ``[0, 1, ...] (1000 items)``.
+    - ``max_string``: characters shown of a ``str`` or ``bytes``, followed
+      by the full length when cut off.
+
+    Dicts and sets are shown in iteration order, never sorted. Buffers are
+    summarized instead of copied: a ``memoryview`` always, a ``bytearray``
+    when longer than ``max_string``, and array-like objects with a
+    ``shape`` (NumPy arrays, DataFrames, tensors) when they have more than
+    ``max_items`` elements.
+
+    Renderings of numbers, and of strings and bytes up to ``max_string``
+    long, are kept in an LRU cache of ``cache_size`` entries; 0 disables
+    the cache.
+    """
+
+    # reprlib.Repr only defines this itself from Python 3.11 on
+    fillvalue = "..."
+
+    def __init__(
+        self,
+        max_length: int = DEFAULT_MAX_LENGTH,
+        max_depth: int = DEFAULT_MAX_DEPTH,
+        max_items: int = DEFAULT_MAX_ITEMS,
+        max_string: int = DEFAULT_MAX_STRING,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+    ):
+        """Set the limits and create the rendering cache."""
+        super().__init__()
+        for name, value in (
+            ("max_length", max_length),
+            ("max_depth", max_depth),
+            ("max_items", max_items),
+            ("max_string", max_string),
+        ):
+            if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+                msg = f"{name} must be a positive integer"
+                raise ValueError(msg)
+        if not isinstance(cache_size, int) or cache_size < 0:
+            msg = "cache_size must be a non-negative integer"
+            raise ValueError(msg)
+
+        self.max_length = max_length
+        self.max_depth = max_depth
+        self.max_items = max_items
+        self.max_string = max_string
+        self.cache_size = cache_size
+
+        # reprlib's own limits, used by the inherited container methods
+        self.maxlevel = max_depth
+        self.maxtuple = self.maxlist = self.maxarray = self.maxdeque = max_items
+        self.maxdict = self.maxset = self.maxfrozenset = max_items
+        self.maxstring = max_string
+        self.maxlong = self.maxother = max_length
+
+        self._cached_render = None
+        if cache_size:
+            self._cached_render = functools.lru_cache(maxsize=cache_size)(self._render)
+
+    def __call__(self, value: Any) -> str:
+        """Return the bounded rendering of ``value``."""
+        cls = type(value)
+        if (
+            cls in _CACHED_TYPES
+            and self._cached_render is not None
+            and (cls not in _STRING_TYPES or len(value) <= self.max_string)
+        ):
+            # The type is part of the key, since 1, 1.0 and True are equal
+            return self._cached_render(cls, value)
+        return self._render(cls, value)
+
+    def cache_info(self) -> Any:
+        """Return the hit and miss counters of the rendering cache, or None."""
+        if self._cached_render is None:
+            return None
+        return self._cached_render.cache_info()
+
+    def _render(self, cls: type, value: Any) -> str:
+        text = self.repr1(value, self.maxlevel)
+        if len(text) > self.max_length:
+            text = text[: max(self.max_length - 3, 0)] + self.fillvalue
+        return text
+
+    def repr1(self, x: Any, level: int) -> str:
+        """Render ``x`` with ``level`` levels of nesting left."""
+        text = super().repr1(x, level)
+        if type(x) in _SIZED_TYPES and len(x) > self.max_items:
+            return f"{text} ({len(x)} items)"
+        return text
+
+    def repr_str(self, x: str, level: int) -> str:
+        """Render a string, cut off after ``max_string`` characters."""
+        if len(x) <= self.max_string:
+            return builtins.repr(x)
+        return f"{x[: self.max_string]!r}... ({len(x)} chars)"
+
+    def repr_bytes(self, x: bytes, level: int) -> str:
+        """Render bytes, cut off after ``max_string`` bytes."""
+        if len(x) <= self.max_string:
+            return builtins.repr(x)
+        return f"{x[: self.max_string]!r}... ({len(x)} bytes)"
+
+    def repr_bytearray(self, x: bytearray, level: int) -> str:
+        """Render a bytearray, or summarize it when it is long."""
+        if len(x) <= self.max_string:
+            return builtins.repr(x)
+        return f"<bytearray len={len(x)}>"
+
+    def repr_memoryview(self, x: memoryview, level: int) -> str:
+        """Summarize a memoryview without reading the memory behind it."""
+        if x.obj is None:
+            # Released views raise on every other attribute
+            return "<released memoryview>"
+        return f"<memoryview nbytes={x.nbytes} format={x.format!r} shape={x.shape}>"
+
+    def repr_dict(self, x: dict, level: int) -> str:
+        """Render the first ``max_items`` items of a dict in insertion order."""
+        if not x:
+            return "{}"
+        if level <= 0:
+            return "{" + self.fillvalue + "}"
+        repr1 = self.repr1
+        pieces = [
+            f"{repr1(key, level - 1)}: {repr1(value, level - 1)}"
+            for key, value in islice(x.items(), self.maxdict)
+        ]
+        if len(x) > self.maxdict:
+            pieces.append(self.fillvalue)
+        return "{" + ", ".join(pieces) + "}"
+
+    def repr_set(self, x: set, level: int) -> str:
+        """Render the first ``max_items`` items of a set, unsorted."""
+        if not x:
+            return "set()"
+        return self._repr_iterable(x, level, "{", "}", self.maxset)
+
+    def repr_frozenset(self, x: frozenset, level: int) -> str:
+        """Render the first ``max_items`` items of a frozenset, unsorted."""
+        if not x:
+            return "frozenset()"
+        return self._repr_iterable(x, level, "frozenset({", "})", self.maxfrozenset)
+
+    def repr_instance(self, x: Any, level: int) -> str:
+        """Render any other object, summarizing large array-like ones."""
+        cls = type(x)
+        if hasattr(cls, "shape") and (hasattr(cls, "dtype") or hasattr(cls, "dtypes")):
+            summary = self._array_summary(x)
+            if summary is not None:
+                return summary
+        return super().repr_instance(x, level)
+
+    def _array_summary(self, x: Any) -> Optional[str]:
+        try:
+            size = x.size
+            if callable(size):
+                # torch.Tensor.size() returns the shape
+                size = x.numel()
+            if size <= self.max_items:
+                return None
+            shape = tuple(x.shape)
+        except Exception:
+            return None
+        dtype = getattr(x, "dtype", None)
+        details = f" dtype={dtype}" if dtype is not None else ""
+        return f"<{type(x).__name__} shape={shape}{details}>"
+
+
+# Renderer of sinks whose trace hook was configured without one
+DEFAULT_RENDERER = ValueRenderer()
@@ -0,0 +1,61 @@
+"""Call sampling for spewer trace hooks."""
+
+from __future__ import annotations
+
+import itertools
+import random
+import threading
+from typing import Any
+
+
+class _SampleState(threading.local):
+    # Outermost traced frame running on this thread, and whether it is sampled
+    root: Any = None
+    sampled: bool = False
+
+
+class Sampler:
+    """Decide which top-level calls are traced.
+
+    A top-level call is a call into traced code made while no other traced
+    call is running on the same thread. The decision is taken once, when it
+    starts, and applies to everything it calls until it returns: one in
+    every ``every`` top-level calls is considered, and each of those is
+    traced with probability ``rate``.
+    """
+
+    def __init__(self, every: int = 1, rate: float = 1.0):
+        """Initialize the sampler."""
+        self.every = every
+        self.rate = rate
+        self._calls = itertools.count()
+        self._random = random.random
+        self._state = _SampleState()
+
+    def enter(self, frame: Any) -> bool:
+        """Record a traced call and return whether it is sampled."""
+        state = self._state
+        if state.root is not None:
+            return state.sampled
+
+        sampled = (self.every == 1 or next(self._calls) % self.every == 0) and (
+            self.rate >= 1.0 or self._random() < self.rate
+        )
+        state.root = frame
+        state.sampled = sampled
+        return sampled
+
+    def leave(self, frame: Any) -> None:
+        """Record that a frame returned, ending its sample if it started one."""
+        if frame is self._state.root:
+            self._state.root = None
+
+    def is_root(self, frame: Any) -> bool:
+        """Return whether the frame is the current top-level call."""
+        return frame is self._state.root
+
+    @property
+    def active(self) -> bool:
+        """Whether a sampled call is running on this thread."""
+        state = self._state
+        return state.root is not None and state.sampled
@@ -0,0 +1,72 @@
+"""Per-frame shadows of traced values, for reporting only what changed."""
+
+from __future__ import annotations
+
+import threading
+from typing import Any
+
+DEFAULT_MAX_FRAMES = 1024
+
+# Equal values of these types are interchangeable, so a new but equal
+# object does not count as a change
+_SCALAR_TYPES = frozenset({bool, int, float, complex, str, bytes, type(None)})
+
+_MISSING = object()
+
+
+class _Frames(threading.local):
+    shadows: Any = None
+
+
+class ValueShadow:
+    """Remember the values last reported in each frame.
+
+    :meth:`changed` keeps the names whose value is not the object reported
+    last time. Objects are compared by identity first, so a value that did
+    not change is never rendered again; only scalars such as numbers and
+    strings are also compared by value. In-place changes to a mutable object,
+    like appending to a list, are therefore not reported.
+
+    Shadows are kept per thread and dropped by :meth:`forget` when their frame
+    exits. Frames that never report their exit, like abandoned generators,
+    are evicted oldest first once a thread has ``max_frames`` of them.
+    """
+
+    def __init__(self, max_frames: int = DEFAULT_MAX_FRAMES):
+        """Initialize an empty shadow."""
+        self.max_frames = max_frames
+        self._frames = _Frames()
+
+    def changed(
+        self, frame: Any, values: tuple[tuple[str, Any], ...]
+    ) -> tuple[tuple[str, Any], ...]:
+        """Return the ``(name, value)`` pairs that changed, and remember them."""
+        shadows = self._frames.shadows
+        if shadows is None:
+            shadows = self._frames.shadows = {}
+        shadow = shadows.get(frame)
+        if shadow is None:
+            if len(shadows) >= self.max_frames:
+                del shadows[next(iter(shadows))]
+            shadow = shadows[frame] = {}
+
+        changed = []
+        for name, value in values:
+            previous = shadow.get(name, _MISSING)
+            if previous is value:
+                continue
+            shadow[name] = value
+            if (
+                type(previous) is type(value)
+                and type(value) in _SCALAR_TYPES
+                and previous == value
+            ):
+                continue
+            changed.append((name, value))
+        return tuple(changed)
+
+    def forget(self, frame: Any) -> None:
+        """Drop the shadow of a frame that exited."""
+        shadows = self._frames.shadows
+        if shadows:
+            shadows.pop(frame, None)
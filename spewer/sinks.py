@@ -0,0 +1,379 @@
+"""Output sinks for spewer debugging library."""
+
+from __future__ import annotations
+
+import atexit
+import os
+import queue
+import sys
+import threading
+import weakref
+from pathlib import Path
+from typing import IO, Any, Callable, Optional, Union
+
+from .events import format_event
+from .render import DEFAULT_RENDERER
+
+DEFAULT_BUFFER_SIZE = 64 * 1024
+DEFAULT_QUEUE_SIZE = 10000
+QUEUE_POLICIES = ("block", "drop_newest", "drop_oldest")
+
+# Replaced by the process id in sink paths, giving each process its own file
+PID_PLACEHOLDER = "{pid}"
+
+# Buffering sinks still alive, flushed when the interpreter exits
+_live_sinks: weakref.WeakSet[Sink] = weakref.WeakSet()
+
+# Queued by AsyncSink.close() to stop the writer thread
+_STOP = object()
+
+# Idents of running writer threads, never traced when tracing all threads
+writer_threads: set[int] = set()
+
+
+@atexit.register
+def _flush_live_sinks() -> None:
+    for sink in list(_live_sinks):
+        sink.flush()
+
+
+def _after_fork_in_child() -> None:
+    # Only the thread that forked survives in the child
+    writer_threads.clear()
+    for sink in list(_live_sinks):
+        sink._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    # Flushing first means the child never inherits pending output
+    os.register_at_fork(before=_flush_live_sinks, after_in_child=_after_fork_in_child)
+
+
+def pid_path(path: Union[str, Path]) -> Path:
+    """Return ``path`` with ``{pid}`` replaced by the current process id."""
+    return Path(str(path).replace(PID_PLACEHOLDER, str(os.getpid())))
+
+
+class Sink:
+    """Destination for formatted trace output.
+
+    ``write`` receives complete lines, each ending with a newline.
+    ``renderer`` turns the values of raw events into text; the trace hook
+    sets it from ``SpewConfig.renderer``.
+    """
+
+    renderer: Callable[[Any], str] = DEFAULT_RENDERER
+    # Whether the sink takes events from several threads as they happen, so
+    # tracing all threads does not need to buffer its events per thread
+    records_threads = False
+
+    def write(self, text: str) -> None:
+        """Write trace output."""
+        raise NotImplementedError
+
+    def submit(self, event: tuple) -> None:
+        """Format a raw trace event and write it."""
+        self.write(format_event(event, self.renderer))
+
+    def flush(self) -> None:
+        """Write out any buffered output."""
+
+    def close(self) -> None:
+        """Flush and release the sink's resources."""
+        self.flush()
+
+    def _after_fork(self) -> None:
+        """Reset state inherited from the parent, in a forked child process."""
+
+
+class BufferedSink(Sink):
+    """Sink that batches writes into chunks of at least ``buffer_size``."""
+
+    def __init__(self, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        """Initialize the sink; a ``buffer_size`` of 0 disables buffering."""
+        if not isinstance(buffer_size, int) or buffer_size < 0:
+            msg = "buffer_size must be a non-negative integer"
+            raise ValueError(msg)
+        self.buffer_size = buffer_size
+        self._buffer: list[str] = []
+        self._size = 0
+        if buffer_size:
+            _live_sinks.add(self)
+
+    def write(self, text: str) -> None:
+        """Buffer trace output, writing it out once the buffer is full."""
+        if not self.buffer_size:
+            self._write_out(text)
+            return
+        self._buffer.append(text)
+        self._size += len(text)
+        if self._size >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write out buffered output as a single chunk."""
+        buffer, self._buffer = self._buffer, []
+        self._size = 0
+        if buffer:
+            self._write_out("".join(buffer))
+
+    def _write_out(self, data: str) -> None:
+        """Write a chunk of output to the underlying destination."""
+        raise NotImplementedError
+
+    def _after_fork(self) -> None:
+        self._buffer = []
+        self._size = 0
+
+
+class StreamSink(BufferedSink):
+    """Write trace output to a text stream.
+
+    Without a stream, output goes to whatever ``sys.stdout`` is at the time
+    of writing, as ``print()`` would. Unbuffered by default.
+    """
+
+    def __init__(self, stream: Optional[IO[str]] = None, buffer_size: int = 0):
+        """Initialize the sink for a stream, or ``sys.stdout`` if None."""
+        super().__init__(buffer_size)
+        self.stream = stream
+
+    def _write_out(self, data: str) -> None:
+        stream = self.stream if self.stream is not None else sys.stdout
+        stream.write(data)
+
+    def flush(self) -> None:
+        """Write out buffered output and flush the stream."""
+        super().flush()
+        stream = self.stream if self.stream is not None else sys.stdout
+        stream.flush()
+
+
+class FileSink(BufferedSink):
+    """Write buffered trace output to a file.
+
+    If ``path`` contains ``{pid}``, it is replaced by the process id, and a
+    forked child process switches to a file of its own.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        mode: str = "w",
+    ):
+        """Open ``path`` for writing trace output."""
+        super().__init__(buffer_size)
+        self.template = str(path)
+        self.mode = mode
+        self.path = pid_path(path)
+        self._file: Optional[IO[str]] = self.path.open(mode, encoding="utf-8")
+        _live_sinks.add(self)
+
+    def _write_out(self, data: str) -> None:
+        if self._file is not None:
+            self._file.write(data)
+
+    def flush(self) -> None:
+        """Write out buffered output and flush the file."""
+        super().flush()
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self) -> None:
+        """Flush and close the file."""
+        if self._file is None:
+            return
+        self.flush()
+        self._file.close()
+        self._file = None
+        _live_sinks.discard(self)
+
+    def _after_fork(self) -> None:
+        super()._after_fork()
+        if self._file is None or PID_PLACEHOLDER not in self.template:
+            return
+        self._file.close()
+        self.path = pid_path(self.template)
+        self._file = self.path.open(self.mode, encoding="utf-8")
+
+
+class MemorySink(Sink):
+    """Collect trace output in memory."""
+
+    def __init__(self):
+        """Initialize an empty sink."""
+        self._chunks: list[str] = []
+
+    def write(self, text: str) -> None:
+        """Append trace output."""
+        self._chunks.append(text)
+
+    def getvalue(self) -> str:
+        """Return all output written so far."""
+        return "".join(self._chunks)
+
+    def clear(self) -> None:
+        """Discard collected output."""
+        self._chunks.clear()
+
+
+class NullSink(Sink):
+    """Discard trace output, leaving only the cost of the hook itself."""
+
+    def write(self, text: str) -> None:
+        """Discard trace output."""
+
+    def submit(self, event: tuple) -> None:
+        """Discard a raw event without formatting it."""
+
+
+class AsyncSink(Sink):
+    """Format and write trace output on a background thread.
+
+    The traced thread only puts raw events on a bounded queue; ``repr()``,
+    formatting and I/O happen on the writer thread, which passes the text
+    to the wrapped sink. Values are therefore rendered as they are when the
+    writer gets to them, not as they were when the event happened.
+
+    When the queue is full, ``policy`` decides what happens: ``"block"``
+    waits for room, ``"drop_newest"`` discards the new event and
+    ``"drop_oldest"`` discards the oldest queued one. ``dropped`` counts
+    every discarded event.
+    """
+
+    def __init__(
+        self,
+        sink: Sink,
+        maxsize: int = DEFAULT_QUEUE_SIZE,
+        policy: str = "block",
+    ):
+        """Start a writer thread feeding ``sink``."""
+        if not isinstance(sink, Sink):
+            msg = "sink must be a Sink instance"
+            raise TypeError(msg)
+        if not isinstance(maxsize, int) or maxsize < 1:
+            msg = "maxsize must be a positive integer"
+            raise ValueError(msg)
+        if policy not in QUEUE_POLICIES:
+            msg = f"policy must be one of {', '.join(QUEUE_POLICIES)}"
+            raise ValueError(msg)
+
+        self.sink = sink
+        self.maxsize = maxsize
+        self.policy = policy
+        self.dropped = 0
+        self._start()
+        _live_sinks.add(self)
+
+    def _start(self) -> None:
+        self._queue: queue.Queue = queue.Queue(self.maxsize)
+        self._drop_lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._run, name="spewer-writer", daemon=True
+        )
+        self._thread.start()
+
+    def _after_fork(self) -> None:
+        # The writer thread did not survive the fork, and its queue and locks
+        # may have been in use at the time
+        self._start()
+
+    def write(self, text: str) -> None:
+        """Queue already formatted output."""
+        self._put(text)
+
+    def submit(self, event: tuple) -> None:
+        """Queue a raw event to be formatted by the writer thread."""
+        self._put(event)
+
+    def _put(self, item: object) -> None:
+        if self.policy == "block":
+            self._queue.put(item)
+            return
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._drop_lock:
+                if self.policy == "drop_newest":
+                    self.dropped += 1
+                    return
+                while True:
+                    try:
+                        self._queue.get_nowait()
+                    except queue.Empty:
+                        pass
+                    else:
+                        self._queue.task_done()
+                        self.dropped += 1
+                    try:
+                        self._queue.put_nowait(item)
+                    except queue.Full:
+                        continue
+                    return
+
+    def _run(self) -> None:
+        """Writer thread: format queued items and write them in batches."""
+        ident = threading.get_ident()
+        writer_threads.add(ident)
+        get = self._queue.get
+        get_nowait = self._queue.get_nowait
+        try:
+            while True:
+                batch = [get()]
+                try:
+                    while len(batch) < 1024:
+                        batch.append(get_nowait())
+                except queue.Empty:
+                    pass
+
+                stop = self._write_batch(batch)
+                for _ in batch:
+                    self._queue.task_done()
+                if stop:
+                    return
+        finally:
+            writer_threads.discard(ident)
+
+    def _write_batch(self, batch: list) -> bool:
+        """Write a batch of queued items; return whether a stop was queued."""
+        stop = False
+        chunks = []
+        for item in batch:
+            if item is _STOP:
+                stop = True
+            elif isinstance(item, str):
+                chunks.append(item)
+            else:
+                try:
+                    chunks.append(format_event(item, self.renderer))
+                except Exception as exc:
+                    # A failing repr() must not kill the writer thread
+                    chunks.append(f"<spewer: unformattable {item[0]} event: {exc!r}>\n")
+        if chunks:
+            self.sink.write("".join(chunks))
+        return stop
+
+    def flush(self) -> None:
+        """Wait until every queued item is written, then flush the sink."""
+        if self._thread.is_alive():
+            self._queue.join()
+        else:
+            # No writer left (e.g. after close), so drain on this thread
+            batch = []
+            try:
+                while True:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            self._write_batch(batch)
+        self.sink.flush()
+
+    def close(self) -> None:
+        """Write out queued items, stop the writer thread and close the sink."""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+        self.flush()
+        self.sink.close()
+        _live_sinks.discard(self)
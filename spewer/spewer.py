@@ -2,53 +2,440 @@
 
 from __future__ import annotations
 
+import functools
+import inspect
 import sys
-from typing import Optional
+import threading
+from typing import TYPE_CHECKING, Any, Callable, NamedTuple, Optional
 
+from . import monitoring
+from .chain import ChainedTracer
 from .config import SpewConfig
+from .sinks import Sink  # noqa: TC001
+from .tasks import tracing
 from .trace import TraceHook
 
+if TYPE_CHECKING:
+    import contextvars
 
-def spew(
+
+class _Installation(NamedTuple):
+    """A hook installed by spew(), and what it was installed over."""
+
+    hook: TraceHook
+    # sys.monitoring backend, or None when the hook is a trace function
+    backend: Optional[monitoring.MonitoringBackend]
+    # Function passed to sys.settrace or sys.setprofile, and the one it replaced
+    tracer: Any
+    previous: Any
+    # Function the threading module gave new threads, with all_threads
+    previous_for_threads: Any
+    profile: bool
+    # Whether the hook below was paused while this one is installed
+    paused_below: bool
+    # Thread that installed the hook, and whether it traces other threads too
+    thread: int
+    all_threads: bool
+
+
+# Hooks installed by spew() in any thread, innermost last. Settrace and
+# setprofile are per thread, so each thread nests only the hooks it sees.
+_installations: list[_Installation] = []
+_installations_lock = threading.Lock()
+# Hook installed last by any thread, and its sys.monitoring backend
+_active_hook: Optional[TraceHook] = None
+_monitoring_backend: Optional[monitoring.MonitoringBackend] = None
+
+
+def _set_all_threads(func: Any, profile: bool) -> None:
+    """Set the trace or profile function of every thread, running and future.
+
+    Before Python 3.12 threads that are already running are not affected.
+    """
+    if profile:
+        if hasattr(threading, "setprofile_all_threads"):
+            threading.setprofile_all_threads(func)
+        else:
+            threading.setprofile(func)
+            sys.setprofile(func)
+    elif hasattr(threading, "settrace_all_threads"):
+        threading.settrace_all_threads(func)
+    else:
+        threading.settrace(func)
+        sys.settrace(func)
+
+
+def _set_tracer(func: Any, profile: bool, all_threads: bool) -> None:
+    """Set the trace or profile function of this thread, or of every thread."""
+    if all_threads:
+        _set_all_threads(func, profile=profile)
+    elif profile:
+        sys.setprofile(func)
+    else:
+        sys.settrace(func)
+
+
+def _restore(installation: _Installation) -> None:
+    """Put back the trace or profile function a hook was installed over."""
+    all_threads = installation.hook.config.all_threads
+    current = sys.getprofile() if installation.profile else sys.gettrace()
+    # A trace function installed after spewer's is left alone
+    if current is not installation.tracer and not all_threads:
+        return
+    if not all_threads:
+        _set_tracer(installation.previous, installation.profile, all_threads=False)
+        return
+    # The functions other threads had before cannot be read, so they get
+    # none back; only the installing thread gets its previous function
+    _set_all_threads(None, profile=installation.profile)
+    if threading.get_ident() == installation.thread:
+        _set_tracer(installation.previous, installation.profile, all_threads=False)
+    if installation.profile:
+        threading.setprofile(installation.previous_for_threads)
+    else:
+        threading.settrace(installation.previous_for_threads)
+
+
+def _pause(installation: _Installation) -> None:
+    """Stop a hook from seeing events while another one is installed."""
+    if installation.backend is not None:
+        installation.backend.pause()
+    else:
+        _restore(installation)
+
+
+def _resume(installation: _Installation) -> None:
+    """Let a paused hook see events again."""
+    if installation.backend is not None:
+        installation.backend.resume()
+        return
+    _set_tracer(
+        installation.tracer,
+        installation.profile,
+        installation.hook.config.all_threads,
+    )
+
+
+def _uses_profile(config: SpewConfig) -> bool:
+    """Return whether a hook is a profile function rather than a trace function."""
+    # Use setprofile for functions_only mode to capture built-ins; a heatmap
+    # needs lines. Stats mode uses settrace, which skips untraced frames.
+    return config.functions_only and not config.heatmap
+
+
+def _tracer(hook: TraceHook, previous: Any) -> Any:
+    """Return the function to install for a hook, chained to ``previous``."""
+    if hook.config.chain and previous is not None:
+        return ChainedTracer(hook, previous)
+    return hook
+
+
+def _prefers_monitoring(config: SpewConfig) -> bool:
+    """Return whether ``backend="auto"`` drives a hook from sys.monitoring."""
+    # sys.monitoring events fire in every thread, so a hook for one thread
+    # would slow down all the others; settrace only costs the traced thread
+    if not (monitoring.AVAILABLE and config.all_threads):
+        return False
+    # Settrace gives a skipped call, or any call of an untraced task, no
+    # local trace function, while LINE events would still reach spewer for
+    # every line it runs
+    sampled = config.sample_every > 1 or config.sample_rate < 1.0
+    return not (sampled or config.max_depth is not None or config.task_scoped)
+
+
+def _seen_by(thread: int) -> list[_Installation]:
+    """Return the installations whose hooks see events of ``thread``."""
+    seen = []
+    # A loop, not a comprehension: this runs under the hook being removed
+    for installation in _installations:
+        if installation.all_threads or installation.thread == thread:
+            seen.append(installation)  # noqa: PERF401
+    return seen
+
+
+def _innermost() -> Optional[_Installation]:
+    """Return the innermost installation seen by the calling thread, if any."""
+    seen = _seen_by(threading.get_ident())
+    return seen[-1] if seen else None
+
+
+def _install(hook: TraceHook) -> _Installation:
+    """Install the hook with the backend selected by its configuration."""
+    config = hook.config
+    thread = threading.get_ident()
+    # Spewer's writer threads get these back; see TraceHook._skips_context()
+    hook.previous_trace = sys.gettrace()
+    hook.previous_profile = sys.getprofile()
+    # Unless chained, an inner hook is the only one that sees events
+    below = _seen_by(thread)
+    paused_below = bool(below) and not config.chain
+    if paused_below:
+        _pause(below[-1])
+
+    backend = config.backend
+    if backend == "monitoring" or (backend == "auto" and _prefers_monitoring(config)):
+        monitoring_backend = monitoring.MonitoringBackend(hook)
+        try:
+            monitoring_backend.install()
+        except RuntimeError:
+            # Another tool may hold every id; settrace still works in that case
+            if backend == "monitoring":
+                if paused_below:
+                    _resume(below[-1])
+                raise
+        else:
+            return _Installation(
+                hook,
+                monitoring_backend,
+                None,
+                None,
+                None,
+                False,
+                paused_below,
+                thread,
+                config.all_threads,
+            )
+
+    profile = _uses_profile(config)
+    previous = sys.getprofile() if profile else sys.gettrace()
+    # threading.gettrace() and getprofile() are new in Python 3.10
+    previous_for_threads = (
+        threading._profile_hook if profile else threading._trace_hook  # type: ignore[attr-defined]
+    )
+    tracer = _tracer(hook, previous)
+    _set_tracer(tracer, profile, config.all_threads)
+    return _Installation(
+        hook,
+        None,
+        tracer,
+        previous,
+        previous_for_threads,
+        profile,
+        paused_below,
+        thread,
+        config.all_threads,
+    )
+
+
+def _uninstall(installation: _Installation, covered: bool) -> None:
+    """Remove a hook and put back what it was installed over.
+
+    A ``covered`` trace function, one with another hook installed over it,
+    is left in place: that hook either paused it already or chains to it.
+    """
+    if installation.backend is not None:
+        installation.backend.uninstall()
+    elif not covered:
+        _restore(installation)
+
+
+def _spew(config: SpewConfig, hook: Optional[TraceHook] = None) -> TraceHook:
+    """Install a trace hook for a configuration, a new one unless ``hook``."""
+    global _active_hook, _monitoring_backend  # noqa: PLW0603
+
+    if hook is None:
+        hook = TraceHook(config)
+    with _installations_lock:
+        installation = _install(hook)
+        _installations.append(installation)
+        _active_hook = hook
+        _monitoring_backend = installation.backend
+    return hook
+
+
+def spew(  # noqa: PLR0913, PLR0917
     trace_names: Optional[list[str]] = None,
     show_values: bool = False,
     functions_only: bool = False,
     trace_returns: bool = False,
     trace_exceptions: bool = False,
-) -> None:
-    """Install a trace hook for detailed code execution logging."""
+    exclude_names: Optional[list[str]] = None,
+    backend: str = "auto",
+    sink: Optional[Sink] = None,
+    sample_every: int = 1,
+    sample_rate: float = 1.0,
+    rate_limit: Optional[float] = None,
+    code_rate_limit: Optional[float] = None,
+    summary_interval: float = 1.0,
+    all_threads: bool = False,
+    task_scoped: bool = False,
+    renderer: Optional[Callable[[Any], str]] = None,
+    values_mode: str = "all",
+    indent: str = "",
+    max_depth: Optional[int] = None,
+    stats: bool = False,
+    heatmap: bool = False,
+    triggers: Optional[list[str]] = None,
+    trigger_limit: Optional[int] = None,
+    chain: bool = False,
+) -> TraceHook:
+    """Install a trace hook for detailed code execution logging.
+
+    With ``backend="auto"`` the hook is driven by ``sys.monitoring`` on
+    Python 3.12+ when it traces all threads, and by ``sys.settrace``
+    otherwise. Monitoring events fire in every thread, so a hook for one
+    thread would slow down the others; ``backend="monitoring"`` forces it.
+    The installed hook is returned so its counters can be inspected.
+
+    ``trace_names`` and ``exclude_names`` accept package names, globs and
+    file-path prefixes; see ``spewer.filters.ModuleFilter``. Output goes to
+    ``sink`` (``sys.stdout`` by default) and is flushed by ``unspew()``.
+
+    ``sample_every`` and ``sample_rate`` trace only some top-level calls,
+    each with everything it calls; see ``spewer.sampling.Sampler``.
+    ``rate_limit`` and ``code_rate_limit`` cap events per second overall and
+    per code object; suppressed events are summarized every
+    ``summary_interval`` seconds.
+
+    With ``all_threads``, every thread is traced, including threads that are
+    already running on Python 3.12+, and output is buffered per thread; see
+    ``spewer.threads.ThreadBufferSink``.
+
+    With ``task_scoped``, only events from contexts inside
+    ``spewer.trace_task()`` are reported, each labelled with its asyncio task.
+
+    Values are shown by ``renderer``, a ``spewer.ValueRenderer`` with its
+    default limits unless given; pass ``repr`` for unbounded output. With
+    ``values_mode="diff"``, a line shows only the values that changed since
+    the previous line of the same call; see ``spewer.shadow.ValueShadow``.
+
+    ``indent`` is repeated before each event once per traced call level.
+    With ``max_depth``, calls nested deeper than that below the point where
+    tracing started are not traced at all; see ``spewer.depth.CallDepth``.
+
+    With ``stats``, no events are written; traced functions are counted and
+    timed instead, and ``unspew()`` writes a table of the results. The
+    hook's ``stats`` attribute gives access to the rows. With ``heatmap``,
+    executions of each traced line are counted instead, and ``unspew()``
+    writes the source of every traced file annotated with the counts.
+
+    With ``triggers``, a list of ``module:qualname`` specs, the hook stays
+    dormant and traces nothing until a thread enters one of those functions;
+    that call and everything it runs are traced, then the hook is dormant
+    again. ``trigger_limit`` lets only the first that many trigger calls
+    fire; see ``spewer.triggers.Triggers``.
+
+    The trace or profile function the hook replaces, such as coverage.py's,
+    is restored by ``unspew()``, and so is a hook installed by an enclosing
+    ``spew()`` or ``SpewContext``. While the new hook is installed it is
+    the only one that sees events, unless ``chain`` is set: then events are
+    passed on to the replaced function as well (see
+    ``spewer.chain.ChainedTracer``), and enclosing hooks keep tracing.
+    """
     config = SpewConfig(
         trace_names=trace_names,
         show_values=show_values,
         functions_only=functions_only,
         trace_returns=trace_returns,
         trace_exceptions=trace_exceptions,
+        exclude_names=exclude_names,
+        backend=backend,
+        sink=sink,
+        sample_every=sample_every,
+        sample_rate=sample_rate,
+        rate_limit=rate_limit,
+        code_rate_limit=code_rate_limit,
+        summary_interval=summary_interval,
+        all_threads=all_threads,
+        task_scoped=task_scoped,
+        renderer=renderer,
+        values_mode=values_mode,
+        indent=indent,
+        max_depth=max_depth,
+        stats=stats,
+        heatmap=heatmap,
+        triggers=triggers,
+        trigger_limit=trigger_limit,
+        chain=chain,
     )
-    hook = TraceHook(config)
-
-    # Use setprofile for functions_only mode to capture built-ins
-    if functions_only:
-        sys.setprofile(hook)
-    else:
-        sys.settrace(hook)
+    return _spew(config)
 
 
 def unspew() -> None:
-    """Remove the trace hook installed by spew."""
-    sys.settrace(None)
-    sys.setprofile(None)
+    """Remove the innermost hook tracing this thread and flush its output.
+
+    That is the hook installed last by spew() in this thread, or with
+    ``all_threads`` in any thread. The trace and profile functions it was
+    installed over are restored, and so is the hook of an enclosing
+    ``SpewContext``.
+    """
+    hook = _remove()
+    if hook is not None:
+        hook.write_reports()
+        hook.flush()
+
+
+def _remove(hook: Optional[TraceHook] = None) -> Optional[TraceHook]:
+    """Uninstall a hook without flushing its output.
+
+    ``hook`` defaults to the innermost hook seen by the calling thread.
+    Returns the removed hook, or None when it was not installed.
+    """
+    global _active_hook, _monitoring_backend  # noqa: PLW0603
+
+    with _installations_lock:
+        installation = None
+        if hook is None:
+            installation = _innermost()
+        else:
+            for each in _installations:
+                if each.hook is hook:
+                    installation = each
+        if installation is None:
+            return None
+
+        seen = _seen_by(installation.thread)
+        position = seen.index(installation)
+        below = seen[position - 1] if position else None
+        above = seen[position + 1] if position + 1 < len(seen) else None
+        _installations.remove(installation)
+        _uninstall(installation, covered=above is not None)
+        if installation.paused_below and below is not None:
+            if above is None:
+                _resume(below)
+            elif not above.paused_below:
+                # The hook below stays paused until the one above is removed
+                index = _installations.index(above)
+                _installations[index] = above._replace(paused_below=True)
+
+        if _installations:
+            _active_hook = _installations[-1].hook
+            _monitoring_backend = _installations[-1].backend
+        else:
+            _active_hook = None
+            _monitoring_backend = None
+    return installation.hook
 
 
 class SpewContext:
     """Context manager for automatic spew/unspew operations."""
 
-    def __init__(
+    def __init__(  # noqa: PLR0913, PLR0917
         self,
         trace_names: Optional[list[str]] = None,
         show_values: bool = False,
         functions_only: bool = False,
         trace_returns: bool = False,
         trace_exceptions: bool = False,
+        exclude_names: Optional[list[str]] = None,
+        backend: str = "auto",
+        sink: Optional[Sink] = None,
+        sample_every: int = 1,
+        sample_rate: float = 1.0,
+        rate_limit: Optional[float] = None,
+        code_rate_limit: Optional[float] = None,
+        summary_interval: float = 1.0,
+        all_threads: bool = False,
+        task_scoped: bool = False,
+        renderer: Optional[Callable[[Any], str]] = None,
+        values_mode: str = "all",
+        indent: str = "",
+        max_depth: Optional[int] = None,
+        stats: bool = False,
+        heatmap: bool = False,
+        triggers: Optional[list[str]] = None,
+        trigger_limit: Optional[int] = None,
+        chain: bool = False,
     ):
         self.config = SpewConfig(
             trace_names=trace_names,
@@ -56,18 +443,192 @@ class SpewContext:
             functions_only=functions_only,
             trace_returns=trace_returns,
             trace_exceptions=trace_exceptions,
+            exclude_names=exclude_names,
+            backend=backend,
+            sink=sink,
+            sample_every=sample_every,
+            sample_rate=sample_rate,
+            rate_limit=rate_limit,
+            code_rate_limit=code_rate_limit,
+            summary_interval=summary_interval,
+            all_threads=all_threads,
+            task_scoped=task_scoped,
+            renderer=renderer,
+            values_mode=values_mode,
+            indent=indent,
+            max_depth=max_depth,
+            stats=stats,
+            heatmap=heatmap,
+            triggers=triggers,
+            trigger_limit=trigger_limit,
+            chain=chain,
         )
+        self.hook: Optional[TraceHook] = None
+        self._token: Optional[contextvars.Token] = None
 
     def __enter__(self):
-        spew(
-            self.config.trace_names,
-            self.config.show_values,
-            self.config.functions_only,
-            self.config.trace_returns,
-            self.config.trace_exceptions,
-        )
+        self.hook, self._token = _start(self.config)
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        unspew()
+        _stop(self.hook, self._token)
+        self._token = None
         return False
+
+
+def _start(
+    config: SpewConfig, hook: Optional[TraceHook] = None
+) -> tuple[TraceHook, Optional[contextvars.Token]]:
+    """Install a hook around a block of code, returning it and a tracing token.
+
+    ``hook`` reinstalls a hook removed by ``_stop(..., finish=False)``.
+    """
+    token = None
+    if config.task_scoped:
+        # A task-scoped hook traces the code it wraps, as trace_task() would
+        token = tracing.set(True)
+    return _spew(config, hook), token
+
+
+def _stop(
+    hook: Optional[TraceHook],
+    token: Optional[contextvars.Token],
+    finish: bool = True,
+) -> None:
+    """Remove the hook installed by _start(), then if ``finish`` is set
+    write its reports and flush its output."""
+    if hook is not None and _remove(hook) is not None and finish:
+        hook.write_reports()
+        hook.flush()
+    if token is not None:
+        tracing.reset(token)
+
+
+def _traced_generator(func: Callable, config: SpewConfig) -> Callable:
+    """Wrap a generator function to trace it each time it is resumed."""
+
+    @functools.wraps(func)
+    def traced_generator(*args: Any, **kwargs: Any) -> Any:
+        generator = func(*args, **kwargs)
+        hook = None
+        method, value = generator.send, None
+        try:
+            while True:
+                # The consumer runs between items, so the hook is only
+                # installed while the generator itself runs
+                installs = _innermost() is None
+                if installs:
+                    hook, token = _start(config, hook)
+                try:
+                    item = method(value)
+                except StopIteration as stop:
+                    return stop.value
+                finally:
+                    if installs:
+                        _stop(hook, token, finish=False)
+                try:
+                    value = yield item
+                    method = generator.send
+                except GeneratorExit:
+                    generator.close()
+                    raise
+                except BaseException as exc:
+                    method, value = generator.throw, exc
+        finally:
+            if hook is not None:
+                hook.write_reports()
+                hook.flush()
+
+    return traced_generator
+
+
+def _traced_async_generator(func: Callable, config: SpewConfig) -> Callable:
+    """Wrap an async generator function like _traced_generator()."""
+
+    @functools.wraps(func)
+    async def traced_async_generator(*args: Any, **kwargs: Any) -> Any:
+        generator = func(*args, **kwargs)
+        hook = None
+        method, value = generator.asend, None
+        try:
+            while True:
+                installs = _innermost() is None
+                if installs:
+                    hook, token = _start(config, hook)
+                try:
+                    item = await method(value)
+                except StopAsyncIteration:
+                    return
+                finally:
+                    if installs:
+                        _stop(hook, token, finish=False)
+                try:
+                    value = yield item
+                    method = generator.asend
+                except GeneratorExit:
+                    await generator.aclose()
+                    raise
+                except BaseException as exc:
+                    method, value = generator.athrow, exc
+        finally:
+            if hook is not None:
+                hook.write_reports()
+                hook.flush()
+
+    return traced_async_generator
+
+
+def spew_function(func: Optional[Callable] = None, /, **options: Any) -> Any:
+    """Trace a function and everything it calls, but only while it runs.
+
+    Use as ``@spew_function`` or ``@spew_function(trace_names=[...])`` with
+    any ``SpewConfig`` option; the options are validated when the function
+    is decorated. Each call installs a hook on entry and removes it when the
+    function returns, so the rest of the program is not traced and pays
+    nothing but the check whether spewer is already tracing.
+
+    Calls made while spewer is already tracing the calling thread, such as
+    recursive calls or calls inside a ``SpewContext``, run under the active
+    hook. Calls from other threads meanwhile install hooks of their own,
+    unless ``all_threads`` is set. Coroutine functions
+    are traced until their coroutine finishes; use ``task_scoped=True`` to
+    leave out the other tasks the event loop runs meanwhile.
+
+    Generator and async generator functions are traced while they run,
+    from each resumption to the next item, but not while their consumer
+    runs in between. Their output is flushed when they finish.
+    """
+    config = SpewConfig(**options)
+
+    def decorate(func: Callable) -> Callable:
+        if inspect.isgeneratorfunction(func):
+            return _traced_generator(func, config)
+        if inspect.isasyncgenfunction(func):
+            return _traced_async_generator(func, config)
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def traced_coroutine(*args: Any, **kwargs: Any) -> Any:
+                if _innermost() is not None:
+                    return await func(*args, **kwargs)
+                hook, token = _start(config)
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    _stop(hook, token)
+
+            return traced_coroutine
+
+        @functools.wraps(func)
+        def traced(*args: Any, **kwargs: Any) -> Any:
+            if _innermost() is not None:
+                return func(*args, **kwargs)
+            hook, token = _start(config)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _stop(hook, token)
+
+        return traced
+
+    return decorate if func is None else decorate(func)
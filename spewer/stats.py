@@ -0,0 +1,174 @@
+"""Per-function call statistics for spewer trace hooks."""
+
+from __future__ import annotations
+
+import threading
+import time
+from array import array
+from typing import Any, Callable, NamedTuple
+
+from .cache import CodeInfo  # noqa: TC001
+
+SORT_KEYS = ("total", "self", "calls")
+
+
+class FunctionStats(NamedTuple):
+    """Call count and times of one function, in nanoseconds."""
+
+    module: str
+    func_name: str
+    lineno: int
+    calls: int
+    total_ns: int
+    self_ns: int
+
+
+class _Counters:
+    """Counters of one thread, indexed like ``CallStats._infos``."""
+
+    __slots__ = ("active", "calls", "self_ns", "stack", "total_ns")
+
+    def __init__(self):
+        self.calls = array("Q")
+        self.total_ns = array("Q")
+        self.self_ns = array("Q")
+        # Running calls per function, so recursion is timed only once
+        self.active = array("L")
+        # [frame, index, start, time spent in callees] per running call
+        self.stack: list[list[Any]] = []
+
+    def grow(self, size: int) -> None:
+        missing = size - len(self.calls)
+        zeros = [0] * missing
+        self.calls.extend(zeros)
+        self.total_ns.extend(zeros)
+        self.self_ns.extend(zeros)
+        self.active.extend(zeros)
+
+
+class _ThreadCounters(threading.local):
+    counters: Any = None
+
+
+class CallStats:
+    """Count the calls of each traced function and time them.
+
+    Every code object gets an index into flat ``array`` counters: the
+    number of calls, the total time (including callees, counted once for
+    recursive calls) and the self time (excluding traced callees). Each
+    thread counts into arrays of its own; :meth:`rows` adds them up.
+    Times are measured with ``time.perf_counter_ns`` between the call and
+    return events of a frame.
+    """
+
+    def __init__(
+        self,
+        describe: Callable[[Any], CodeInfo],
+        clock: Callable[[], int] = time.perf_counter_ns,
+    ):
+        """Initialize empty counters; ``describe`` maps a frame to its CodeInfo."""
+        self._describe = describe
+        self._clock = clock
+        self._index: dict[Any, int] = {}
+        self._infos: list[tuple[CodeInfo, int]] = []
+        self._lock = threading.Lock()
+        self._local = _ThreadCounters()
+        self._threads: list[_Counters] = []
+
+    def _register(self, frame: Any) -> int:
+        code = frame.f_code
+        info = self._describe(frame)
+        with self._lock:
+            index = self._index.get(code)
+            if index is None:
+                index = len(self._infos)
+                self._infos.append((info, code.co_firstlineno))
+                self._index[code] = index
+        return index
+
+    def _counters(self, index: int) -> _Counters:
+        counters = self._local.counters
+        if counters is None:
+            counters = self._local.counters = _Counters()
+            with self._lock:
+                self._threads.append(counters)
+        if index >= len(counters.calls):
+            counters.grow(len(self._infos))
+        return counters
+
+    def enter(self, frame: Any) -> None:
+        """Record the start of a call."""
+        index = self._index.get(frame.f_code)
+        if index is None:
+            index = self._register(frame)
+        counters = self._local.counters
+        if counters is None or index >= len(counters.calls):
+            counters = self._counters(index)
+        counters.calls[index] += 1
+        counters.active[index] += 1
+        counters.stack.append([frame, index, self._clock(), 0])
+
+    def leave(self, frame: Any) -> None:
+        """Record the end of a call; returns of unrecorded frames are ignored."""
+        counters = self._local.counters
+        if counters is None:
+            return
+        stack = counters.stack
+        if not stack or stack[-1][0] is not frame:
+            return
+        _, index, start, callees = stack.pop()
+        elapsed = self._clock() - start
+        counters.self_ns[index] += elapsed - callees
+        counters.active[index] -= 1
+        if not counters.active[index]:
+            counters.total_ns[index] += elapsed
+        if stack:
+            stack[-1][3] += elapsed
+
+    def rows(self, sort: str = "total") -> list[FunctionStats]:
+        """Return the statistics of every called function, sorted descending.
+
+        ``sort`` is one of ``"total"``, ``"self"`` and ``"calls"``.
+        """
+        if sort not in SORT_KEYS:
+            msg = f"sort must be one of {', '.join(SORT_KEYS)}"
+            raise ValueError(msg)
+        with self._lock:
+            infos = list(self._infos)
+            threads = list(self._threads)
+        calls = [0] * len(infos)
+        total_ns = [0] * len(infos)
+        self_ns = [0] * len(infos)
+        for counters in threads:
+            # Functions first called after the snapshot are left out
+            for index in range(min(len(counters.calls), len(infos))):
+                calls[index] += counters.calls[index]
+                total_ns[index] += counters.total_ns[index]
+                self_ns[index] += counters.self_ns[index]
+        rows = [
+            FunctionStats(
+                info.name,
+                info.func_name,
+                lineno,
+                calls[index],
+                total_ns[index],
+                self_ns[index],
+            )
+            for index, (info, lineno) in enumerate(infos)
+        ]
+        field = {"total": "total_ns", "self": "self_ns", "calls": "calls"}[sort]
+        rows.sort(key=lambda row: getattr(row, field), reverse=True)
+        return rows
+
+    def table(self, sort: str = "total") -> str:
+        """Format the statistics as a text table, one function per line."""
+        lines = [
+            f"[spewer] call statistics, sorted by {sort}:\n",
+            f"{'calls':>10} {'total ms':>12} {'self ms':>12}  function\n",
+        ]
+        lines.extend(
+            f"{row.calls:>10} {row.total_ns / 1e6:>12.3f} {row.self_ns / 1e6:>12.3f}"
+            f"  {row.module}:{row.lineno} {row.func_name}()\n"
+            for row in self.rows(sort)
+        )
+        return "".join(lines)
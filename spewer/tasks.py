@@ -0,0 +1,41 @@
+"""Context-scoped activation for tracing asyncio tasks."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import contextvars
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+# Whether hooks installed with ``task_scoped=True`` report events from the
+# current context. asyncio copies the context into every task it creates.
+tracing: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "spewer_tracing", default=False
+)
+
+
+@contextlib.contextmanager
+def trace_task() -> Iterator[None]:
+    """Report events from the current task, and tasks it creates, while active.
+
+    Only affects hooks installed with ``task_scoped=True``; everywhere else
+    their events are dropped.
+    """
+    token = tracing.set(True)
+    try:
+        yield
+    finally:
+        tracing.reset(token)
+
+
+def current_task_name() -> Optional[str]:
+    """Return the name of the running asyncio task, or None outside a task."""
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        # No running event loop in this thread
+        return None
+    return task.get_name() if task is not None else None
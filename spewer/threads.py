@@ -0,0 +1,112 @@
+"""Per-thread buffering for tracing several threads at once."""
+
+from __future__ import annotations
+
+import heapq
+import threading
+import time
+from typing import Any, Callable, Union
+
+from .events import format_event
+from .sinks import Sink, _live_sinks
+
+DEFAULT_THREAD_BUFFER_SIZE = 1024
+
+
+class _ThreadBuffer(threading.local):
+    events: Any = None
+
+
+class ThreadBufferSink(Sink):
+    """Collect events in per-thread buffers and merge them on flush.
+
+    Each traced thread appends to its own list, so threads never wait for
+    each other or for the output while tracing. Flushing merges the buffers
+    in timestamp order, tags each event with the thread's name and ident,
+    formats it and writes the result to ``sink`` in one chunk. A flush
+    happens whenever one thread has ``buffer_size`` events pending. As with
+    ``AsyncSink``, values are rendered when the events are written.
+    """
+
+    def __init__(self, sink: Sink, buffer_size: int = DEFAULT_THREAD_BUFFER_SIZE):
+        """Initialize the buffers in front of ``sink``."""
+        if not isinstance(sink, Sink):
+            msg = "sink must be a Sink instance"
+            raise TypeError(msg)
+        if not isinstance(buffer_size, int) or buffer_size < 1:
+            msg = "buffer_size must be a positive integer"
+            raise ValueError(msg)
+        self.sink = sink
+        self.buffer_size = buffer_size
+        self._local = _ThreadBuffer()
+        # (thread, tag, events) for every thread that has buffered something
+        self._buffers: list[tuple[threading.Thread, str, list]] = []
+        self._lock = threading.Lock()
+        _live_sinks.add(self)
+
+    def _events(self) -> list:
+        events = self._local.events
+        if events is None:
+            events = self._local.events = []
+            thread = threading.current_thread()
+            tag = f"[{thread.name} {thread.ident}] "
+            with self._lock:
+                self._buffers.append((thread, tag, events))
+        return events
+
+    def submit(self, event: tuple) -> None:
+        """Buffer a raw event for the current thread."""
+        events = self._events()
+        events.append((time.monotonic_ns(), event))
+        if len(events) >= self.buffer_size:
+            self.flush()
+
+    def write(self, text: str) -> None:
+        """Buffer already formatted output for the current thread."""
+        events = self._events()
+        events.append((time.monotonic_ns(), text))
+        if len(events) >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Merge every thread's buffered events and write them out."""
+        with self._lock:
+            pending = []
+            for _thread, tag, events in self._buffers:
+                # Threads may keep appending; only take what is there now
+                taken = events[:]
+                del events[: len(taken)]
+                if taken:
+                    pending.append([(stamp, tag, item) for stamp, item in taken])
+            # Forget threads that have finished and have nothing left
+            self._buffers = [
+                entry for entry in self._buffers if entry[2] or entry[0].is_alive()
+            ]
+            chunks = [
+                _format(tag, item, self.renderer)
+                for _, tag, item in heapq.merge(*pending, key=lambda entry: entry[0])
+            ]
+            if chunks:
+                self.sink.write("".join(chunks))
+        self.sink.flush()
+
+    def close(self) -> None:
+        """Write out buffered events and close the wrapped sink."""
+        self.flush()
+        self.sink.close()
+        _live_sinks.discard(self)
+
+    def _after_fork(self) -> None:
+        # Other threads are gone, and the lock may have died with one of them
+        current = threading.current_thread()
+        self._buffers = [entry for entry in self._buffers if entry[0] is current]
+        self._lock = threading.Lock()
+
+
+def _format(tag: str, item: Union[tuple, str], render: Callable[[Any], str]) -> str:
+    if isinstance(item, str):
+        return item
+    try:
+        return tag + format_event(item, render)
+    except Exception as exc:
+        return f"{tag}<spewer: unformattable {item[0]} event: {exc!r}>\n"
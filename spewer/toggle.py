@@ -0,0 +1,262 @@
+"""Turn spewer on and off in a running process with signals."""
+
+from __future__ import annotations
+
+import dataclasses
+import json
+import os
+import signal
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Optional, Union
+
+from . import spewer as _spewer
+from .config import SpewConfig
+from .jsonl import JsonLinesSink
+from .sinks import FileSink
+from .trace import TraceHook  # noqa: TC001
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+ENV_PREFIX = "SPEWER_"
+# Path of a JSON file with options, overridden by SPEWER_<OPTION> variables
+CONFIG_VARIABLE = f"{ENV_PREFIX}CONFIG"
+# Path of a file to write trace output to, given to FileSink
+OUTPUT_OPTION = "output"
+# Format of the output, "text" or "jsonl" for JsonLinesSink
+FORMAT_OPTION = "output_format"
+FORMATS = ("text", "jsonl")
+
+_TRUE = ("1", "true", "yes", "on")
+_FALSE = ("0", "false", "no", "off")
+# Type of every SpewConfig option that can be given as text; the sink and
+# renderer are objects
+_OPTION_TYPES: dict[str, type] = {
+    "trace_names": list,
+    "show_values": bool,
+    "functions_only": bool,
+    "trace_returns": bool,
+    "trace_exceptions": bool,
+    "exclude_names": list,
+    "backend": str,
+    "sample_every": int,
+    "sample_rate": float,
+    "rate_limit": float,
+    "code_rate_limit": float,
+    "summary_interval": float,
+    "all_threads": bool,
+    "task_scoped": bool,
+    "values_mode": str,
+    "indent": str,
+    "max_depth": int,
+    "stats": bool,
+    "heatmap": bool,
+    "triggers": list,
+    "trigger_limit": int,
+    "chain": bool,
+}
+# Options that an empty variable sets to None
+_OPTIONAL_OPTIONS = (
+    "trace_names",
+    "exclude_names",
+    "rate_limit",
+    "code_rate_limit",
+    "max_depth",
+    "triggers",
+    "trigger_limit",
+)
+# Options whose text is taken as it is, since spaces are part of the value
+_VERBATIM_OPTIONS = ("indent",)
+
+
+def _parse(variable: str, name: str, text: str) -> Any:
+    """Convert the text of an environment variable to an option value."""
+    value = text.strip()
+    if not value and name in _OPTIONAL_OPTIONS:
+        return None
+    kind = _OPTION_TYPES[name]
+    if kind is list:
+        return [item.strip() for item in value.split(",") if item.strip()]
+    if kind is bool:
+        if value.lower() not in _TRUE + _FALSE:
+            msg = f"{variable} must be one of {', '.join(_TRUE + _FALSE)}"
+            raise ValueError(msg)
+        return value.lower() in _TRUE
+    if kind is str:
+        return value
+    try:
+        return kind(value)
+    except ValueError:
+        msg = f"{variable} must be a number, not {text!r}"
+        raise ValueError(msg) from None
+
+
+def load_config(
+    path: Optional[Union[str, Path]] = None,
+    environ: Optional[Mapping[str, str]] = None,
+) -> SpewConfig:
+    """Build a SpewConfig from a JSON file and ``SPEWER_*`` variables.
+
+    The file, ``path`` or else the one named by ``SPEWER_CONFIG``, holds an
+    object of ``SpewConfig`` options. Variables named ``SPEWER_`` plus an
+    option name in upper case override it: lists are comma-separated and
+    booleans are ``1``/``0``, ``true``/``false``, ``yes``/``no`` or
+    ``on``/``off``. Surrounding whitespace is ignored, except in
+    ``SPEWER_INDENT``. The ``output`` option, or ``SPEWER_OUTPUT``, names a
+    file to write to; it may contain ``{pid}``. ``output_format``, or
+    ``SPEWER_OUTPUT_FORMAT``, is ``text`` or ``jsonl`` for JSON Lines.
+    """
+    environ = os.environ if environ is None else environ
+    if path is None:
+        path = environ.get(CONFIG_VARIABLE) or None
+    options: dict[str, Any] = {}
+    if path is not None:
+        with Path(path).open(encoding="utf-8") as stream:
+            options = json.load(stream)
+        if not isinstance(options, dict):
+            msg = f"{path}: spewer options must be a JSON object"
+            raise ValueError(msg)
+
+    for name in _OPTION_TYPES:
+        variable = f"{ENV_PREFIX}{name.upper()}"
+        if name in _VERBATIM_OPTIONS and variable in environ:
+            options[name] = environ[variable]
+        elif variable in environ:
+            options[name] = _parse(variable, name, environ[variable])
+    for option in (OUTPUT_OPTION, FORMAT_OPTION):
+        variable = f"{ENV_PREFIX}{option.upper()}"
+        if variable in environ:
+            options[option] = environ[variable].strip()
+
+    unknown = set(options) - set(_OPTION_TYPES) - {OUTPUT_OPTION, FORMAT_OPTION}
+    if unknown:
+        msg = f"unknown spewer options: {', '.join(sorted(unknown))}"
+        raise ValueError(msg)
+    output_format = (options.pop(FORMAT_OPTION, None) or "text").strip().lower()
+    if output_format not in FORMATS:
+        msg = f"{FORMAT_OPTION} must be one of {', '.join(FORMATS)}"
+        raise ValueError(msg)
+    output = options.pop(OUTPUT_OPTION, None)
+    if output:
+        # Appending keeps the output of earlier sessions of the process
+        options["sink"] = FileSink(output, mode="a")
+    if output_format == "jsonl":
+        options["sink"] = JsonLinesSink(options.get("sink"))
+    return SpewConfig(**options)
+
+
+class SignalToggle:
+    """Install a spewer hook on one signal and remove it on another.
+
+    The hook is installed in all threads with the preloaded ``config``.
+    While tracing is off no hook is installed at all, so the process runs
+    at full speed.
+
+    The signal handlers may interrupt spewer itself, while it holds the
+    lock of its installed hooks or of a sink. Flushing is always left to a
+    short-lived thread. Installing and removing the hook is too if spewer
+    is busy, and otherwise done in the handler: only there can the hook be
+    installed in the main thread before Python 3.12.
+    """
+
+    def __init__(
+        self,
+        config: SpewConfig,
+        on_signal: Optional[int] = None,
+        off_signal: Optional[int] = None,
+    ):
+        """Initialize the toggle; the signals default to SIGUSR1 and SIGUSR2."""
+        self.config = dataclasses.replace(config, all_threads=True)
+        self.on_signal = signal.SIGUSR1 if on_signal is None else on_signal
+        self.off_signal = signal.SIGUSR2 if off_signal is None else off_signal
+        self.hook: Optional[TraceHook] = None
+        self._previous_handlers: dict[int, Any] = {}
+
+    def install(self) -> None:
+        """Register the signal handlers; must be called from the main thread."""
+        for signum, handler in (
+            (self.on_signal, self._on_signal),
+            (self.off_signal, self._off_signal),
+        ):
+            self._previous_handlers[signum] = signal.signal(signum, handler)
+
+    def uninstall(self) -> None:
+        """Turn tracing off and restore the previous signal handlers."""
+        for signum, handler in self._previous_handlers.items():
+            signal.signal(signum, handler)
+        self._previous_handlers.clear()
+        hook = self._remove()
+        if hook is not None:
+            self._finish(hook)
+
+    @property
+    def active(self) -> bool:
+        """Whether tracing is on."""
+        return self.hook is not None
+
+    def turn_on(self) -> None:
+        """Install the hook, unless it is already installed."""
+        if self.hook is None:
+            self.hook = _spewer._spew(self.config)
+
+    def turn_off(self) -> None:
+        """Remove the hook and flush its output."""
+        hook = self._remove()
+        if hook is not None:
+            self._finish(hook)
+
+    def _remove(self) -> Optional[TraceHook]:
+        # A hook installed on top of ours has to be removed first
+        innermost = _spewer._innermost()
+        if self.hook is None or innermost is None or innermost.hook is not self.hook:
+            return None
+        hook, self.hook = self.hook, None
+        return _spewer._remove(hook)
+
+    def _finish(self, hook: TraceHook) -> None:
+        hook.write_reports()
+        hook.flush()
+
+    def _on_signal(self, signum: int, frame: Any) -> None:
+        self._handle(self.turn_on)
+
+    def _off_signal(self, signum: int, frame: Any) -> None:
+        self._handle(self._turn_off_later)
+
+    def _turn_off_later(self) -> None:
+        hook = self._remove()
+        if hook is not None:
+            threading.Thread(
+                target=self._finish, args=(hook,), name="spewer-flush", daemon=True
+            ).start()
+
+    def _handle(self, work: Callable[[], None]) -> None:
+        """Do a signal handler's work now, or in a thread if spewer is busy."""
+        lock = _spewer._installations_lock
+        # The lock is not reentrant: the interrupted code may be holding it
+        if lock.acquire(blocking=False):
+            lock.release()
+            work()
+        else:
+            threading.Thread(target=work, name="spewer-toggle", daemon=True).start()
+
+
+def install_signal_toggle(
+    config: Optional[SpewConfig] = None,
+    on_signal: Optional[int] = None,
+    off_signal: Optional[int] = None,
+) -> SignalToggle:
+    """Let ``on_signal`` turn tracing on in all threads and ``off_signal`` off.
+
+    ``config`` defaults to ``load_config()``, read once from ``SPEWER_*``
+    environment variables and the file named by ``SPEWER_CONFIG``. The
+    signals default to SIGUSR1 and SIGUSR2, which Windows does not have.
+    Must be called from the main thread; returns the installed
+    ``SignalToggle``.
+    """
+    toggle = SignalToggle(
+        load_config() if config is None else config, on_signal, off_signal
+    )
+    toggle.install()
+    return toggle
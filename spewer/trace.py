@@ -2,14 +2,111 @@
 
 from __future__ import annotations
 
+import ast
+import dis
+import functools
 import inspect
-import linecache
+import io
+import keyword
 import re
-from typing import Any
+import sys
+import threading
+import tokenize
+from typing import TYPE_CHECKING, Any, Optional
 
+from .cache import CacheInfo, CodeInfo, CodeInfoCache
 from .config import SpewConfig  # noqa: TC001
-
-_token_splitter = re.compile(r"\W+")
+from .depth import CallDepth
+from .events import C_CALL, CALL, EXCEPTION, LINE, RETURN, format_args, format_values
+from .filters import ModuleFilter
+from .heatmap import LineHeatmap
+from .ratelimit import RateLimiter
+from .render import DEFAULT_RENDERER
+from .sampling import Sampler
+from .shadow import ValueShadow
+from .sinks import StreamSink, writer_threads
+from .stats import CallStats
+from .tasks import current_task_name, tracing
+from .threads import ThreadBufferSink
+from .triggers import Triggers
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+_string_prefix = re.compile(r"[A-Za-z]*")
+
+_SUSPENDING_FLAGS = (
+    inspect.CO_GENERATOR
+    | inspect.CO_COROUTINE
+    | inspect.CO_ITERABLE_COROUTINE
+    | inspect.CO_ASYNC_GENERATOR
+)
+_YIELD_VALUE = dis.opmap["YIELD_VALUE"]
+# YIELD_FROM was replaced by SEND in Python 3.11, which added RESUME
+_YIELD_FROM = dis.opmap.get("YIELD_FROM")
+_RESUME = dis.opmap.get("RESUME")
+
+
+def _fstring_names(node: ast.AST) -> Iterator[str]:
+    """Yield the names in the replacement fields of a parsed f-string, in order.
+
+    Conversions such as ``!r`` are not names, and format specs only add
+    the names in their own nested fields.
+    """
+    for child in ast.iter_child_nodes(node):
+        if isinstance(child, ast.Name):
+            yield child.id
+        else:
+            yield from _fstring_names(child)
+
+
+@functools.lru_cache(maxsize=4096)
+def _line_identifiers(line: str) -> tuple[str, ...]:
+    """Return the identifiers referenced by a source line, in order.
+
+    Keywords, numbers, attribute names after a dot and string contents are
+    skipped; replacement fields inside f-strings are kept. Source lines are
+    shared by all events on a line, so each line is tokenized once.
+    """
+    names: dict[str, None] = {}
+    previous = None
+    try:
+        for tok in tokenize.generate_tokens(io.StringIO(line).readline):
+            if tok.type == tokenize.NAME:
+                # From Python 3.12 the conversion of !r is a NAME token too
+                if not keyword.iskeyword(tok.string) and previous not in (".", "!"):
+                    names[tok.string] = None
+            elif (
+                tok.type == tokenize.STRING
+                and "f" in _string_prefix.match(tok.string).group().lower()
+            ):
+                # Before Python 3.12 an f-string is a single STRING token
+                tree = ast.parse(tok.string, mode="eval")
+                names.update(dict.fromkeys(_fstring_names(tree)))
+            previous = tok.string
+    except (tokenize.TokenError, SyntaxError):
+        # Lines that are part of a larger statement may not tokenize alone
+        pass
+    return tuple(names)
+
+
+def _suspended(frame: Any) -> bool:
+    """Return whether a "return" event of a frame is a yield or an await.
+
+    sys.settrace reports both as returns, though the frame carries on later.
+    """
+    code = frame.f_code
+    if not code.co_flags & _SUSPENDING_FLAGS:
+        return False
+    bytecode, offset = code.co_code, frame.f_lasti
+    opcode = bytecode[offset]
+    if opcode == _YIELD_VALUE:
+        return True
+    # Python 3.13 points at the RESUME after the yield; RESUME 0 starts a frame
+    if opcode == _RESUME:
+        return bytecode[offset + 1] != 0
+    # Before Python 3.11 an await or yield from points just before YIELD_FROM
+    return offset + 2 < len(bytecode) and bytecode[offset + 2] == _YIELD_FROM
 
 
 class TraceHook:
@@ -18,11 +115,80 @@ class TraceHook:
     def __init__(self, config: SpewConfig):
         """Initialize the trace hook with configuration."""
         self.config = config
-
-    def __call__(self, frame: Any, event: str, arg: Any) -> TraceHook:
+        # Trace and profile functions the hook was installed over
+        self.previous_trace: Any = None
+        self.previous_profile: Any = None
+        self._module_filter = ModuleFilter(config.trace_names, config.exclude_names)
+        self._trace_all = self._module_filter.matches_all
+        self._code_cache = CodeInfoCache(self._module_filter)
+        self.sink = config.sink if config.sink is not None else StreamSink()
+        self._all_threads = config.all_threads
+        if config.all_threads and not self.sink.records_threads:
+            self.sink = ThreadBufferSink(self.sink)
+        self.sink.renderer = (
+            config.renderer if config.renderer is not None else DEFAULT_RENDERER
+        )
+        self._write = self.sink.write
+        self._submit = self.sink.submit
+        self._depth: Optional[CallDepth] = None
+        if config.indent or config.max_depth is not None:
+            self._depth = CallDepth(config.max_depth)
+        self._indent = config.indent
+        if config.indent:
+            self._unindented_submit = self._submit
+            self._submit = self._indented_submit
+        self._task_scoped = config.task_scoped
+        self._context_filtered = config.all_threads or config.task_scoped
+        if config.task_scoped:
+            self._unlabelled_submit = self._submit
+            self._submit = self._labelled_submit
+        self._sampler: Optional[Sampler] = None
+        if config.sample_every > 1 or config.sample_rate < 1.0:
+            self._sampler = Sampler(config.sample_every, config.sample_rate)
+        self._shadow: Optional[ValueShadow] = None
+        if config.show_values and config.values_mode == "diff":
+            self._shadow = ValueShadow()
+        self._rate_limiter: Optional[RateLimiter] = None
+        if config.rate_limit is not None or config.code_rate_limit is not None:
+            self._rate_limiter = RateLimiter(
+                config.rate_limit, config.code_rate_limit, config.summary_interval
+            )
+            self._unlimited_submit = self._submit
+            self._submit = self._limited_submit
+        self._triggers: Optional[Triggers] = None
+        if config.triggers is not None:
+            self._triggers = Triggers(config.triggers, config.trigger_limit)
+        self._gated = (
+            self._sampler is not None
+            or self._depth is not None
+            or self._triggers is not None
+        )
+        self.stats: Optional[CallStats] = None
+        if config.stats:
+            self.stats = CallStats(self._code_cache.lookup)
+        self.heatmap: Optional[LineHeatmap] = None
+        if config.heatmap:
+            self.heatmap = LineHeatmap(self._code_cache.lookup)
+        # In stats and heatmap modes events are counted, not written
+        self._counting = config.stats or config.heatmap
+        # Stats mode only needs the calls and returns of traced frames
+        self._skips_lines = config.stats and not config.heatmap
+
+    def __call__(self, frame: Any, event: str, arg: Any) -> Optional[TraceHook]:
         """Trace hook callback that processes execution events."""
-
-        if self.config.functions_only and event in ("call", "c_call"):
+        if self._context_filtered and self._skips_context():
+            return None
+
+        if event == "call":
+            tracer = self._enter(frame)
+            if tracer is not self:
+                return tracer
+        elif self._gated and self._skips_frame(frame, event):
+            return None
+
+        if self._counting:
+            self._count(frame, event)
+        elif self.config.functions_only and event in ("call", "c_call"):
             self._handle_function_call(frame, event, arg)
         elif not self.config.functions_only and event == "line":
             self._handle_line_execution(frame)
@@ -31,196 +197,282 @@ class TraceHook:
         elif event == "exception" and self.config.trace_exceptions:
             self._handle_line_exception(frame, arg)
 
+        if event == "return":
+            self._frame_exited(frame)
+        return self
+
+    def _skips_context(self) -> bool:
+        """Return whether events from the current thread or task are dropped."""
+        if self._all_threads and threading.get_ident() in writer_threads:
+            # Keep the hook away from spewer's writer threads for good
+            sys.settrace(self.previous_trace)
+            sys.setprofile(self.previous_profile)
+            return True
+        # Outside trace_task(), task-scoped hooks drop everything right away
+        return self._task_scoped and not tracing.get()
+
+    def _enter(self, frame: Any) -> Any:
+        """Decide whether a new frame is traced; return its local trace function.
+
+        The decision is taken once per frame: frames that are not traced get
+        no local trace function, so their line, return and exception events
+        never reach Python code.
+        """
+        triggers = self._triggers
+        if triggers is not None and not triggers.active and not self._wake(frame):
+            # A dormant hook only looks for trigger functions
+            return None
+        depth = self._depth
+        # Nothing below a cut-off call is traced
+        if (depth is not None and depth.cut_active) or not self._is_traced(frame):
+            return None
+        sampler = self._sampler
+        if sampler is not None and not sampler.enter(frame):
+            if sampler.is_root(frame):
+                # Only watch the unsampled top-level call for its return
+                frame.f_trace_lines = False
+                return self._watch_unsampled
+            return None
+        if depth is not None and not depth.enter(frame):
+            # Only watch the cut-off call for its return
+            frame.f_trace_lines = False
+            return self._watch_cut
+        if self._skips_lines:
+            frame.f_trace_lines = False
         return self
 
+    def _wake(self, frame: Any) -> bool:
+        """Return whether the frame is a trigger call that starts tracing."""
+        triggers = self._triggers
+        return (
+            triggers.matches(frame) and self._is_traced(frame) and triggers.fire(frame)
+        )
+
+    def _skips_frame(self, frame: Any, event: str) -> bool:
+        """Return whether an event comes from a dormant, unsampled or cut-off call.
+
+        setprofile and sys.monitoring report events from those calls as well.
+        """
+        triggers = self._triggers
+        if triggers is not None and not triggers.active:
+            return True
+        sampler = self._sampler
+        if sampler is not None and not sampler.active:
+            if event == "return":
+                sampler.leave(frame)
+            return True
+        depth = self._depth
+        if depth is not None and depth.cut_active:
+            if event == "return":
+                depth.leave(frame)
+            return True
+        return False
+
+    def _frame_exited(self, frame: Any) -> None:
+        """Drop the per-frame state of a frame that returned or unwound."""
+        if self._sampler is not None:
+            self._sampler.leave(frame)
+        if self._depth is not None and self._is_traced(frame):
+            # setprofile and PY_UNWIND report untraced frames too
+            self._depth.leave(frame)
+        if self.stats is not None:
+            self.stats.leave(frame)
+        if self._shadow is not None and not _suspended(frame):
+            # Suspended generators and coroutines keep their shadow
+            self._shadow.forget(frame)
+        if self._triggers is not None:
+            self._triggers.leave(frame)
+
+    def _watch_unsampled(self, frame: Any, event: str, arg: Any) -> Any:
+        """Local trace function of an unsampled top-level call."""
+        if event == "return":
+            self._sampler.leave(frame)
+            if self._triggers is not None:
+                self._triggers.leave(frame)
+        return self._watch_unsampled
+
+    def _watch_cut(self, frame: Any, event: str, arg: Any) -> Any:
+        """Local trace function of a call cut off by ``max_depth``."""
+        if event == "return":
+            self._depth.leave(frame)
+        return self._watch_cut
+
+    def _limited_submit(self, event: tuple) -> None:
+        """Submit an event if it is within the rate limits, else count it."""
+        info = event[1]
+        limiter = self._rate_limiter
+        # c_call events have no CodeInfo and are keyed by (module, func_name)
+        allowed = limiter.allow(info if info is not None else event[4])
+        if limiter.summary_due:
+            self._write_summary()
+        if allowed:
+            self._unlimited_submit(event)
+
+    def _labelled_submit(self, event: tuple) -> None:
+        """Submit an event labelled with the asyncio task that produced it."""
+        name = current_task_name()
+        self._unlabelled_submit(event if name is None else (*event, name))
+
+    def _indented_submit(self, event: tuple) -> None:
+        """Submit an event prefixed with ``indent`` once per call level."""
+        depth = self._depth.depth
+        if event[0] == C_CALL:
+            # A builtin called at depth N runs at depth N + 1
+            depth += 1
+        label = event[5] if len(event) > 5 else None
+        self._unindented_submit((*event[:5], label, self._indent * depth))
+
+    def _write_summary(self) -> None:
+        summary = self._rate_limiter.summary()
+        if summary is not None:
+            self._write(summary)
+
+    def flush(self) -> None:
+        """Write out any pending rate limit summary and flush the sink."""
+        if self._rate_limiter is not None:
+            self._write_summary()
+        self.sink.flush()
+
+    def _count(self, frame: Any, event: str) -> None:
+        """Count an event in stats or heatmap mode."""
+        if event == "call":
+            if self.stats is not None:
+                self.stats.enter(frame)
+        elif event == "line" and self.heatmap is not None:
+            self.heatmap.count(frame)
+
+    def write_reports(self) -> None:
+        """Write the call statistics table and the line heatmap, if enabled."""
+        if self.stats is not None:
+            self._write(self.stats.table())
+        if self.heatmap is not None:
+            self._write(self.heatmap.listing())
+
+    def cache_info(self) -> CacheInfo:
+        """Return hit and miss counters of the per-code-object cache."""
+        return self._code_cache.info()
+
+    def _is_traced(self, frame: Any) -> bool:
+        """Return whether events from the frame's module should be reported."""
+        if self._trace_all:
+            return True
+        return self._code_cache.lookup(frame).traced
+
+    def _source_line(self, frame: Any) -> tuple[CodeInfo, Optional[str]]:
+        """Return the code metadata and source line for the frame's current line.
+
+        The line is None when the frame's module is not traced.
+        """
+        info = self._code_cache.lookup(frame)
+        if not info.traced:
+            return info, None
+        line = info.line(frame.f_lineno)
+        if line is None:
+            line = f"Unknown code named [{frame.f_code.co_name}]. VM instruction #{frame.f_lasti}"
+        return info, line
+
     def _handle_function_call(self, frame: Any, event: str, arg: Any) -> None:
         """Handle function call events including built-in functions."""
         # Handle C/built-in function calls
         if event == "c_call":
-            if arg is not None:
+            if arg is not None and self._is_traced(frame):
                 func_name = getattr(arg, "__name__", "<unknown>")
                 module = getattr(arg, "__module__", "<unknown>")
-                print(f"{module}: {func_name}()")
+                self._submit((C_CALL, None, 0, None, (module, func_name)))
             return
 
         # Handle regular Python function calls
-        lineno = frame.f_lineno
-        func_name = frame.f_code.co_name
-
-        # Get filename and handle compiled files
-        if "__file__" in frame.f_globals:
-            filename = frame.f_globals["__file__"]
-            if filename.endswith((".pyc", ".pyo")):
-                filename = filename[:-1]
-            name = frame.f_globals["__name__"]
-        else:
-            name = "[unknown]"
-            filename = "[unknown]"
+        info = self._code_cache.lookup(frame)
 
         # Check if we should trace this module
-        if self.config.trace_names is None or name in self.config.trace_names:
-            print(f"{name}:{lineno}: {func_name}()")
-
-            if self.config.show_values:
-                self._show_function_args(frame)
+        if info.traced:
+            args = self._function_args(frame) if self.config.show_values else None
+            self._submit((CALL, info, frame.f_lineno, None, args))
 
     def _handle_line_execution(self, frame: Any) -> None:
         """Handle line-by-line execution events."""
-        lineno = frame.f_lineno
-
-        # Get filename and handle compiled files
-        if "__file__" in frame.f_globals:
-            filename = frame.f_globals["__file__"]
-            if filename.endswith((".pyc", ".pyo")):
-                filename = filename[:-1]
-            name = frame.f_globals["__name__"]
-            line = linecache.getline(filename, lineno)
-        else:
-            name = "[unknown]"
-            try:
-                src = inspect.getsourcelines(frame)
-                line = src[lineno]
-            except OSError:
-                line = f"Unknown code named [{frame.f_code.co_name}]. VM instruction #{frame.f_lasti}"
+        info, line = self._source_line(frame)
 
         # Check if we should trace this module
-        if self.config.trace_names is None or name in self.config.trace_names:
-            print(f"{name}:{lineno}: {line.rstrip()}")
-
-            if not self.config.show_values:
-                return
-
-            self._show_variable_values(frame, line)
+        if line is not None:
+            values = (
+                self._variable_values(frame, line) if self.config.show_values else None
+            )
+            if self._shadow is not None and values:
+                values = self._shadow.changed(frame, values)
+            self._submit((LINE, info, frame.f_lineno, line, values))
 
     def _show_function_args(self, frame: Any) -> None:
         """Show function arguments if available."""
-        if frame.f_locals:
-            args = []
-            for key, value in frame.f_locals.items():
-                if not key.startswith("__"):
-                    try:
-                        args.append(f"{key}={value!r}")
-                    except (AttributeError, TypeError, RecursionError):
-                        args.append(f"{key}=<{type(value).__name__} object>")
-            if args:
-                print(f"\targs: {', '.join(args)}")
+        text = format_args(self._function_args(frame), self.sink.renderer)
+        if text:
+            self._write(text)
+
+    def _function_args(self, frame: Any) -> tuple[tuple[str, Any], ...]:
+        """Collect the frame's arguments as ``(name, value)`` pairs."""
+        return tuple(
+            (key, value)
+            for key, value in frame.f_locals.items()
+            if not key.startswith("__")
+        )
 
     def _show_variable_values(self, frame: Any, line: str) -> None:
         """Show variable values for line execution."""
-        details = []
-        tokens = _token_splitter.split(line)
-
-        for tok in tokens:
-            try:
-                if tok in frame.f_globals:
-                    details.append(f"{tok}={frame.f_globals[tok]!r}")
-                if tok in frame.f_locals:
-                    details.append(f"{tok}={frame.f_locals[tok]!r}")
-            except (AttributeError, TypeError, RecursionError):
-                # TODO: explore how to handle this better
-                pass
-
-        if details:
-            print(f"\t{' '.join(details)}")
+        text = format_values(self._variable_values(frame, line), self.sink.renderer)
+        if text:
+            self._write(text)
+
+    def _variable_values(self, frame: Any, line: str) -> tuple[tuple[str, Any], ...]:
+        """Collect ``(name, value)`` pairs for the names used on a line."""
+        names = _line_identifiers(line)
+        if not names:
+            return ()
+
+        values = []
+        # f_locals may be rebuilt on every access, so read it once per event
+        frame_locals = frame.f_locals
+        frame_globals = frame.f_globals
+
+        for name in names:
+            if name in frame_locals:
+                values.append((name, frame_locals[name]))
+            elif name in frame_globals:
+                values.append((name, frame_globals[name]))
+
+        return tuple(values)
 
     def _handle_function_return(self, frame: Any, arg: Any) -> None:
         """Handle function return events."""
-        lineno = frame.f_lineno
-        func_name = frame.f_code.co_name
-
-        # Get filename and handle compiled files
-        if "__file__" in frame.f_globals:
-            filename = frame.f_globals["__file__"]
-            if filename.endswith((".pyc", ".pyo")):
-                filename = filename[:-1]
-            name = frame.f_globals["__name__"]
-        else:
-            name = "[unknown]"
-            filename = "[unknown]"
+        info = self._code_cache.lookup(frame)
 
         # Check if we should trace this module
-        if self.config.trace_names is None or name in self.config.trace_names:
-            if self.config.show_values:
-                print(f"{name}:{lineno}: {func_name}() -> {arg!r}")
-            else:
-                print(f"{name}:{lineno}: {func_name}() -> <return>")
+        if info.traced:
+            payload = (arg,) if self.config.show_values else None
+            self._submit((RETURN, info, frame.f_lineno, None, payload))
 
     def _handle_function_exception(self, frame: Any, arg: Any) -> None:
         """Handle function exception events."""
-        lineno = frame.f_lineno
-        func_name = frame.f_code.co_name
-
-        # Get filename and handle compiled files
-        if "__file__" in frame.f_globals:
-            filename = frame.f_globals["__file__"]
-            if filename.endswith((".pyc", ".pyo")):
-                filename = filename[:-1]
-            name = frame.f_globals["__name__"]
-        else:
-            name = "[unknown]"
-            filename = "[unknown]"
+        info = self._code_cache.lookup(frame)
 
         # Check if we should trace this module
-        if self.config.trace_names is None or name in self.config.trace_names:
-            if self.config.show_values:
-                exc_type, exc_value, _ = arg
-                print(
-                    f"{name}:{lineno}: {func_name}() -> {exc_type.__name__}({exc_value!r})"
-                )
-            else:
-                print(f"{name}:{lineno}: {func_name}() -> <exception>")
+        if info.traced:
+            payload = arg[:2] if self.config.show_values else None
+            self._submit((EXCEPTION, info, frame.f_lineno, None, payload))
 
     def _handle_line_return(self, frame: Any, arg: Any) -> None:
         """Handle line return events."""
-        lineno = frame.f_lineno
-
-        # Get filename and handle compiled files
-        if "__file__" in frame.f_globals:
-            filename = frame.f_globals["__file__"]
-            if filename.endswith((".pyc", ".pyo")):
-                filename = filename[:-1]
-            name = frame.f_globals["__name__"]
-            line = linecache.getline(filename, lineno)
-        else:
-            name = "[unknown]"
-            try:
-                src = inspect.getsourcelines(frame)
-                line = src[lineno]
-            except OSError:
-                line = f"Unknown code named [{frame.f_code.co_name}]. VM instruction #{frame.f_lasti}"
+        info, line = self._source_line(frame)
 
         # Check if we should trace this module
-        if self.config.trace_names is None or name in self.config.trace_names:
-            if self.config.show_values:
-                print(f"{name}:{lineno}: {line.rstrip()} -> {arg!r}")
-            else:
-                print(f"{name}:{lineno}: {line.rstrip()} -> <return>")
+        if line is not None:
+            payload = (arg,) if self.config.show_values else None
+            self._submit((RETURN, info, frame.f_lineno, line, payload))
 
     def _handle_line_exception(self, frame: Any, arg: Any) -> None:
         """Handle line exception events."""
-        lineno = frame.f_lineno
-
-        # Get filename and handle compiled files
-        if "__file__" in frame.f_globals:
-            filename = frame.f_globals["__file__"]
-            if filename.endswith((".pyc", ".pyo")):
-                filename = filename[:-1]
-            name = frame.f_globals["__name__"]
-            line = linecache.getline(filename, lineno)
-        else:
-            name = "[unknown]"
-            try:
-                src = inspect.getsourcelines(frame)
-                line = src[lineno]
-            except OSError:
-                line = f"Unknown code named [{frame.f_code.co_name}]. VM instruction #{frame.f_lasti}"
+        info, line = self._source_line(frame)
 
         # Check if we should trace this module
-        if self.config.trace_names is None or name in self.config.trace_names:
-            if self.config.show_values:
-                exc_type, exc_value, _ = arg
-                print(
-                    f"{name}:{lineno}: {line.rstrip()} -> {exc_type.__name__}({exc_value!r})"
-                )
-            else:
-                print(f"{name}:{lineno}: {line.rstrip()} -> <exception>")
+        if line is not None:
+            payload = arg[:2] if self.config.show_values else None
+            self._submit((EXCEPTION, info, frame.f_lineno, line, payload))
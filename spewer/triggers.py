@@ -0,0 +1,98 @@
+"""Trigger functions that wake a dormant spewer trace hook."""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Optional
+
+
+def parse_trigger(spec: str) -> tuple[str, str]:
+    """Split a ``module:qualname`` trigger spec into its two parts."""
+    module, _, qualname = spec.partition(":")
+    return module, qualname
+
+
+class _TriggerState(threading.local):
+    # Trigger call running on this thread
+    root: Any = None
+
+
+class Triggers:
+    """Decide when a dormant hook starts and stops tracing.
+
+    A hook with triggers traces nothing until a thread enters one of the
+    trigger functions, given as ``module:qualname`` specs. Everything that
+    call runs is traced until it returns, after which the thread is dormant
+    again. With ``limit``, only the first ``limit`` trigger calls fire.
+
+    Whether a code object is a trigger is decided once and cached, so a
+    dormant hook costs a dict probe per call. ``listener`` is called with
+    True when the first trigger call starts, across all threads, and with
+    False when the last one ends, so a backend can switch its events.
+    """
+
+    def __init__(self, specs: list[str], limit: Optional[int] = None):
+        """Initialize the triggers from ``module:qualname`` specs."""
+        self._specs = frozenset(parse_trigger(spec) for spec in specs)
+        # co_qualname is new in Python 3.11; older code objects only know the
+        # bare name, so there a trigger on a method matches any function of
+        # that name in its module
+        self._bare_names = frozenset(
+            (module, qualname.rpartition(".")[2]) for module, qualname in self._specs
+        )
+        self.limit = limit
+        self.fired = 0
+        self.running = 0
+        self.listener: Optional[Callable[[bool], None]] = None
+        self._codes: dict[Any, bool] = {}
+        self._lock = threading.Lock()
+        self._state = _TriggerState()
+
+    def matches(self, frame: Any) -> bool:
+        """Return whether the frame runs one of the trigger functions."""
+        code = frame.f_code
+        matched = self._codes.get(code)
+        if matched is None:
+            module = frame.f_globals.get("__name__")
+            qualname = getattr(code, "co_qualname", None)
+            if qualname is None:
+                matched = (module, code.co_name) in self._bare_names
+            else:
+                matched = (module, qualname) in self._specs
+            self._codes[code] = matched
+        return matched
+
+    def fire(self, frame: Any) -> bool:
+        """Start tracing a trigger call, unless the limit has been reached."""
+        with self._lock:
+            if self.limit is not None and self.fired >= self.limit:
+                return False
+            self.fired += 1
+            self.running += 1
+            waking = self.running == 1
+        self._state.root = frame
+        if waking and self.listener is not None:
+            self.listener(True)
+        return True
+
+    def leave(self, frame: Any) -> None:
+        """Record that a frame returned, ending its trigger call if it was one."""
+        state = self._state
+        if frame is not state.root:
+            return
+        state.root = None
+        with self._lock:
+            self.running -= 1
+            sleeping = not self.running
+        if sleeping and self.listener is not None:
+            self.listener(False)
+
+    @property
+    def active(self) -> bool:
+        """Whether a trigger call is running on this thread."""
+        return self._state.root is not None
+
+    @property
+    def exhausted(self) -> bool:
+        """Whether the limit has been reached, so no trigger will fire again."""
+        return self.limit is not None and self.fired >= self.limit
@@ -0,0 +1,13 @@
+"""Shared fixtures for the spewer tests."""
+
+import pytest  # type: ignore[import-untyped]
+
+from spewer.monitoring import AVAILABLE
+
+
+@pytest.fixture(params=["settrace", "monitoring"])
+def backend(request):
+    """Each backend in turn; sys.monitoring is skipped before Python 3.12."""
+    if request.param == "monitoring" and not AVAILABLE:
+        pytest.skip("sys.monitoring requires Python 3.12+")
+    return request.param
@@ -0,0 +1,160 @@
+"""Tests for the binary trace format."""
+
+import contextlib
+import io
+import re
+import threading
+
+import pytest  # type: ignore[import-untyped]
+
+from spewer import BinarySink, MemorySink, SpewContext
+from spewer.binary import HEADER, decode, read_events
+from spewer.cli import main
+
+
+def traced_function(value):
+    result = value * 2
+    return result + 1
+
+
+def raising_function():
+    msg = "boom"
+    raise ValueError(msg)
+
+
+def trace_into(sink, func, *args, **kwargs):
+    with (
+        SpewContext(trace_names=[__name__], sink=sink, **kwargs),
+        contextlib.suppress(ValueError),
+    ):
+        func(*args)
+
+
+def without_sink_reprs(text):
+    """Hide sink reprs, which differ between the two traced runs."""
+    return re.sub(r"<spewer\.[\w.]+ object at 0x[0-9a-f]+>", "<sink>", text)
+
+
+def decoded_text(path):
+    with path.open("rb") as stream:
+        return "".join(decode(stream))
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"show_values": True},
+        {"show_values": False},
+        {"trace_returns": True, "trace_exceptions": True},
+        {"functions_only": True, "trace_returns": True, "trace_exceptions": True},
+        {"show_values": True, "trace_returns": True, "indent": "  "},
+        {"functions_only": True, "indent": "| "},
+    ],
+)
+def test_round_trip_matches_text_output(tmp_path, options):
+    """Decoding a binary trace gives the same text as a text sink."""
+    path = tmp_path / "trace.bin"
+    binary_sink = BinarySink(path)
+    trace_into(binary_sink, traced_function, 20, **options)
+    trace_into(binary_sink, raising_function, **options)
+    binary_sink.close()
+
+    text_sink = MemorySink()
+    trace_into(text_sink, traced_function, 20, **options)
+    trace_into(text_sink, raising_function, **options)
+
+    assert without_sink_reprs(decoded_text(path)) == without_sink_reprs(
+        text_sink.getvalue()
+    )
+
+
+def test_strings_are_interned(tmp_path):
+    """Repeated lines are written once, so the trace grows by fixed records."""
+    path = tmp_path / "trace.bin"
+    sink = BinarySink(path)
+    trace_into(sink, traced_function, 1, show_values=False)
+    sink.flush()
+    first = path.stat().st_size
+    trace_into(sink, traced_function, 1, show_values=False)
+    sink.close()
+
+    data = path.read_bytes()
+    assert data.count(b"result = value * 2") == 1
+    assert len(data) - first < first - len(HEADER)
+
+
+def test_events_carry_metadata(tmp_path):
+    """Decoded events keep the module, function, thread and timestamp."""
+    path = tmp_path / "trace.bin"
+    sink = BinarySink(path)
+    trace_into(sink, traced_function, 3, functions_only=True, show_values=True)
+    sink.close()
+
+    with path.open("rb") as stream:
+        events = [event for event in read_events(stream) if event.kind == "call"]
+    names = [event.func_name for event in events]
+    assert "traced_function" in names
+    event = events[names.index("traced_function")]
+    assert event.module == __name__
+    assert event.filename == __file__
+    assert event.thread_name == "MainThread"
+    assert event.timestamp > 0
+    assert event.detail == "\targs: value=3\n"
+
+
+def test_all_threads_written_as_events(tmp_path):
+    """With all_threads, events of other threads are records of their own."""
+    path = tmp_path / "trace.bin"
+    sink = BinarySink(path)
+    with SpewContext(
+        trace_names=[__name__], all_threads=True, backend="settrace", sink=sink
+    ) as context:
+        assert context.hook.sink is sink
+        thread = threading.Thread(target=traced_function, args=(3,), name="worker")
+        thread.start()
+        thread.join()
+    sink.close()
+
+    with path.open("rb") as stream:
+        events = [event for event in read_events(stream) if not isinstance(event, str)]
+    assert [event.text.strip() for event in events] == [
+        "result = value * 2",
+        "return result + 1",
+    ]
+    assert {event.thread_name for event in events} == {"worker"}
+
+
+def test_text_writes_are_kept(tmp_path):
+    """Preformatted output passed to write() is decoded verbatim."""
+    path = tmp_path / "trace.bin"
+    sink = BinarySink(path, buffer_size=0)
+    sink.write("hello\n")
+    sink.close()
+    assert decoded_text(path) == "hello\n"
+
+
+def test_rejects_other_files():
+    """Streams without the header, or cut short, are rejected."""
+    with pytest.raises(ValueError, match="not a spewer binary trace"):
+        list(read_events(io.BytesIO(b"plain text\n")))
+    with pytest.raises(ValueError, match="truncated"):
+        list(read_events(io.BytesIO(HEADER + b"\x01\x01\x00")))
+
+
+def test_cli_decode(tmp_path, capsys):
+    """``spewer decode`` prints a trace or writes it to a file."""
+    path = tmp_path / "trace.bin"
+    sink = BinarySink(path)
+    trace_into(sink, traced_function, 5, show_values=True)
+    sink.close()
+
+    assert main(["decode", str(path)]) == 0
+    output = capsys.readouterr().out
+    assert "return result + 1\n\tresult=10\n" in output
+
+    out_path = tmp_path / "trace.txt"
+    assert main(["decode", str(path), "-o", str(out_path)]) == 0
+    assert out_path.read_text() == output
+
+    assert main(["decode", str(tmp_path / "missing.bin")]) == 1
+    assert "spewer:" in capsys.readouterr().err
@@ -239,7 +239,7 @@ def test_multiple_c_call_events(capsys):
 
 def test_verify_setprofile_active():
     """Verify sys.setprofile is actually set when using functions_only"""
-    spew(functions_only=True)
+    spew(functions_only=True, backend="settrace")
 
     # Check if profile hook is installed
     profile_func = sys.getprofile()
@@ -288,7 +288,7 @@ def test_debug_c_call_events():
 def test_spew_captures_builtin_functions(capsys):
     """Direct test that spew() with functions_only captures built-ins"""
     # Use spew
-    spew(functions_only=True)
+    spew(functions_only=True, backend="settrace")
 
     # Verify setprofile is active
     assert sys.getprofile() is not None, "setprofile should be set"
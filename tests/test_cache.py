@@ -0,0 +1,118 @@
+"""Tests for the per-code-object metadata cache."""
+
+from spewer import SpewConfig, SpewContext, TraceHook
+from spewer.cache import CodeInfoCache
+
+
+class MockCode:
+    co_name = "handler"
+
+
+class MockFrame:
+    def __init__(self, code, name="myapp", filename="myapp.pyc", lineno=1):
+        self.f_code = code
+        self.f_lineno = lineno
+        self.f_lasti = 0
+        self.f_globals = {"__file__": filename, "__name__": name}
+        self.f_locals = {}
+
+
+def test_lookup_resolves_once_per_code_object():
+    """The second lookup of a code object is a hit."""
+    cache = CodeInfoCache(lambda name, _filename: name == "myapp")
+    code = MockCode()
+
+    first = cache.lookup(MockFrame(code))
+    second = cache.lookup(MockFrame(code, lineno=5))
+
+    assert first is second
+    assert first.name == "myapp"
+    assert first.filename == "myapp.py"
+    assert first.traced is True
+    info = cache.info()
+    assert (info.hits, info.misses, info.currsize) == (1, 1, 1)
+
+
+def test_lookup_records_verdict():
+    """The traced verdict is computed on a miss and stored."""
+    cache = CodeInfoCache(lambda name, _filename: name == "myapp")
+    assert cache.lookup(MockFrame(MockCode(), name="other")).traced is False
+
+
+def test_lookup_without_file():
+    """Frames without __file__ resolve to the unknown module."""
+    cache = CodeInfoCache(lambda _name, _filename: True)
+    frame = MockFrame(MockCode())
+    frame.f_globals = {}
+
+    info = cache.lookup(frame)
+    assert info.name == "[unknown]"
+    assert info.line(1) is None
+
+
+def test_cache_is_bounded():
+    """The oldest entry is evicted once maxsize is reached."""
+    cache = CodeInfoCache(lambda _name, _filename: True, maxsize=2)
+    codes = [MockCode() for _ in range(3)]
+    for code in codes:
+        cache.lookup(MockFrame(code))
+
+    assert cache.info().currsize == 2
+    cache.lookup(MockFrame(codes[0]))
+    assert cache.info().misses == 4
+
+
+def test_recently_used_entries_kept():
+    """Eviction drops the least recently used entry, not the oldest."""
+    cache = CodeInfoCache(lambda _name, _filename: True, maxsize=2)
+    hot, cold, new = MockCode(), MockCode(), MockCode()
+    cache.lookup(MockFrame(hot))
+    cache.lookup(MockFrame(cold))
+    cache.lookup(MockFrame(hot))
+    cache.lookup(MockFrame(new))
+
+    cache.lookup(MockFrame(hot))
+    assert cache.info().misses == 3
+    cache.lookup(MockFrame(cold))
+    assert cache.info().misses == 4
+
+
+def test_source_lines_are_cached():
+    """Source lines come from the cached entry, indexed by line number."""
+    cache = CodeInfoCache(lambda _name, _filename: True)
+    frame = MockFrame(MockCode(), filename=__file__)
+    info = cache.lookup(frame)
+    assert info.line(1).startswith('"""Tests for the per-code-object')
+    assert info.line(100000) == ""
+
+
+def test_clear_resets_counters():
+    """Clearing drops entries and counters."""
+    cache = CodeInfoCache(lambda _name, _filename: True)
+    cache.lookup(MockFrame(MockCode()))
+    cache.clear()
+    assert tuple(cache.info()) == (0, 0, 4096, 0)
+
+
+def test_hook_cache_hits_during_tracing(capsys):
+    """Repeated events from the same code object hit the cache."""
+
+    def loop():
+        total = 0
+        for i in range(50):
+            total += i
+        return total
+
+    with SpewContext(trace_names=[__name__], backend="settrace") as context:
+        loop()
+
+    capsys.readouterr()
+    info = context.hook.cache_info()
+    assert info.hits > 100
+    assert info.misses < 10
+
+
+def test_hook_cache_info_starts_empty():
+    """A new hook has not resolved any code objects."""
+    hook = TraceHook(SpewConfig())
+    assert tuple(hook.cache_info()) == (0, 0, 4096, 0)
@@ -0,0 +1,208 @@
+"""Tests for nesting spewer hooks and chaining to other trace functions."""
+
+import sys
+import threading
+
+import pytest  # type: ignore[import-untyped]
+
+from spewer import MemorySink, SpewContext, spew, unspew
+from spewer import spewer as spewer_module
+from spewer.chain import ChainedTracer
+from spewer.monitoring import AVAILABLE
+
+
+class Recorder:
+    """Trace function recording the lines run in this module, like coverage."""
+
+    def __init__(self):
+        self.lines = []
+
+    def __call__(self, frame, event, arg):
+        if event == "line" and frame.f_globals.get("__name__") == __name__:
+            self.lines.append(frame.f_code.co_name)
+        return self
+
+
+def first():
+    return 1
+
+
+def second():
+    return 2
+
+
+def third():
+    return 3
+
+
+def deep(levels):
+    return deep(levels - 1) if levels else levels
+
+
+def returned(sink, value):
+    """Return whether the sink shows a ``return <value>`` line."""
+    return f"return {value}" in sink.getvalue()
+
+
+def test_previous_trace_function_restored():
+    """The trace function spewer replaced is back after the context exits."""
+    recorder = Recorder()
+    sys.settrace(recorder)
+    try:
+        with SpewContext(backend="settrace", sink=MemorySink()) as context:
+            assert sys.gettrace() is context.hook
+            first()
+        assert sys.gettrace() is recorder
+        second()
+    finally:
+        sys.settrace(None)
+    assert recorder.lines == ["second"]
+
+
+def test_unspew_leaves_other_trace_functions():
+    """unspew() does not remove a trace function installed after spew()."""
+    recorder = Recorder()
+    spew(backend="settrace", sink=MemorySink())
+    sys.settrace(recorder)
+    try:
+        unspew()
+        assert sys.gettrace() is recorder
+    finally:
+        sys.settrace(None)
+
+
+def test_previous_profile_function_restored():
+    """Profile functions are restored like trace functions."""
+    recorder = Recorder()
+    sys.setprofile(recorder)
+    try:
+        with SpewContext(functions_only=True, backend="settrace", sink=MemorySink()):
+            pass
+        assert sys.getprofile() is recorder
+    finally:
+        sys.setprofile(None)
+
+
+@pytest.mark.parametrize("trace_names", [[__name__], ["elsewhere"]])
+def test_chain_passes_events_on(trace_names):
+    """With chain, the replaced trace function sees every line as well."""
+    recorder = Recorder()
+    sink = MemorySink()
+    sys.settrace(recorder)
+    try:
+        with SpewContext(
+            trace_names=trace_names, chain=True, backend="settrace", sink=sink
+        ):
+            first()
+            deep(2)
+    finally:
+        sys.settrace(None)
+    assert recorder.lines == ["first", "deep", "deep", "deep"]
+    assert returned(sink, 1) == (trace_names == [__name__])
+
+
+def test_chain_keeps_line_events_of_watched_frames():
+    """Frames spewer only watches for their return still report lines."""
+    recorder = Recorder()
+    sys.settrace(recorder)
+    try:
+        with SpewContext(
+            trace_names=[__name__],
+            max_depth=1,
+            chain=True,
+            backend="settrace",
+            sink=MemorySink(),
+        ):
+            deep(3)
+    finally:
+        sys.settrace(None)
+    assert recorder.lines == ["deep"] * 4
+
+
+def test_chained_local_functions():
+    """Frames traced by only one function get its local function directly."""
+
+    def traced(_frame, _event, _arg):
+        return traced
+
+    def local(_frame, _event, _arg):
+        return local
+
+    frame = sys._getframe()
+    chain = ChainedTracer(traced, lambda *_: None)
+    assert chain(frame, "call", None) is traced
+    chain = ChainedTracer(traced, traced)
+    assert chain(frame, "call", None) is chain
+    split = ChainedTracer(traced, lambda *_: local)(frame, "call", None)
+    assert (split.first, split.second) == (traced, local)
+
+
+def test_inner_context_pauses_outer(backend):
+    """An inner context replaces the outer one, which resumes afterwards."""
+    outer, inner = MemorySink(), MemorySink()
+    with SpewContext(trace_names=[__name__], backend=backend, sink=outer) as context:
+        first()
+        with SpewContext(trace_names=[__name__], backend=backend, sink=inner):
+            second()
+        assert spewer_module._active_hook is context.hook
+        third()
+
+    assert returned(outer, 1) and returned(outer, 3)
+    assert not returned(outer, 2)
+    assert returned(inner, 2) and not returned(inner, 3)
+    assert spewer_module._active_hook is None
+
+
+def test_threads_leave_contexts_in_any_order(backend):
+    """Contexts of two threads are removed from the thread that exits them."""
+    entered, exited = threading.Event(), threading.Event()
+    left_installed = []
+
+    def worker():
+        with SpewContext(backend=backend, sink=MemorySink()):
+            entered.set()
+            exited.wait(5)
+        left_installed.append(sys.gettrace())
+
+    with SpewContext(backend=backend, sink=MemorySink()):
+        thread = threading.Thread(target=worker)
+        thread.start()
+        entered.wait(5)
+    left_installed.append(sys.gettrace())
+    exited.set()
+    thread.join()
+
+    assert left_installed == [None, None]
+    assert not spewer_module._installations
+    assert spewer_module._active_hook is None
+
+
+def test_chained_inner_context(backend):
+    """With chain, the outer context keeps tracing inside the inner one."""
+    outer, inner = MemorySink(), MemorySink()
+    with SpewContext(trace_names=[__name__], backend=backend, sink=outer):
+        with SpewContext(
+            trace_names=[__name__], chain=True, backend=backend, sink=inner
+        ):
+            second()
+        third()
+
+    assert returned(outer, 2) and returned(outer, 3)
+    assert returned(inner, 2) and not returned(inner, 3)
+
+
+@pytest.mark.skipif(not AVAILABLE, reason="sys.monitoring requires Python 3.12+")
+def test_monitoring_leaves_trace_functions_alone():
+    """Under sys.monitoring the current trace function is never touched."""
+    recorder = Recorder()
+    sys.settrace(recorder)
+    try:
+        with SpewContext(
+            trace_names=[__name__], backend="monitoring", sink=MemorySink()
+        ):
+            assert sys.gettrace() is recorder
+            first()
+        assert sys.gettrace() is recorder
+    finally:
+        sys.settrace(None)
+    assert recorder.lines == ["first"]
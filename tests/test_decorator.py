@@ -0,0 +1,200 @@
+"""Tests for the spew_function decorator."""
+
+import asyncio
+import sys
+import threading
+
+import pytest  # type: ignore[import-untyped]
+
+from spewer import MemorySink, SpewContext, spew_function
+from spewer import spewer as spewer_module
+
+sink = MemorySink()
+
+
+def helper(value):
+    return value * 3
+
+
+@spew_function(trace_names=[__name__], sink=sink)
+def traced(value):
+    return helper(value) + 1
+
+
+@spew_function
+def traced_with_defaults(value):
+    return value
+
+
+@spew_function(trace_names=[__name__], sink=sink)
+def failing():
+    msg = "boom"
+    raise ValueError(msg)
+
+
+@spew_function(trace_names=[__name__], sink=sink)
+def countdown(levels):
+    return countdown(levels - 1) if levels else "done"
+
+
+@spew_function(trace_names=[__name__], sink=sink)
+async def traced_coroutine(value):
+    await asyncio.sleep(0)
+    return helper(value)
+
+
+@spew_function(trace_names=[__name__], sink=sink)
+def traced_generator(limit):
+    total = 0
+    for value in range(limit):
+        total += (yield helper(value)) or 0
+    return total
+
+
+@spew_function(trace_names=[__name__], sink=sink)
+async def traced_async_generator(limit):
+    for value in range(limit):
+        await asyncio.sleep(0)
+        yield helper(value)
+
+
+@pytest.fixture(autouse=True)
+def clear_sink():
+    sink.clear()
+
+
+@pytest.fixture
+def previous_trace():
+    """Trace function installed before the test, such as coverage's."""
+    return sys.gettrace()
+
+
+def test_traces_function_and_callees(previous_trace):
+    """The decorated function and what it calls are traced, values included."""
+    assert traced(2) == 7
+    output = sink.getvalue()
+    assert "return helper(value) + 1" in output
+    assert "return value * 3" in output
+    assert "\tvalue=2" in output
+    assert sys.gettrace() is previous_trace
+
+
+def test_untraced_outside_call():
+    """Nothing is traced before or after a decorated call."""
+    helper(1)
+    traced(1)
+    helper(5)
+    assert "\tvalue=5" not in sink.getvalue()
+    assert traced.__name__ == "traced"
+
+
+def test_bare_decorator(previous_trace):
+    """spew_function works without arguments."""
+    assert traced_with_defaults(4) == 4
+    assert sys.gettrace() is previous_trace
+
+
+def test_hook_removed_on_exception(previous_trace):
+    """The hook is removed when the function raises."""
+    with pytest.raises(ValueError, match="boom"):
+        failing()
+    assert sys.gettrace() is previous_trace
+    assert "raise ValueError(msg)" in sink.getvalue()
+
+
+def test_recursive_calls_share_one_hook(previous_trace):
+    """Recursive calls run under the hook of the outermost call."""
+    assert countdown(3) == "done"
+    assert sink.getvalue().count("countdown(levels - 1) if levels") == 4
+    assert sys.gettrace() is previous_trace
+
+
+def test_inside_spew_context():
+    """Inside a SpewContext the decorated function keeps the context's hook."""
+    outer_sink = MemorySink()
+    with SpewContext(trace_names=[__name__], sink=outer_sink):
+        traced(1)
+    assert "return value * 3" in outer_sink.getvalue()
+    assert sink.getvalue() == ""
+
+
+def test_calls_from_other_threads_traced(previous_trace):
+    """A call from another thread during a traced call gets a hook of its own."""
+    thread_sink = MemorySink()
+
+    @spew_function(trace_names=[__name__], sink=thread_sink)
+    def in_thread(value):
+        return helper(value)
+
+    @spew_function(trace_names=[__name__], sink=sink)
+    def start_thread():
+        thread = threading.Thread(target=in_thread, args=(7,))
+        thread.start()
+        thread.join()
+
+    start_thread()
+    assert "return value * 3" in thread_sink.getvalue()
+    assert "return value * 3" not in sink.getvalue()
+    assert sys.gettrace() is previous_trace
+    assert not spewer_module._installations
+
+
+def test_coroutine_function(previous_trace):
+    """Coroutine functions are traced until the coroutine finishes."""
+    assert asyncio.run(traced_coroutine(2)) == 6
+    assert "return value * 3" in sink.getvalue()
+    assert sys.gettrace() is previous_trace
+
+
+def test_generator_function(previous_trace):
+    """Generators are traced while they run, not while consumed."""
+    items = []
+    for item in traced_generator(3):
+        items.append(item)
+        helper(item + 100)
+        assert sys.gettrace() is previous_trace
+    assert items == [0, 3, 6]
+    output = sink.getvalue()
+    assert "total += (yield helper(value)) or 0" in output
+    assert "\tvalue=2" in output
+    assert "\tvalue=103" not in output
+    assert not spewer_module._installations
+
+
+def test_generator_send_and_return_value():
+    """Values sent in and the return value pass through the wrapper."""
+    generator = traced_generator(2)
+    assert next(generator) == 0
+    with pytest.raises(StopIteration) as stop:
+        generator.send(5)
+        next(generator)
+    assert stop.value.value == 5
+
+
+def test_generator_closed_early(previous_trace):
+    """Closing the wrapper closes the generator and removes no hook twice."""
+    generator = traced_generator(5)
+    next(generator)
+    generator.close()
+    assert sys.gettrace() is previous_trace
+    assert not spewer_module._installations
+
+
+def test_async_generator_function(previous_trace):
+    """Async generators are traced while they run."""
+
+    async def consume():
+        return [item async for item in traced_async_generator(3)]
+
+    assert asyncio.run(consume()) == [0, 3, 6]
+    assert "yield helper(value)" in sink.getvalue()
+    assert sys.gettrace() is previous_trace
+    assert not spewer_module._installations
+
+
+def test_options_checked_when_decorating():
+    """Invalid options fail at decoration time."""
+    with pytest.raises(TypeError):
+        spew_function(colour=True)
+    with pytest.raises(ValueError, match="backend must be one of"):
+        spew_function(backend="ptrace")
@@ -0,0 +1,191 @@
+"""Tests for call depth tracking."""
+
+import contextlib
+import sys
+
+import pytest  # type: ignore[import-untyped]
+
+from spewer import MemorySink, SpewConfig, SpewContext
+from spewer import spewer as spewer_module
+from spewer.depth import CallDepth
+
+
+class Frame:
+    """Stand-in for a frame object."""
+
+
+def leaf(value):
+    return value + 1
+
+
+def middle(value):
+    return leaf(value) * 2
+
+
+def outer(value):
+    return middle(value) + leaf(value)
+
+
+def descend(levels, seen):
+    seen.append(sys._getframe().f_trace)
+    if levels:
+        return descend(levels - 1, seen)
+    return len(seen)
+
+
+def failing_middle():
+    return leaf(None)
+
+
+def recovering_outer():
+    with contextlib.suppress(TypeError):
+        failing_middle()
+    return leaf(1)
+
+
+def numbers():
+    yield leaf(1)
+    yield leaf(2)
+
+
+def consume():
+    return sum(numbers()) + leaf(0)
+
+
+def call_lines(sink):
+    """Return the traced calls of this module, with their indentation."""
+    return [
+        line.split(f"{__name__}:")[0] + line.split(": ")[-1]
+        for line in sink.getvalue().splitlines()
+        if f"{__name__}:" in line
+        and line.endswith("()")
+        and "SpewContext" not in line
+        and "__exit__" not in line
+    ]
+
+
+def test_call_depth_counts_and_cuts():
+    """Depth follows calls and returns; calls past max_depth are cut off."""
+    depth = CallDepth(max_depth=2)
+    first, second, third, fourth = Frame(), Frame(), Frame(), Frame()
+    assert depth.enter(first)
+    assert depth.enter(second)
+    assert depth.depth == 2
+    assert not depth.enter(third)
+    assert depth.cut_active
+    # Returns from below the cut-off call do not count
+    depth.leave(fourth)
+    assert depth.cut_active
+    depth.leave(third)
+    assert not depth.cut_active
+    assert depth.depth == 2
+    depth.leave(second)
+    depth.leave(first)
+    # Frames that were running before tracing started stay at depth 0
+    depth.leave(Frame())
+    assert depth.depth == 0
+
+
+def test_indented_calls(backend):
+    """Each call is indented once per enclosing traced call."""
+    sink = MemorySink()
+    with SpewContext(
+        trace_names=[__name__],
+        functions_only=True,
+        indent="  ",
+        backend=backend,
+        sink=sink,
+    ):
+        outer(1)
+
+    assert call_lines(sink) == [
+        "  outer()",
+        "    middle()",
+        "      leaf()",
+        "    leaf()",
+    ]
+
+
+def test_indented_lines_and_values(backend):
+    """Line events and their values are indented by their call's depth."""
+    sink = MemorySink()
+    with SpewContext(
+        trace_names=[__name__],
+        show_values=True,
+        indent="| ",
+        backend=backend,
+        sink=sink,
+    ):
+        middle(1)
+
+    lines = sink.getvalue().splitlines()
+    assert f"| {__name__}:" in next(line for line in lines if "leaf(value) * 2" in line)
+    assert f"| | {__name__}:" in next(line for line in lines if "value + 1" in line)
+    assert "| | \tvalue=1" in lines
+
+
+def test_depth_survives_exceptions_and_generators(backend):
+    """Unwinding frames and suspended generators keep the depth right."""
+    sink = MemorySink()
+    with SpewContext(
+        trace_names=[__name__],
+        functions_only=True,
+        indent=" ",
+        backend=backend,
+        sink=sink,
+    ):
+        recovering_outer()
+        consume()
+
+    assert [line for line in call_lines(sink) if line.strip() == "leaf()"] == [
+        "   leaf()",
+        "  leaf()",
+        "   leaf()",
+        "   leaf()",
+        "  leaf()",
+    ]
+
+
+def test_max_depth_cuts_off_deep_calls(backend):
+    """Calls deeper than max_depth are not traced, and tracing resumes after."""
+    sink = MemorySink()
+    with SpewContext(trace_names=[__name__], max_depth=2, backend=backend, sink=sink):
+        descend(5, [])
+        leaf(1)
+
+    output = sink.getvalue()
+    assert output.count("seen.append(sys._getframe().f_trace)") == 2
+    assert "return value + 1" in output
+
+
+def test_cut_off_frames_have_no_local_tracer():
+    """Under sys.settrace only the cut-off call is watched, for its return."""
+    seen = []
+    with SpewContext(
+        trace_names=[__name__], max_depth=2, backend="settrace", sink=MemorySink()
+    ) as context:
+        descend(4, seen)
+
+    hook = context.hook
+    assert seen[:2] == [hook, hook]
+    assert seen[2] == hook._watch_cut
+    assert seen[3:] == [None, None]
+
+
+def test_auto_backend_cuts_off_with_settrace():
+    """max_depth makes backend="auto" pick settrace, even for all threads."""
+    with SpewContext(
+        trace_names=[__name__], all_threads=True, max_depth=2, sink=MemorySink()
+    ) as context:
+        assert sys.gettrace() is context.hook
+        assert spewer_module._monitoring_backend is None
+
+
+def test_invalid_depth_options():
+    """indent must be a string and max_depth a positive integer."""
+    with pytest.raises(TypeError, match="indent must be a string"):
+        SpewConfig(indent=2)
+    with pytest.raises(TypeError, match="max_depth must be an integer"):
+        SpewConfig(max_depth=2.0)
+    with pytest.raises(ValueError, match="max_depth must be at least 1"):
+        SpewConfig(max_depth=0)
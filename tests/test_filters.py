@@ -0,0 +1,136 @@
+"""Tests for module filtering rules."""
+
+import json
+import sysconfig
+
+import pytest  # type: ignore[import-untyped]
+
+from spewer import MemorySink, SpewConfig, SpewContext, TraceHook
+from spewer.filters import ModuleFilter
+
+
+def test_no_rules_match_all():
+    """Without rules every module is traced and lookups are skipped."""
+    module_filter = ModuleFilter()
+    assert module_filter.matches_all
+    assert module_filter("anything", "/x.py")
+
+
+def test_package_prefix():
+    """A package name matches the package and its submodules only."""
+    module_filter = ModuleFilter(["myapp"])
+    assert not module_filter.matches_all
+    assert module_filter("myapp", "/srv/myapp/__init__.py")
+    assert module_filter("myapp.views", "/srv/myapp/views.py")
+    assert module_filter("myapp.views.admin", "/srv/myapp/views/admin.py")
+    assert not module_filter("myapplication", "/srv/myapplication.py")
+    assert not module_filter("flask", "/srv/flask.py")
+
+
+def test_glob():
+    """Globs are matched against the full module name."""
+    module_filter = ModuleFilter(["myapp.*.views"])
+    assert module_filter("myapp.blog.views", "/x.py")
+    assert not module_filter("myapp.views", "/x.py")
+
+
+def test_glob_characters_match_literally():
+    """A name with glob characters, such as "[unknown]", also matches itself."""
+    module_filter = ModuleFilter(["[unknown]"])
+    assert module_filter("[unknown]", "[unknown]")
+    assert not module_filter("unknown", "/x.py")
+
+
+def test_exec_code_traced_by_unknown_name():
+    """Code without a module, such as exec'd code, is traced as "[unknown]"."""
+    sink = MemorySink()
+    with SpewContext(trace_names=["[unknown]"], backend="settrace", sink=sink):
+        exec("value = 1\nvalue += 1", {})
+    assert "[unknown]:2:" in sink.getvalue()
+
+
+def test_path_prefix(tmp_path):
+    """Path rules match files under the directory."""
+    module_filter = ModuleFilter([str(tmp_path)])
+    assert module_filter("anything", str(tmp_path / "pkg" / "mod.py"))
+    assert not module_filter("anything", str(tmp_path) + "-other/mod.py")
+
+
+def test_exclude_wins_over_include():
+    """Excluded modules are not traced even if an include rule matches."""
+    module_filter = ModuleFilter(["myapp"], ["myapp.vendor"])
+    assert module_filter("myapp.views", "/x.py")
+    assert not module_filter("myapp.vendor.six", "/x.py")
+
+
+def test_exclude_stdlib_alias():
+    """The <stdlib> alias excludes standard library files."""
+    module_filter = ModuleFilter(exclude=["<stdlib>", "<site-packages>"])
+    assert not module_filter.matches_all
+    assert not module_filter("json", json.__file__)
+    purelib = sysconfig.get_paths()["purelib"]
+    assert not module_filter("requests", f"{purelib}/requests/__init__.py")
+    assert module_filter("myapp", "/srv/myapp.py")
+
+
+@pytest.mark.parametrize("rule_kind", ["include", "exclude"])
+def test_stdlib_alias_leaves_out_site_packages(rule_kind):
+    """<stdlib> alone does not match packages installed in site-packages."""
+    module_filter = ModuleFilter(**{rule_kind: ["<stdlib>"]})
+    purelib = sysconfig.get_paths()["purelib"]
+    in_stdlib = rule_kind == "include"
+    assert module_filter("json", json.__file__) is in_stdlib
+    assert module_filter("pytest", pytest.__file__) is not in_stdlib
+    assert module_filter("requests", f"{purelib}/requests/__init__.py") is not in_stdlib
+
+
+def test_stdlib_path_is_prefix_of_stdlib_modules():
+    """Sanity check that the alias resolves to the interpreter's stdlib."""
+    assert json.__file__.startswith(sysconfig.get_paths()["stdlib"])
+
+
+def test_verdict_cached_per_module():
+    """Verdicts are computed once per module."""
+    module_filter = ModuleFilter(["myapp"])
+    module_filter("myapp.views", "/x.py")
+    assert module_filter._verdicts == {("myapp.views", "/x.py"): True}
+
+
+def test_empty_include_matches_nothing():
+    """An empty trace_names list traces nothing, as before."""
+    assert not ModuleFilter([])("myapp", "/x.py")
+
+
+def test_invalid_exclude_names():
+    """exclude_names must be a list."""
+    with pytest.raises(TypeError):
+        SpewConfig(exclude_names="myapp")
+
+
+def test_hook_uses_package_prefix():
+    """trace_names entries match submodules in the hook."""
+
+    class MockFrame:
+        f_lineno = 1
+        f_locals: dict = {}  # noqa: RUF012
+
+        def __init__(self, name):
+            self.f_globals = {"__file__": f"/srv/{name}.py", "__name__": name}
+            self.f_code = type("MockCode", (), {"co_name": "view"})()
+
+    hook = TraceHook(SpewConfig(trace_names=["myapp"]))
+    assert hook(MockFrame("myapp.views"), "call", None) is hook
+    assert hook(MockFrame("werkzeug.serving"), "call", None) is None
+
+
+def test_exclude_names_with_context(capsys):
+    """Excluding the current module silences its events."""
+
+    def work():
+        value = 1
+        return [value]
+
+    with SpewContext(exclude_names=[__name__]):
+        work()
+
+    assert "value = 1" not in capsys.readouterr().out
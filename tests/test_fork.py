@@ -0,0 +1,148 @@
+"""Tests for fork safety and per-process output."""
+
+import os
+
+import pytest  # type: ignore[import-untyped]
+
+from spewer import (
+    AsyncSink,
+    BinarySink,
+    FileSink,
+    FlightRecorder,
+    SpewContext,
+    spew,
+    unspew,
+)
+from spewer.binary import merge
+from spewer.cli import main
+from spewer.sinks import pid_path
+
+requires_fork = pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+
+
+def work(value):
+    doubled = value * 2
+    return doubled + 1
+
+
+def fork_and_trace(sink, child_value, parent_value):
+    """Trace work() in a forked child and then in the parent."""
+    spew(trace_names=[__name__], show_values=True, sink=sink)
+    pid = os.fork()
+    if pid == 0:
+        try:
+            work(child_value)
+            unspew()
+            sink.close()
+        finally:
+            os._exit(0)
+    _, status = os.waitpid(pid, 0)
+    assert status == 0
+    work(parent_value)
+    unspew()
+    sink.close()
+    return pid
+
+
+def test_pid_path():
+    """{pid} is replaced by the current process id."""
+    assert str(pid_path("trace.{pid}.log")) == f"trace.{os.getpid()}.log"
+    assert str(pid_path("trace.log")) == "trace.log"
+
+
+@requires_fork
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+def test_file_sink_per_process(tmp_path):
+    """Each process writes its own file, and pending output is not duplicated."""
+    sink = FileSink(tmp_path / "trace.{pid}.log")
+    sink.write("before fork\n")
+    child = fork_and_trace(sink, 10, 20)
+
+    parent_output = (tmp_path / f"trace.{os.getpid()}.log").read_text()
+    child_output = (tmp_path / f"trace.{child}.log").read_text()
+    assert parent_output.startswith("before fork\n")
+    assert "before fork" not in child_output
+    assert "doubled=40" in parent_output
+    assert "doubled=20" in child_output
+    assert "doubled=20" not in parent_output
+
+
+@requires_fork
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+def test_async_sink_restarts_writer_in_child(tmp_path):
+    """The child gets a writer thread of its own."""
+    sink = AsyncSink(FileSink(tmp_path / "trace.{pid}.log"))
+    child = fork_and_trace(sink, 10, 20)
+    assert not sink._thread.is_alive()
+    assert "doubled=20" in (tmp_path / f"trace.{child}.log").read_text()
+    assert "doubled=40" in (tmp_path / f"trace.{os.getpid()}.log").read_text()
+
+
+@requires_fork
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+def test_binary_traces_merge_by_time(tmp_path, capsys):
+    """Per-process binary traces merge into one stream ordered by time."""
+    sink = BinarySink(tmp_path / "trace.{pid}.bin")
+    child = fork_and_trace(sink, 10, 20)
+
+    paths = [tmp_path / f"trace.{pid}.bin" for pid in (os.getpid(), child)]
+    streams = [path.open("rb") for path in paths]
+    try:
+        lines = "".join(merge(streams)).splitlines()
+    finally:
+        for stream in streams:
+            stream.close()
+
+    events = [line for line in lines if not line.startswith("\t")]
+    child_lines = [i for i, line in enumerate(events) if line.startswith(f"[{child}]")]
+    parent_lines = [
+        i for i, line in enumerate(events) if line.startswith(f"[{os.getpid()}]")
+    ]
+    assert child_lines
+    assert parent_lines
+    # The child ran to completion before the parent traced anything else
+    assert max(child_lines) < max(parent_lines)
+    assert "\tdoubled=20" in lines
+
+    assert main(["merge", *map(str, paths)]) == 0
+    assert capsys.readouterr().out == "\n".join(lines) + "\n"
+
+
+@requires_fork
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+def test_binary_sink_without_pid_stops_in_child(tmp_path):
+    """A child cannot share a binary trace, so it stops writing to it."""
+    path = tmp_path / "trace.bin"
+    sink = BinarySink(path)
+    fork_and_trace(sink, 10, 20)
+    with path.open("rb") as stream:
+        text = "".join(merge([stream]))
+    assert "doubled=40" in text
+    assert "doubled=20" not in text
+
+
+@requires_fork
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+def test_flight_recorder_starts_empty_in_child(tmp_path):
+    """A forked child gets its own, empty ring."""
+    recorder = FlightRecorder(
+        path=tmp_path / "ring.{pid}", dump_on_exception=False, capacity=100
+    )
+    recorder.write("parent\n")
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.write(write_fd, str(len(recorder.entries())).encode())
+            with SpewContext(trace_names=[__name__], sink=recorder):
+                work(1)
+            recorder.close()
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+    os.close(write_fd)
+    assert os.read(read_fd, 16) == b"0"
+    os.close(read_fd)
+    assert recorder.entries() == ["parent\n"]
+    assert (tmp_path / f"ring.{pid}").exists()
+    recorder.close()
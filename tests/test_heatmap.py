@@ -0,0 +1,76 @@
+"""Tests for the line heatmap mode."""
+
+import inspect
+
+import pytest  # type: ignore[import-untyped]
+
+from spewer import MemorySink, SpewConfig, SpewContext
+
+
+def hot(count):
+    total = 0
+    for i in range(count):
+        total += i
+    if count < 0:
+        total = -1
+    return total
+
+
+def line_of(func, text):
+    """Return the line number of the line of ``func`` containing ``text``."""
+    lines, start = inspect.getsourcelines(func)
+    return start + next(i for i, line in enumerate(lines) if text in line)
+
+
+def test_line_hits(backend):
+    """Each traced line is counted instead of written."""
+    sink = MemorySink()
+    with SpewContext(
+        trace_names=[__name__], heatmap=True, backend=backend, sink=sink
+    ) as context:
+        hot(50)
+        hot(10)
+
+    module, hits = context.hook.heatmap.hits()[__file__]
+    assert module == __name__
+    assert hits[line_of(hot, "total += i")] == 60
+    assert hits[line_of(hot, "total = 0")] == 2
+    # Lines that never ran are listed with 0 hits
+    assert hits[line_of(hot, "total = -1")] == 0
+    assert f"{__name__}:" not in sink.getvalue().replace(f"in {__name__} (", "")
+
+
+def test_annotated_listing():
+    """unspew() writes the traced source annotated with hit counts."""
+    sink = MemorySink()
+    with SpewContext(trace_names=[__name__], heatmap=True, sink=sink):
+        hot(5)
+
+    output = sink.getvalue()
+    assert output.startswith(f"[spewer] line hits in {__name__} ({__file__}):\n")
+    listing = output.splitlines()
+    assert f"{5:>10}          total += i" in listing
+    assert f"{0:>10}          total = -1" in listing
+    # Lines that are not code have no count
+    assert f"{'':>10}  import inspect" in listing
+
+
+def test_heatmap_with_stats():
+    """Both counting modes can be used together."""
+    sink = MemorySink()
+    with SpewContext(
+        trace_names=[__name__], heatmap=True, stats=True, sink=sink
+    ) as context:
+        hot(3)
+
+    assert {row.func_name for row in context.hook.stats.rows()} >= {"hot"}
+    _, hits = context.hook.heatmap.hits()[__file__]
+    assert hits[line_of(hot, "total += i")] == 3
+    assert "[spewer] call statistics" in sink.getvalue()
+    assert "[spewer] line hits" in sink.getvalue()
+
+
+def test_invalid_heatmap_option():
+    """heatmap must be a boolean."""
+    with pytest.raises(TypeError, match="heatmap must be a boolean"):
+        SpewConfig(heatmap=1)
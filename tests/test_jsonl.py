@@ -0,0 +1,122 @@
+"""Tests for the JSON Lines trace format."""
+
+import contextlib
+import json
+import threading
+
+import pytest  # type: ignore[import-untyped]
+
+from spewer import JsonLinesSink, MemorySink, SpewConfig, SpewContext, load_config
+from spewer.sinks import FileSink
+
+
+def traced_function(value):
+    result = value * 2
+    return result + 1
+
+
+def raising_function():
+    msg = "boom"
+    raise ValueError(msg)
+
+
+def trace_records(func, *args, **options):
+    memory = MemorySink()
+    sink = JsonLinesSink(memory)
+    with (
+        SpewContext(trace_names=[__name__], sink=sink, **options),
+        contextlib.suppress(ValueError),
+    ):
+        func(*args)
+    return [json.loads(line) for line in memory.getvalue().splitlines()], sink
+
+
+def test_line_events():
+    """Each event is a JSON object with its location, thread and values."""
+    records, _ = trace_records(traced_function, 20, show_values=True)
+    first, second = (
+        record for record in records if record["function"] == "traced_function"
+    )
+    assert first["event"] == "line"
+    assert first["module"] == __name__
+    assert first["file"] == __file__
+    assert first["source"] == "result = value * 2"
+    assert first["values"] == {"value": "20"}
+    assert second["line"] == first["line"] + 1
+    assert second["values"] == {"result": "40"}
+    assert first["thread"] == threading.current_thread().name
+    assert first["thread_id"] == threading.get_ident()
+    assert first["timestamp"] <= second["timestamp"]
+
+
+def test_returns_and_exceptions():
+    """Return values and exceptions get fields of their own."""
+    records, _ = trace_records(
+        traced_function,
+        1,
+        functions_only=True,
+        trace_returns=True,
+        show_values=True,
+    )
+    call, returned = records
+    assert call["event"] == "call"
+    assert call["function"] == "traced_function"
+    assert call["values"] == {"value": "1"}
+    assert returned["event"] == "return"
+    assert returned["value"] == "3"
+
+    records, _ = trace_records(
+        raising_function, trace_exceptions=True, show_values=True
+    )
+    raised = [record for record in records if record["event"] == "exception"]
+    assert raised[0]["exception"] == {
+        "type": "ValueError",
+        "value": "ValueError('boom')",
+    }
+
+
+def test_templates_are_reused():
+    """The fixed part of an event is serialized once per code line."""
+    records, sink = trace_records(
+        lambda: [traced_function(n) for n in range(5)], show_values=False
+    )
+    lines = [record for record in records if record["function"] == "traced_function"]
+    assert len(lines) == 10
+    assert "values" not in lines[1]
+    assert len(sink._templates) == len({(r["function"], r["line"]) for r in records})
+
+
+def test_text_and_unusual_strings():
+    """Preformatted output and non-ASCII text stay valid JSON."""
+    memory = MemorySink()
+    sink = JsonLinesSink(memory)
+    sink.write("calls  total\n\udc80 é\n")
+    (record,) = [json.loads(line) for line in memory.getvalue().splitlines()]
+    assert record["event"] == "text"
+    assert record["text"] == "calls  total\n\udc80 é\n"
+
+    with pytest.raises(TypeError, match="sink must be a Sink instance"):
+        JsonLinesSink("trace.jsonl")
+
+
+def test_all_threads_not_buffered():
+    """With all_threads, events go straight to the JSON sink."""
+    sink = JsonLinesSink(MemorySink())
+    with SpewContext(all_threads=True, sink=sink, backend="settrace") as context:
+        assert context.hook.sink is sink
+
+
+def test_output_format_from_environment(tmp_path):
+    """SPEWER_OUTPUT_FORMAT=jsonl wraps the output in a JsonLinesSink."""
+    config = load_config(
+        environ={
+            "SPEWER_OUTPUT": str(tmp_path / "trace.jsonl"),
+            "SPEWER_OUTPUT_FORMAT": "jsonl",
+        }
+    )
+    assert isinstance(config.sink, JsonLinesSink)
+    assert isinstance(config.sink.sink, FileSink)
+    config.sink.close()
+    with pytest.raises(ValueError, match="output_format must be one of"):
+        load_config(environ={"SPEWER_OUTPUT_FORMAT": "xml"})
+    assert isinstance(SpewConfig(sink=JsonLinesSink()).sink, JsonLinesSink)
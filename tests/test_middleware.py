@@ -0,0 +1,150 @@
+"""Tests for the WSGI and ASGI middleware tracing selected requests."""
+
+import asyncio
+import sys
+
+import pytest  # type: ignore[import-untyped]
+
+from spewer import ASGIMiddleware, MemorySink, SpewConfig, WSGIMiddleware
+from spewer import spewer as spewer_module
+
+
+def handle(path):
+    text = path.strip()
+    return text.encode()
+
+
+def wsgi_app(environ, start_response):
+    body = handle(environ["PATH_INFO"])
+    start_response("200 OK", [("Content-Type", "text/plain")])
+    return [body]
+
+
+def call_wsgi(middleware, path, **headers):
+    environ = {"PATH_INFO": path}
+    for name, value in headers.items():
+        environ["HTTP_" + name.upper()] = value
+    responses = []
+
+    def start_response(status, headers, _exc_info=None):
+        responses.append((status, dict(headers)))
+
+    body = middleware(environ, start_response)
+    return b"".join(body), responses[0][1]
+
+
+async def asgi_app(scope, _receive, send):
+    await asyncio.sleep(0)
+    body = handle(scope["path"])
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": body})
+
+
+def call_asgi(middleware, *paths, **headers):
+    """Run requests for ``paths`` concurrently; return their response headers."""
+    raw_headers = [
+        (name.replace("_", "-").lower().encode(), value.encode())
+        for name, value in headers.items()
+    ]
+
+    async def request(path):
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {"type": "http", "path": path, "headers": raw_headers}
+        await middleware(scope, None, send)
+        return dict(messages[0]["headers"])
+
+    async def main():
+        return await asyncio.gather(*(request(path) for path in paths))
+
+    return asyncio.run(main())
+
+
+def config(**options):
+    return SpewConfig(trace_names=[__name__], **options)
+
+
+def test_wsgi_untraced_request():
+    """Requests without the header run without a hook or a trace."""
+    previous_trace = sys.gettrace()
+    middleware = WSGIMiddleware(wsgi_app, config())
+    body, headers = call_wsgi(middleware, "/plain")
+    assert body == b"/plain"
+    assert "X-Request-ID" not in headers
+    assert not middleware.traces
+    assert sys.gettrace() is previous_trace
+    assert spewer_module._active_hook is None
+
+
+def test_wsgi_trigger_header():
+    """The trigger header traces a request into a buffer of its own."""
+    previous_trace = sys.gettrace()
+    middleware = WSGIMiddleware(wsgi_app, config())
+    _, first = call_wsgi(middleware, "/first", X_SPEWER_TRACE="1")
+    _, second = call_wsgi(
+        middleware, "/second", X_SPEWER_TRACE="yes", X_REQUEST_ID="abc"
+    )
+    call_wsgi(middleware, "/off", X_SPEWER_TRACE="0")
+
+    request_id = first["X-Request-ID"]
+    assert "X-Request-ID" not in second
+    assert list(middleware.traces) == [request_id, "abc"]
+    assert "path='/first'" in middleware.traces[request_id]
+    assert "path='/second'" not in middleware.traces[request_id]
+    assert "path='/second'" in middleware.traces["abc"]
+    assert sys.gettrace() is previous_trace
+
+
+def test_wsgi_sampling_and_output():
+    """sample_rate selects requests; traces go to the configured sink too."""
+    sink = MemorySink()
+    middleware = WSGIMiddleware(wsgi_app, config(sink=sink), sample_rate=1.0)
+    call_wsgi(middleware, "/sampled", X_REQUEST_ID="r1")
+    assert sink.getvalue().startswith("[spewer] request r1:\n")
+    assert "path='/sampled'" in sink.getvalue()
+
+    middleware = WSGIMiddleware(wsgi_app, config(), sample_rate=0.0, max_traces=1)
+    call_wsgi(middleware, "/skipped")
+    assert not middleware.traces
+    call_wsgi(middleware, "/a", X_SPEWER_TRACE="1", X_REQUEST_ID="a")
+    call_wsgi(middleware, "/b", X_SPEWER_TRACE="1", X_REQUEST_ID="b")
+    assert list(middleware.traces) == ["b"]
+
+
+def test_invalid_options():
+    with pytest.raises(ValueError, match="sample_rate must be between 0 and 1"):
+        WSGIMiddleware(wsgi_app, sample_rate=2)
+    with pytest.raises(ValueError, match="max_traces must be a positive integer"):
+        ASGIMiddleware(asgi_app, max_traces=0)
+
+
+def test_asgi_concurrent_requests():
+    """Concurrent traced requests on one loop get separate traces."""
+    previous_trace = sys.gettrace()
+    middleware = ASGIMiddleware(asgi_app, config())
+    headers = call_asgi(middleware, "/one", "/two", X_SPEWER_TRACE="1")
+
+    ids = [response[b"x-request-id"].decode() for response in headers]
+    assert sorted(middleware.traces) == sorted(ids)
+    one, two = (middleware.traces[request_id] for request_id in ids)
+    assert "path='/one'" in one and "path='/two'" not in one
+    assert "path='/two'" in two and "path='/one'" not in two
+    assert sys.gettrace() is previous_trace
+
+
+def test_asgi_untraced_requests():
+    """Unselected requests and other scopes pass straight through."""
+    previous_trace = sys.gettrace()
+    middleware = ASGIMiddleware(asgi_app, config())
+    headers = call_asgi(middleware, "/plain")
+    assert headers == [{}]
+
+    async def lifespan(scope, _receive, _send):
+        assert scope["type"] == "lifespan"
+
+    asyncio.run(ASGIMiddleware(lifespan)({"type": "lifespan"}, None, None))
+    assert not middleware.traces
+    assert sys.gettrace() is previous_trace
@@ -0,0 +1,203 @@
+"""Tests for the sys.monitoring backend."""
+
+import sys
+import threading
+
+import pytest  # type: ignore[import-untyped]
+
+from spewer import MemorySink, SpewConfig, SpewContext, spew, unspew
+from spewer import spewer as spewer_module
+from spewer.monitoring import AVAILABLE, MonitoringBackend
+from spewer.trace import TraceHook
+
+requires_monitoring = pytest.mark.skipif(
+    not AVAILABLE, reason="sys.monitoring requires Python 3.12+"
+)
+
+
+def fail():
+    msg = "boom"
+    raise ValueError(msg)
+
+
+def spew_failure(backend):
+    """Return the output of a hook installed and removed around fail()."""
+    sink = MemorySink()
+    spew(trace_names=[__name__], trace_returns=True, backend=backend, sink=sink)
+    with pytest.raises(ValueError, match="boom"):
+        fail()
+    unspew()
+    return sink.getvalue()
+
+
+def test_invalid_backend():
+    """Unknown backend names are rejected by the configuration."""
+    with pytest.raises(ValueError):
+        SpewConfig(backend="ptrace")
+
+
+@pytest.mark.skipif(AVAILABLE, reason="only relevant before Python 3.12")
+def test_monitoring_backend_unavailable():
+    """Requesting sys.monitoring on an older interpreter raises."""
+    with pytest.raises(RuntimeError):
+        spew(backend="monitoring")
+    unspew()
+
+
+def test_auto_backend_falls_back_to_settrace():
+    """The settrace backend is used when sys.monitoring is not selected."""
+    previous = sys.gettrace()
+    spew(backend="settrace")
+    try:
+        assert sys.gettrace() is not previous
+        assert spewer_module._monitoring_backend is None
+    finally:
+        unspew()
+    assert sys.gettrace() is previous
+
+
+def test_auto_backend_traces_one_thread_with_settrace():
+    """Without all_threads, spew() installs a trace function on every version."""
+    previous = sys.gettrace()
+    spew()
+    try:
+        assert sys.gettrace() is not previous
+        assert spewer_module._monitoring_backend is None
+    finally:
+        unspew()
+    assert sys.gettrace() is previous
+
+
+@requires_monitoring
+def test_auto_backend_uses_monitoring():
+    """On 3.12+ spew(all_threads=True) registers with sys.monitoring."""
+    spew(all_threads=True)
+    try:
+        assert sys.gettrace() is None
+        assert spewer_module._monitoring_backend is not None
+        tool_id = spewer_module._monitoring_backend.tool_id
+        assert sys.monitoring.get_tool(tool_id) == "spewer"
+    finally:
+        unspew()
+    assert sys.monitoring.get_tool(tool_id) is None
+
+
+@requires_monitoring
+def test_backends_report_the_same_events():
+    """Neither backend traces the caller of spew(); both report exits."""
+    output = spew_failure("monitoring")
+    assert output == spew_failure("settrace")
+    assert "unspew()" not in output
+    assert "raise ValueError(msg)" in output
+    assert output.endswith("raise ValueError(msg) -> <return>\n")
+
+
+@requires_monitoring
+def test_only_needed_events_registered():
+    """Events are registered according to the configuration."""
+    events = sys.monitoring.events
+    hook = TraceHook(SpewConfig(functions_only=True, trace_returns=True))
+    backend = MonitoringBackend(hook)
+    backend.install()
+    try:
+        mask = sys.monitoring.get_events(backend.tool_id)
+    finally:
+        backend.uninstall()
+    assert mask == events.PY_START | events.CALL | events.PY_RETURN | events.PY_UNWIND
+    assert not mask & events.LINE
+
+
+@requires_monitoring
+def test_line_tracing(capsys):
+    """Line events are printed in the same format as the settrace backend."""
+
+    def add(a, b):
+        total = a + b
+        return [total]
+
+    with SpewContext(trace_names=[__name__], show_values=True):
+        add(1, 2)
+
+    output = capsys.readouterr().out
+    assert f"{__name__}:" in output
+    assert "total = a + b" in output
+    assert "a=1 b=2" in output
+
+
+@requires_monitoring
+def test_filtered_locations_are_disabled(capsys):
+    """Filtered modules produce no output and are disabled after one event."""
+    calls = []
+    hook = TraceHook(SpewConfig(trace_names=["nothing_matches"]))
+    original = hook._is_traced
+
+    def counting_is_traced(frame):
+        calls.append(frame.f_lineno)
+        return original(frame)
+
+    hook._is_traced = counting_is_traced
+    backend = MonitoringBackend(hook)
+
+    def loop():
+        total = 0
+        for i in range(100):
+            total += i
+        return total
+
+    backend.install()
+    try:
+        loop()
+    finally:
+        backend.uninstall()
+
+    assert capsys.readouterr().out == ""
+    # Each line location reports once before DISABLE silences it
+    assert len(calls) < 20
+
+
+@requires_monitoring
+def test_functions_only_with_builtins(capsys):
+    """Built-in calls are reported like setprofile's c_call events."""
+
+    def work(data):
+        return len(data)
+
+    with SpewContext(functions_only=True, trace_returns=True):
+        work([1, 2, 3])
+
+    output = capsys.readouterr().out
+    assert "work()" in output
+    assert "builtins: len()" in output
+
+
+@requires_monitoring
+def test_exception_tracing(capsys):
+    """RAISE events are reported as exception events."""
+
+    def fail():
+        msg = "boom"
+        raise ValueError(msg)
+
+    with (
+        SpewContext(trace_names=[__name__], trace_exceptions=True, show_values=True),
+        pytest.raises(ValueError),
+    ):
+        fail()
+
+    assert "ValueError('boom')" in capsys.readouterr().out
+
+
+@requires_monitoring
+def test_other_threads_not_traced(capsys):
+    """Like settrace, only the thread that called spew() is traced."""
+
+    def worker():
+        marker = "from-worker"
+        return [marker]
+
+    with SpewContext(trace_names=[__name__]):
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+
+    assert "from-worker" not in capsys.readouterr().out
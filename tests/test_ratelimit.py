@@ -0,0 +1,121 @@
+"""Tests for event rate limiting."""
+
+import pytest  # type: ignore[import-untyped]
+
+from spewer import MemorySink, SpewConfig, SpewContext
+from spewer.ratelimit import RateLimiter, TokenBucket
+
+
+class Clock:
+    """Manually advanced clock."""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class Info:
+    """Stand-in for CodeInfo."""
+
+    def __init__(self, name, func_name):
+        self.name = name
+        self.func_name = func_name
+
+
+def hot_loop(count):
+    total = 0
+    for i in range(count):
+        total += i
+    return total
+
+
+def test_token_bucket_refills():
+    """Tokens are spent and refilled at the configured rate."""
+    bucket = TokenBucket(2, now=0.0)
+    assert bucket.take(0.0)
+    assert bucket.take(0.0)
+    assert not bucket.take(0.0)
+    assert bucket.take(0.5)
+    assert not bucket.take(0.5)
+    # Never more than one second of budget
+    assert [bucket.take(10.0) for _ in range(3)] == [True, True, False]
+
+
+def test_global_limit_and_summary():
+    """Events over the global budget are counted and summarized."""
+    clock = Clock()
+    limiter = RateLimiter(rate=3, clock=clock)
+    hot, cold = Info("app", "hot"), Info("app", "cold")
+    results = [limiter.allow(hot) for _ in range(10)]
+    assert results == [True] * 3 + [False] * 7
+    assert not limiter.allow(cold)
+    assert not limiter.summary_due
+
+    clock.now += 1.0
+    assert limiter.allow(hot)
+    assert limiter.summary_due
+    assert limiter.summary() == (
+        "[spewer] suppressed 8 events in 1.0s: app:hot (7), app:cold (1)\n"
+    )
+    assert limiter.summary() is None
+    assert not limiter.summary_due
+
+
+def test_per_code_limit():
+    """Each code object gets its own budget."""
+    limiter = RateLimiter(code_rate=2, clock=Clock())
+    first, second = Info("app", "first"), Info("app", "second")
+    assert [limiter.allow(first) for _ in range(3)] == [True, True, False]
+    assert [limiter.allow(second) for _ in range(3)] == [True, True, False]
+    assert limiter.allow(("builtins", "len"))
+
+
+def test_summary_lists_busiest_locations():
+    """Only the busiest locations are named in a summary."""
+    limiter = RateLimiter(rate=1, clock=Clock())
+    limiter.allow(("builtins", "len"))
+    for index in range(7):
+        for _ in range(index + 1):
+            limiter.allow(Info("app", f"f{index}"))
+    summary = limiter.summary()
+    assert summary.startswith("[spewer] suppressed 28 events")
+    assert "app:f6 (7), app:f5 (6)" in summary
+    assert summary.endswith(", 2 more\n")
+
+
+def test_rate_limited_tracing():
+    """A hot loop is cut down to the budget and summarized on unspew."""
+    sink = MemorySink()
+    with SpewContext(trace_names=[__name__], sink=sink, code_rate_limit=10):
+        hot_loop(1000)
+
+    lines = sink.getvalue().splitlines()
+    assert len([line for line in lines if "total" in line or "for i" in line]) == 10
+    assert lines[-1].startswith("[spewer] suppressed ")
+    assert f"{__name__}:hot_loop (" in lines[-1]
+
+
+def test_no_limiter_by_default():
+    """Without limits events go straight to the sink."""
+    sink = MemorySink()
+    with SpewContext(sink=sink) as context:
+        assert context.hook._rate_limiter is None
+        assert context.hook._submit == sink.submit
+
+
+@pytest.mark.parametrize(
+    ("options", "error"),
+    [
+        ({"rate_limit": 0}, ValueError),
+        ({"code_rate_limit": -1.0}, ValueError),
+        ({"rate_limit": "100"}, TypeError),
+        ({"summary_interval": None}, TypeError),
+        ({"summary_interval": 0}, ValueError),
+    ],
+)
+def test_invalid_rate_limit_options(options, error):
+    """Rate limit options are validated."""
+    with pytest.raises(error):
+        SpewConfig(**options)
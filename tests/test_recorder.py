@@ -0,0 +1,177 @@
+"""Tests for the flight recorder sink."""
+
+import os
+import signal
+import sys
+import threading
+
+import pytest  # type: ignore[import-untyped]
+
+from spewer import FlightRecorder, MemorySink, SpewContext
+from spewer.cli import main
+from spewer.recorder import read_recording
+
+
+def traced_function(value):
+    result = value * 2
+    return result + 1
+
+
+def run_traced(recorder, times=1):
+    with SpewContext(trace_names=[__name__], show_values=True, sink=recorder):
+        for i in range(times):
+            traced_function(i)
+
+
+@pytest.fixture
+def recorder():
+    sinks = []
+
+    def make(**kwargs):
+        kwargs.setdefault("output", MemorySink())
+        sink = FlightRecorder(**kwargs)
+        sinks.append(sink)
+        return sink
+
+    yield make
+    for sink in sinks:
+        sink.close()
+
+
+def test_nothing_written_until_dump(recorder, capsys):
+    """Events are kept in memory and only written when dumped."""
+    sink = recorder()
+    run_traced(sink)
+    assert sink.output.getvalue() == ""
+    assert capsys.readouterr().out == ""
+
+    sink.dump()
+    output = sink.output.getvalue()
+    assert output.startswith("--- spewer flight recorder: last ")
+    assert "return result + 1\n\tresult=0\n" in output
+    assert output.endswith("--- end of flight recorder ---\n")
+
+
+def test_keeps_only_last_events(recorder):
+    """The ring buffer overwrites the oldest events."""
+    sink = recorder(capacity=3)
+    run_traced(sink, times=5)
+    entries = sink.entries()
+    assert len(entries) == 3
+    assert sink.recorded > 3
+    assert "result=8" in "".join(entries)
+    assert "result=0" not in "".join(entries)
+
+    sink.clear()
+    assert sink.entries() == []
+
+
+def test_all_threads_recorded_as_they_happen(recorder):
+    """With all_threads, each event of another thread gets a ring entry."""
+    sink = recorder(capacity=2)
+    with SpewContext(
+        trace_names=[__name__], all_threads=True, backend="settrace", sink=sink
+    ) as context:
+        assert context.hook.sink is sink
+        thread = threading.Thread(target=traced_function, args=(7,))
+        thread.start()
+        thread.join()
+        entries = sink.entries()
+    assert entries == [
+        f"{__name__}:16:     result = value * 2\n",
+        f"{__name__}:17:     return result + 1\n",
+    ]
+
+
+def test_dump_on_unhandled_exception(recorder):
+    """An unhandled exception dumps the buffer before the traceback."""
+    previous = sys.excepthook
+    sink = recorder()
+    assert sys.excepthook == sink._excepthook
+    run_traced(sink)
+
+    calls = []
+    sink._previous_excepthook = lambda *args: calls.append(args)
+    error = ValueError("boom")
+    sys.excepthook(ValueError, error, None)
+    assert "result = value * 2" in sink.output.getvalue()
+    assert calls == [(ValueError, error, None)]
+
+    sink._previous_excepthook = previous
+    sink.close()
+    assert sys.excepthook is previous
+
+
+def test_dump_on_thread_exception(recorder):
+    """Unhandled exceptions in threads dump the buffer too."""
+    previous = threading.excepthook
+    sink = recorder()
+    sink._previous_threading_excepthook = lambda _args: None
+    sink.write("before\n")
+
+    def fail():
+        msg = "boom"
+        raise ValueError(msg)
+
+    thread = threading.Thread(target=fail)
+    thread.start()
+    thread.join()
+    assert "before\n" in sink.output.getvalue()
+
+    sink._previous_threading_excepthook = previous
+    sink.close()
+    assert threading.excepthook is previous
+
+
+def test_exception_hooks_optional(recorder):
+    """dump_on_exception=False leaves the exception hooks alone."""
+    previous = sys.excepthook
+    recorder(dump_on_exception=False)
+    assert sys.excepthook is previous
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGUSR1"), reason="requires SIGUSR1")
+def test_dump_on_signal(recorder):
+    """The configured signal dumps the buffer."""
+    previous = signal.getsignal(signal.SIGUSR1)
+    sink = recorder(dump_signal=signal.SIGUSR1)
+    sink.write("before signal\n")
+    os.kill(os.getpid(), signal.SIGUSR1)
+    assert "before signal\n" in sink.output.getvalue()
+    sink.close()
+    assert signal.getsignal(signal.SIGUSR1) == previous
+
+
+def test_mmap_recording_survives_process(recorder, tmp_path, capsys):
+    """A file-backed ring can be read back without the recorder."""
+    path = tmp_path / "trace.ring"
+    sink = recorder(capacity=4, path=path, slot_size=32)
+    run_traced(sink, times=3)
+    sink.write("x" * 100 + "\n")
+    sink.flush()
+
+    entries = read_recording(path)
+    assert entries == sink.entries()
+    assert len(entries) == 4
+    assert entries[-1] == "x" * 30 + "\n"
+
+    assert main(["dump", str(path)]) == 0
+    assert capsys.readouterr().out == "".join(entries)
+
+
+def test_read_recording_rejects_other_files(tmp_path):
+    """Files that are not flight recordings are rejected."""
+    path = tmp_path / "trace.log"
+    path.write_text("plain text\n" * 10)
+    with pytest.raises(ValueError):
+        read_recording(path)
+
+
+def test_invalid_arguments():
+    """Bad capacities, slot sizes and outputs are rejected."""
+    with pytest.raises(ValueError):
+        FlightRecorder(capacity=0, dump_on_exception=False)
+    with pytest.raises(ValueError):
+        FlightRecorder(slot_size=8, dump_on_exception=False)
+    with pytest.raises(TypeError):
+        FlightRecorder(output=sys.stdout, dump_on_exception=False)
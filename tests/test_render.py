@@ -0,0 +1,142 @@
+"""Tests for bounded value rendering."""
+
+import array
+
+import pytest  # type: ignore[import-untyped]
+
+from spewer import MemorySink, SpewConfig, SpewContext, ValueRenderer
+
+
+class FakeArray:
+    """Array-like object with a shape, like a NumPy array."""
+
+    shape = (1000, 3)
+    dtype = "float64"
+    size = 3000
+
+    def __repr__(self):
+        msg = "large arrays must not be repr()'d"
+        raise AssertionError(msg)
+
+
+def build(data):
+    return len(data)
+
+
+def test_small_values_match_repr():
+    """Values within the limits render like repr()."""
+    render = ValueRenderer()
+    for value in (41, 2.5, "text", b"data", None, [1, 2], (1,), {"a": 1}, {3}):
+        assert render(value) == repr(value)
+
+
+def test_long_strings_and_bytes_are_cut():
+    """Strings and bytes show their first characters and their length."""
+    render = ValueRenderer(max_string=5)
+    assert render("abcdefgh") == "'abcde'... (8 chars)"
+    assert render(b"abcdefgh") == "b'abcde'... (8 bytes)"
+
+
+def test_big_containers_show_their_size():
+    """Containers show max_items items, then how many there are."""
+    render = ValueRenderer(max_items=3)
+    assert render(list(range(100))) == "[0, 1, 2, ...] (100 items)"
+    assert render(dict.fromkeys("zyxw", 0)) == "{'z': 0, 'y': 0, 'x': 0, ...} (4 items)"
+    assert render(array.array("i", range(5))) == "array('i', [0, 1, 2, ...])"
+
+
+def test_depth_limit():
+    """Containers nested deeper than max_depth are elided."""
+    render = ValueRenderer(max_depth=2)
+    assert render([[[1]], 2]) == "[[[...]], 2]"
+
+
+def test_total_length_limit():
+    """Renderings never exceed max_length characters."""
+    render = ValueRenderer(max_length=20)
+    text = render([10**10] * 5)
+    assert len(text) == 20
+    assert text.endswith("...")
+
+
+def test_buffers_are_summarized():
+    """Large buffers are described, not dumped."""
+    render = ValueRenderer(max_string=4)
+    assert render(bytearray(100)) == "<bytearray len=100>"
+    assert render(memoryview(b"abcdef")) == (
+        "<memoryview nbytes=6 format='B' shape=(6,)>"
+    )
+    assert render(FakeArray()) == "<FakeArray shape=(1000, 3) dtype=float64>"
+
+
+def test_failing_repr_gets_placeholder():
+    """An exception in __repr__ is replaced by a placeholder."""
+
+    class Broken:
+        def __repr__(self):
+            raise ValueError
+
+    assert ValueRenderer()(Broken()).startswith("<Broken instance at 0x")
+
+
+def test_immutable_values_are_cached():
+    """Renderings of strings and numbers come from the LRU cache."""
+    render = ValueRenderer(cache_size=2)
+    render("x" * 10)
+    render("x" * 10)
+    render([1, 2])
+    info = render.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+    # Equal values of different types are cached separately
+    assert (render(1), render(1.0), render(True)) == ("1", "1.0", "True")
+    assert ValueRenderer(cache_size=0).cache_info() is None
+
+
+def test_long_strings_are_not_cached():
+    """Strings and bytes longer than max_string are not kept alive by the cache."""
+    render = ValueRenderer(max_string=8)
+    render("x" * 1000)
+    render(b"y" * 1000)
+    render("short")
+    assert render.cache_info().currsize == 1
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [{"max_length": 0}, {"max_items": -1}, {"max_depth": True}, {"cache_size": -1}],
+)
+def test_invalid_limits(kwargs):
+    """Limits must be positive integers."""
+    with pytest.raises(ValueError, match="must be a"):
+        ValueRenderer(**kwargs)
+
+
+def test_config_renderer_validation():
+    """SpewConfig accepts any callable as renderer."""
+    assert SpewConfig(renderer=repr).renderer is repr
+    with pytest.raises(TypeError, match="renderer must be callable"):
+        SpewConfig(renderer="repr")
+
+
+def test_trace_output_uses_renderer():
+    """Traced values are rendered by the configured renderer."""
+    sink = MemorySink()
+    with SpewContext(
+        trace_names=[__name__],
+        show_values=True,
+        sink=sink,
+        renderer=ValueRenderer(max_items=2),
+    ):
+        build(list(range(50)))
+    assert "data=[0, 1, ...] (50 items)" in sink.getvalue()
+    assert "data=[0, 1, 2," not in sink.getvalue()
+
+
+def test_plain_repr_renderer():
+    """renderer=repr restores unbounded output."""
+    sink = MemorySink()
+    with SpewContext(
+        trace_names=[__name__], show_values=True, sink=sink, renderer=repr
+    ):
+        build(list(range(50)))
+    assert repr(list(range(50))) in sink.getvalue()
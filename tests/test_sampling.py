@@ -0,0 +1,186 @@
+"""Tests for call sampling."""
+
+import itertools
+import sys
+
+import pytest  # type: ignore[import-untyped]
+
+from spewer import MemorySink, SpewConfig, SpewContext
+from spewer import spewer as spewer_module
+from spewer.sampling import Sampler
+
+
+def helper(value):
+    doubled = value * 2
+    return doubled + 0
+
+
+def entry(value):
+    result = helper(value)
+    return result + 1
+
+
+def failing_entry():
+    msg = "boom"
+    raise ValueError(msg)
+
+
+def traced_values(sink):
+    """Return the entry arguments seen in the trace output, in order."""
+    return [
+        line.split("result=")[1]
+        for line in sink.getvalue().splitlines()
+        if "\tresult=" in line
+    ]
+
+
+def test_sample_every(backend):
+    """One in every N top-level calls is traced, with its children."""
+    sink = MemorySink()
+    with SpewContext(
+        trace_names=[__name__],
+        show_values=True,
+        backend=backend,
+        sink=sink,
+        sample_every=3,
+    ):
+        for i in range(7):
+            entry(i)
+
+    output = sink.getvalue()
+    assert traced_values(sink) == ["0", "6", "12"]
+    assert output.count("doubled = value * 2") == 3
+
+
+def test_sample_rate(backend):
+    """Each top-level call is traced with the given probability."""
+    sink = MemorySink()
+    context = SpewContext(
+        trace_names=[__name__],
+        show_values=True,
+        backend=backend,
+        sink=sink,
+        sample_rate=0.5,
+    )
+    with context:
+        rolls = itertools.cycle([0.1, 0.9, 0.9])
+        context.hook._sampler._random = lambda: next(rolls)
+        for i in range(6):
+            entry(i)
+
+    assert traced_values(sink) == ["0", "6"]
+
+
+def test_zero_rate_traces_nothing(backend):
+    """A sample rate of 0 disables output entirely."""
+    sink = MemorySink()
+    with SpewContext(
+        trace_names=[__name__], backend=backend, sink=sink, sample_rate=0.0
+    ):
+        entry(1)
+    assert sink.getvalue() == ""
+
+
+def test_functions_only_sampling(backend):
+    """Function call tracing is sampled the same way."""
+    sink = MemorySink()
+    with SpewContext(
+        trace_names=[__name__],
+        functions_only=True,
+        trace_returns=True,
+        backend=backend,
+        sink=sink,
+        sample_every=2,
+    ):
+        for i in range(4):
+            entry(i)
+
+    output = sink.getvalue()
+    assert output.count("entry()\n") == 2
+    assert output.count("helper()\n") == 2
+    assert output.count("return doubled + 0 -> <return>") == 2
+
+
+def test_exception_ends_sample(backend):
+    """A top-level call that raises still ends its sample."""
+    sink = MemorySink()
+    with SpewContext(
+        trace_names=[__name__], backend=backend, sink=sink, sample_every=2
+    ):
+        with pytest.raises(ValueError):
+            failing_entry()
+        entry(0)
+        entry(1)
+    output = sink.getvalue()
+    assert "raise ValueError(msg)" in output
+    assert output.count("doubled = value * 2") == 1
+
+
+def test_unsampled_frames_have_no_local_tracer():
+    """Only the unsampled top-level frame keeps a tracer, without line events."""
+    seen = []
+
+    def inner():
+        seen.append(sys._getframe().f_trace)
+
+    def outer():
+        frame = sys._getframe()
+        seen.append((frame.f_trace is not None, frame.f_trace_lines))
+        inner()
+
+    with SpewContext(
+        trace_names=[__name__],
+        backend="settrace",
+        sink=MemorySink(),
+        sample_rate=0.0,
+    ):
+        outer()
+
+    assert seen == [(True, False), None]
+
+
+def test_auto_backend_samples_with_settrace():
+    """Sampling makes backend="auto" pick settrace, even for all threads."""
+    with SpewContext(
+        trace_names=[__name__], all_threads=True, sink=MemorySink(), sample_rate=0.5
+    ) as context:
+        assert sys.gettrace() is context.hook
+        assert spewer_module._monitoring_backend is None
+
+
+def test_sampler_carries_decision_to_children():
+    """Calls made while a sampled call runs share its decision."""
+    sampler = Sampler(every=2)
+    root, child, other = object(), object(), object()
+    assert sampler.enter(root)
+    assert sampler.enter(child)
+    sampler.leave(child)
+    assert sampler.active
+    sampler.leave(root)
+    assert not sampler.active
+    assert not sampler.enter(other)
+    assert not sampler.enter(child)
+    assert sampler.is_root(other)
+
+
+def test_no_sampler_by_default():
+    """Without sampling options every call is traced."""
+    with SpewContext(sink=MemorySink()) as context:
+        assert context.hook._sampler is None
+
+
+@pytest.mark.parametrize(
+    ("options", "error"),
+    [
+        ({"sample_every": 0}, ValueError),
+        ({"sample_every": 1.5}, TypeError),
+        ({"sample_every": True}, TypeError),
+        ({"sample_rate": 1.5}, ValueError),
+        ({"sample_rate": -0.1}, ValueError),
+        ({"sample_rate": "0.5"}, TypeError),
+    ],
+)
+def test_invalid_sampling_options(options, error):
+    """Sampling options are validated."""
+    with pytest.raises(error):
+        SpewConfig(**options)
@@ -0,0 +1,146 @@
+"""Tests for the diff values mode."""
+
+import pytest  # type: ignore[import-untyped]
+
+from spewer import MemorySink, SpewConfig, SpewContext
+from spewer.shadow import ValueShadow
+
+
+class Frame:
+    """Stand-in for a frame object."""
+
+
+def accumulate(items):
+    total = 0
+    for item in items:
+        total = total + item
+    return total
+
+
+def running_totals(items):
+    total = 0
+    for item in items:
+        total = total + item
+        yield total
+
+
+def value_lines(sink, marker):
+    """Return the values shown after each traced line containing ``marker``."""
+    lines = sink.getvalue().splitlines()
+    return [
+        lines[i + 1].strip() if lines[i + 1].startswith("\t") else ""
+        for i in range(len(lines) - 1)
+        if marker in lines[i] and not lines[i].startswith("\t")
+    ]
+
+
+def test_only_changed_values_are_kept():
+    """A name is reported again only when it refers to another object."""
+    shadow = ValueShadow()
+    frame = Frame()
+    items = [1]
+    assert shadow.changed(frame, (("a", 1), ("items", items))) == (
+        ("a", 1),
+        ("items", items),
+    )
+    assert shadow.changed(frame, (("a", 1), ("items", items))) == ()
+    assert shadow.changed(frame, (("a", 2), ("items", [1]))) == (
+        ("a", 2),
+        ("items", [1]),
+    )
+
+
+def test_equal_scalars_are_unchanged():
+    """A new but equal number or string is not a change; 1 and True differ."""
+    shadow = ValueShadow()
+    frame = Frame()
+    shadow.changed(frame, (("n", 10**20), ("s", "ab")))
+    assert shadow.changed(frame, (("n", 10**20 + 0), ("s", "".join("ab")))) == ()
+    shadow.changed(frame, (("flag", 1),))
+    assert shadow.changed(frame, (("flag", True),)) == (("flag", True),)
+
+
+def test_frames_are_separate_and_forgotten():
+    """Each frame has its own shadow, dropped when the frame exits."""
+    shadow = ValueShadow(max_frames=2)
+    first, second = Frame(), Frame()
+    shadow.changed(first, (("a", 1),))
+    assert shadow.changed(second, (("a", 1),)) == (("a", 1),)
+    shadow.forget(first)
+    assert shadow.changed(first, (("a", 1),)) == (("a", 1),)
+    # Evicting the oldest frame keeps the number of shadows bounded
+    shadow.changed(Frame(), (("a", 1),))
+    assert shadow.changed(second, (("a", 1),)) == (("a", 1),)
+
+
+def test_diff_mode_shows_changes_only(backend):
+    """In a loop, only the loop variable and the running total are shown."""
+    sink = MemorySink()
+    with SpewContext(
+        trace_names=[__name__],
+        show_values=True,
+        values_mode="diff",
+        backend=backend,
+        sink=sink,
+    ):
+        accumulate([5, 5, 7])
+
+    assert value_lines(sink, "total = total + item") == [
+        "total=0 item=5",
+        "total=5",
+        "total=10 item=7",
+    ]
+
+
+def test_each_call_starts_afresh(backend):
+    """Values seen by an earlier call are shown again in the next one."""
+    sink = MemorySink()
+    with SpewContext(
+        trace_names=[__name__],
+        show_values=True,
+        values_mode="diff",
+        backend=backend,
+        sink=sink,
+    ):
+        accumulate([1])
+        accumulate([1])
+
+    assert value_lines(sink, "total = total + item") == ["total=0 item=1"] * 2
+
+
+def test_generators_keep_shadow_while_suspended(backend):
+    """A yield does not forget the values a generator has already shown."""
+    sink = MemorySink()
+    with SpewContext(
+        trace_names=[__name__],
+        show_values=True,
+        values_mode="diff",
+        backend=backend,
+        sink=sink,
+    ):
+        assert list(running_totals([5, 5, 7])) == [5, 10, 17]
+
+    # The yield already showed each new total
+    assert value_lines(sink, "total = total + item") == [
+        "total=0 item=5",
+        "",
+        "item=7",
+    ]
+
+
+def test_all_values_by_default():
+    """Without diff mode, every line shows all of its values."""
+    sink = MemorySink()
+    with SpewContext(trace_names=[__name__], show_values=True, sink=sink):
+        accumulate([5, 5])
+
+    assert value_lines(sink, "total = total + item") == [
+        "total=0 item=5",
+        "total=5 item=5",
+    ]
+
+
+def test_invalid_values_mode():
+    """Unknown values modes are rejected."""
+    with pytest.raises(ValueError, match="values_mode must be one of all, diff"):
+        SpewConfig(values_mode="changed")
@@ -0,0 +1,205 @@
+"""Tests for output sinks."""
+
+import io
+import threading
+
+import pytest  # type: ignore[import-untyped]
+
+from spewer import (
+    AsyncSink,
+    FileSink,
+    MemorySink,
+    NullSink,
+    SpewConfig,
+    SpewContext,
+    StreamSink,
+    spew,
+    unspew,
+)
+from spewer.sinks import _flush_live_sinks
+
+
+def traced_function():
+    value = 41
+    return value + 1
+
+
+def test_memory_sink_collects_output():
+    """Trace output can be captured in memory."""
+    sink = MemorySink()
+    with SpewContext(trace_names=[__name__], show_values=True, sink=sink):
+        traced_function()
+
+    output = sink.getvalue()
+    assert f"{__name__}:" in output
+    assert "return value + 1\n\tvalue=41\n" in output
+    sink.clear()
+    assert sink.getvalue() == ""
+
+
+def test_null_sink_discards_output(capsys):
+    """Nothing reaches stdout with a null sink."""
+    with SpewContext(trace_names=[__name__], sink=NullSink()):
+        traced_function()
+    assert capsys.readouterr().out == ""
+
+
+def test_default_sink_writes_to_stdout(capsys):
+    """Without a sink, output goes to sys.stdout as before."""
+    with SpewContext(trace_names=[__name__]):
+        traced_function()
+    assert "value = 41" in capsys.readouterr().out
+
+
+def test_buffered_stream_sink_batches_writes():
+    """Buffered output is written in one chunk once the buffer fills."""
+    stream = io.StringIO()
+    sink = StreamSink(stream, buffer_size=10)
+    sink.write("abc\n")
+    assert stream.getvalue() == ""
+    sink.write("defghij\n")
+    assert stream.getvalue() == "abc\ndefghij\n"
+
+
+def test_unspew_flushes_sink():
+    """unspew() writes out whatever the sink has buffered."""
+    stream = io.StringIO()
+    spew(trace_names=[__name__], sink=StreamSink(stream, buffer_size=1 << 20))
+    traced_function()
+    assert stream.getvalue() == ""
+    unspew()
+    assert "value = 41" in stream.getvalue()
+
+
+def test_file_sink(tmp_path):
+    """File sinks buffer output and flush it when tracing stops."""
+    path = tmp_path / "trace.log"
+    sink = FileSink(path)
+    with SpewContext(trace_names=[__name__], sink=sink):
+        traced_function()
+    assert "value = 41" in path.read_text()
+    sink.close()
+    sink.close()
+
+
+def test_buffered_sinks_flushed_at_exit(tmp_path):
+    """The atexit handler flushes live buffered sinks."""
+    path = tmp_path / "trace.log"
+    sink = FileSink(path)
+    sink.write("pending\n")
+    assert path.read_text() == ""
+    _flush_live_sinks()
+    assert path.read_text() == "pending\n"
+    sink.close()
+
+
+def test_invalid_sink():
+    """Sinks must be Sink instances."""
+    with pytest.raises(TypeError):
+        SpewConfig(sink=io.StringIO())
+
+
+def test_invalid_buffer_size():
+    """Negative buffer sizes are rejected."""
+    with pytest.raises(ValueError):
+        StreamSink(buffer_size=-1)
+
+
+class BlockingSink(MemorySink):
+    """Memory sink whose first write blocks until released."""
+
+    def __init__(self):
+        super().__init__()
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def write(self, text):
+        self.entered.set()
+        self.release.wait(5)
+        super().write(text)
+
+
+def fill_blocked_queue(policy):
+    """Block the writer thread, then submit more events than fit."""
+    target = BlockingSink()
+    sink = AsyncSink(target, maxsize=2, policy=policy)
+    sink.write("first\n")
+    assert target.entered.wait(5)
+    for i in range(5):
+        sink.write(f"line {i}\n")
+    target.release.set()
+    sink.flush()
+    return sink, target.getvalue()
+
+
+def test_async_sink_formats_events():
+    """Raw events are formatted on the writer thread."""
+    target = MemorySink()
+    sink = AsyncSink(target)
+    with SpewContext(trace_names=[__name__], show_values=True, sink=sink):
+        traced_function()
+    assert "return value + 1\n\tvalue=41\n" in target.getvalue()
+    assert sink.dropped == 0
+    sink.close()
+    assert not sink._thread.is_alive()
+
+
+def test_async_sink_drop_newest():
+    """New events are discarded and counted when the queue is full."""
+    sink, output = fill_blocked_queue("drop_newest")
+    assert output == "first\nline 0\nline 1\n"
+    assert sink.dropped == 3
+    sink.close()
+
+
+def test_async_sink_drop_oldest():
+    """The oldest queued events are discarded to make room."""
+    sink, output = fill_blocked_queue("drop_oldest")
+    assert output == "first\nline 3\nline 4\n"
+    assert sink.dropped == 3
+    sink.close()
+
+
+def test_async_sink_block():
+    """The blocking policy never drops events."""
+    target = MemorySink()
+    sink = AsyncSink(target, maxsize=1)
+    for i in range(100):
+        sink.write(f"{i}\n")
+    sink.flush()
+    assert target.getvalue().count("\n") == 100
+    assert sink.dropped == 0
+    sink.close()
+
+
+def test_async_sink_survives_failing_repr():
+    """An exception while formatting is reported instead of killing the writer."""
+
+    class Broken:
+        def __repr__(self):
+            raise ValueError
+
+    class Info:
+        name = "mod"
+        func_name = "f"
+
+    target = MemorySink()
+    sink = AsyncSink(target)
+    # ValueRenderer replaces failing reprs, so use plain repr() here
+    sink.renderer = repr
+    sink.submit(("return", Info(), 1, None, (Broken(),)))
+    sink.write("after\n")
+    sink.flush()
+    assert "unformattable return event" in target.getvalue()
+    assert target.getvalue().endswith("after\n")
+    sink.close()
+
+
+def test_async_sink_invalid_arguments():
+    """Bad policies, sizes and targets are rejected."""
+    with pytest.raises(ValueError):
+        AsyncSink(MemorySink(), policy="drop_all")
+    with pytest.raises(ValueError):
+        AsyncSink(MemorySink(), maxsize=0)
+    with pytest.raises(TypeError):
+        AsyncSink(io.StringIO())
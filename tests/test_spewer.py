@@ -1,10 +1,12 @@
 """Tests for the spewer library."""
 
 import inspect
+import sys
 
 import pytest  # type: ignore[import-untyped]
 
 from spewer import SpewConfig, SpewContext, TraceHook, spew, unspew
+from spewer.trace import _line_identifiers
 
 
 class TestSpewConfig:
@@ -129,6 +131,20 @@ class TestTraceHook:
         result = hook(frame, "call", None)
         assert result is hook
 
+    def test_trace_hook_call_event_outside_trace_names(self):
+        """Frames from untraced modules get no local trace function."""
+        hook = TraceHook(SpewConfig(trace_names=["myapp"]))
+
+        class MockFrame:
+            def __init__(self, name):
+                self.f_lineno = 1
+                self.f_globals = {"__file__": f"{name}.py", "__name__": name}
+                self.f_locals = {}
+                self.f_code = type("MockCode", (), {"co_name": "handler"})()
+
+        assert hook(MockFrame("werkzeug"), "call", None) is None
+        assert hook(MockFrame("myapp"), "call", None) is hook
+
     def test_show_variable_values(self):
         """Test _show_variable_values method."""
         hook = TraceHook(SpewConfig(show_values=True))
@@ -146,6 +162,44 @@ class TestTraceHook:
         hook._show_variable_values(frame, line)
         # This should print: x=10 y=20
 
+    def test_show_variable_values_skips_non_identifiers(self, capsys):
+        """Keywords, attributes and string contents are not looked up."""
+        hook = TraceHook(SpewConfig(show_values=True))
+
+        class MockFrame:
+            def __init__(self):
+                self.f_globals = {"total": "global_total", "attr": "global_attr"}
+                self.f_locals = {"total": 3, "obj": 1, "hello": "local_hello"}
+
+        hook._show_variable_values(
+            MockFrame(), 'if total and "hello": obj.attr  # total\n'
+        )
+        assert capsys.readouterr().out == "\ttotal=3 obj=1\n"
+
+    def test_line_identifiers_cached(self):
+        """Each source line is tokenized once."""
+        _line_identifiers.cache_clear()
+        assert _line_identifiers("result = x + y\n") == ("result", "x", "y")
+        assert _line_identifiers('print(f"{result}")\n') == ("print", "result")
+        _line_identifiers("result = x + y\n")
+        assert _line_identifiers.cache_info().hits == 1
+
+    @pytest.mark.parametrize(
+        ("line", "names"),
+        [
+            ('s = f"{c!r:>{width}}"\n', ("s", "c", "width")),
+            ('s = f"{n:.2f} {m!s}"\n', ("s", "n", "m")),
+            (
+                's = f"{obj.attr} {d[k]:{fmt}} {e=}"\n',
+                ("s", "obj", "d", "k", "fmt", "e"),
+            ),
+            ("s = f'{a != b}'\n", ("s", "a", "b")),
+        ],
+    )
+    def test_line_identifiers_in_fstrings(self, line, names):
+        """Conversions and format specs are not taken for names."""
+        assert _line_identifiers(line) == names
+
     def test_show_variable_values_with_problematic_objects(self):
         """Test _show_variable_values with problematic objects."""
         hook = TraceHook(SpewConfig(show_values=True))
@@ -730,6 +784,20 @@ class TestIntegration:
             result = test_function()
             assert result == "test"
 
+    def test_untraced_frames_have_no_local_tracer(self):
+        """Only frames of traced modules receive a local trace function."""
+
+        def current_tracer():
+            return sys._getframe().f_trace
+
+        with SpewContext(trace_names=["other_module"], backend="settrace"):
+            untraced = current_tracer()
+        with SpewContext(trace_names=[__name__], backend="settrace"):
+            traced = current_tracer()
+
+        assert untraced is None
+        assert isinstance(traced, TraceHook)
+
     def test_function_with_return_tracing(self):
         """Test return event tracing with real function."""
 
@@ -0,0 +1,167 @@
+"""Tests for the call statistics mode."""
+
+import sys
+import threading
+
+import pytest  # type: ignore[import-untyped]
+
+from spewer import MemorySink, SpewConfig, SpewContext
+from spewer.cache import CodeInfo
+from spewer.stats import CallStats
+
+
+class Clock:
+    """Manually advanced nanosecond clock."""
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class Code:
+    """Stand-in for a code object."""
+
+    def __init__(self, name, lineno):
+        self.co_name = name
+        self.co_firstlineno = lineno
+
+
+class Frame:
+    """Stand-in for a frame object."""
+
+    def __init__(self, code):
+        self.f_code = code
+
+
+def describe(frame):
+    return CodeInfo("app", "app.py", True, None, func_name=frame.f_code.co_name)
+
+
+def leaf(value):
+    return value + 1
+
+
+def branch(value):
+    return leaf(value) + leaf(value)
+
+
+def root(count):
+    return [branch(i) for i in range(count)]
+
+
+def lines_traced():
+    return sys._getframe().f_trace_lines
+
+
+def by_name(stats):
+    return {row.func_name: row for row in stats.rows()}
+
+
+def test_total_and_self_time():
+    """Self time excludes the time spent in traced callees."""
+    clock = Clock()
+    stats = CallStats(describe, clock)
+    outer, inner = Frame(Code("outer", 1)), Frame(Code("inner", 5))
+    stats.enter(outer)
+    clock.now = 2
+    stats.enter(inner)
+    clock.now = 6
+    stats.leave(inner)
+    clock.now = 10
+    stats.leave(outer)
+
+    rows = by_name(stats)
+    assert rows["outer"][3:] == (1, 10, 6)
+    assert rows["inner"][3:] == (1, 4, 4)
+    assert [row.func_name for row in stats.rows("self")] == ["outer", "inner"]
+    assert rows["inner"].lineno == 5
+
+
+def test_recursion_is_timed_once():
+    """A recursive function's total time is not counted once per level."""
+    clock = Clock()
+    stats = CallStats(describe, clock)
+    code = Code("recurse", 1)
+    first, second = Frame(code), Frame(code)
+    stats.enter(first)
+    clock.now = 3
+    stats.enter(second)
+    clock.now = 5
+    stats.leave(second)
+    clock.now = 9
+    stats.leave(first)
+    assert by_name(stats)["recurse"][3:] == (2, 9, 9)
+
+
+def test_unknown_returns_are_ignored():
+    """Returns of frames that were never entered leave the counters alone."""
+    stats = CallStats(describe, Clock())
+    stats.leave(Frame(Code("early", 1)))
+    frame = Frame(Code("f", 1))
+    stats.enter(frame)
+    stats.leave(Frame(Code("other", 1)))
+    stats.leave(frame)
+    assert [row.func_name for row in stats.rows()] == ["f"]
+
+
+def test_invalid_sort_key():
+    """Only known columns can be sorted on."""
+    with pytest.raises(ValueError, match="sort must be one of total, self, calls"):
+        CallStats(describe).rows("name")
+
+
+def test_stats_mode_counts_calls(backend):
+    """Stats mode counts traced calls and writes only a table."""
+    sink = MemorySink()
+    with SpewContext(
+        trace_names=[__name__], stats=True, backend=backend, sink=sink
+    ) as context:
+        root(5)
+
+    rows = by_name(context.hook.stats)
+    assert (rows["root"].calls, rows["branch"].calls, rows["leaf"].calls) == (1, 5, 10)
+    assert rows["root"].total_ns >= rows["branch"].total_ns >= rows["leaf"].total_ns
+    assert rows["branch"].self_ns <= rows["branch"].total_ns
+
+    output = sink.getvalue()
+    assert output.startswith("[spewer] call statistics, sorted by total:\n")
+    assert f"{__name__}:" in output
+    assert "return value + 1" not in output
+    assert output.splitlines()[2].endswith("root()")
+
+
+def test_stats_mode_skips_line_events():
+    """Stats mode is a trace function that switches off line events."""
+    previous_profile = sys.getprofile()
+    with SpewContext(
+        trace_names=[__name__], stats=True, backend="settrace", sink=MemorySink()
+    ) as context:
+        assert sys.getprofile() is previous_profile
+        assert lines_traced() is False
+    assert by_name(context.hook.stats)["lines_traced"].calls == 1
+
+
+def test_stats_across_threads():
+    """Calls from every thread are added up."""
+    sink = MemorySink()
+    with SpewContext(
+        trace_names=[__name__], stats=True, all_threads=True, sink=sink
+    ) as context:
+        threads = [threading.Thread(target=root, args=(3,)) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert by_name(context.hook.stats)["leaf"].calls == 18
+
+
+def test_no_stats_by_default():
+    """Hooks only count calls in stats mode."""
+    with SpewContext(trace_names=[__name__], sink=MemorySink()) as context:
+        root(1)
+    assert context.hook.stats is None
+    with pytest.raises(TypeError, match="stats must be a boolean"):
+        SpewConfig(stats="yes")
@@ -0,0 +1,120 @@
+"""Tests for task-scoped tracing."""
+
+import asyncio
+import sys
+
+import pytest  # type: ignore[import-untyped]
+
+from spewer import BinarySink, MemorySink, SpewConfig, SpewContext, spew, trace_task
+from spewer import spewer as spewer_module
+from spewer import unspew as stop_tracing
+from spewer.binary import decode
+from spewer.events import format_event
+
+
+async def step(value):
+    await asyncio.sleep(0)
+    doubled = value * 2
+    await asyncio.sleep(0)
+    return doubled + 1
+
+
+async def traced_request(value):
+    with trace_task():
+        return await asyncio.create_task(step(value), name="child")
+
+
+def test_only_scoped_tasks_are_traced(backend):
+    """Events from tasks outside trace_task() are dropped."""
+    sink = MemorySink()
+
+    async def main():
+        return await asyncio.gather(
+            asyncio.create_task(traced_request(1), name="traced"),
+            asyncio.create_task(step(100), name="other"),
+        )
+
+    spew(trace_names=[__name__], backend=backend, sink=sink, task_scoped=True)
+    try:
+        assert asyncio.run(main()) == [3, 201]
+    finally:
+        stop_tracing()
+
+    lines = [line for line in sink.getvalue().splitlines() if "doubled" in line]
+    assert lines
+    assert all(line.startswith("[child] ") for line in lines)
+    assert "[other]" not in sink.getvalue()
+
+
+def test_task_scoped_context(backend):
+    """A task-scoped SpewContext traces the coroutine it wraps."""
+    sink = MemorySink()
+
+    async def request():
+        with SpewContext(
+            trace_names=[__name__], backend=backend, sink=sink, task_scoped=True
+        ):
+            return await step(5)
+
+    async def main():
+        return await asyncio.gather(
+            asyncio.create_task(request(), name="request"),
+            asyncio.create_task(step(7), name="other"),
+        )
+
+    assert asyncio.run(main()) == [11, 15]
+    output = sink.getvalue()
+    assert "[request] " in output
+    assert "[other]" not in output
+
+
+def test_nothing_traced_outside_scope():
+    """Synchronous code is only traced inside trace_task()."""
+
+    def work():
+        return 1 + 1
+
+    sink = MemorySink()
+    spew(trace_names=[__name__], sink=sink, task_scoped=True)
+    try:
+        work()
+        with trace_task():
+            work()
+    finally:
+        stop_tracing()
+    assert sink.getvalue().count("return 1 + 1") == 1
+    # Outside a task there is no label
+    assert "[" not in sink.getvalue()
+
+
+def test_auto_backend_scopes_tasks_with_settrace():
+    """task_scoped makes backend="auto" pick settrace, even for all threads."""
+    with SpewContext(all_threads=True, task_scoped=True, sink=MemorySink()) as context:
+        assert sys.gettrace() is context.hook
+        assert spewer_module._monitoring_backend is None
+
+
+def test_labels_in_formats(tmp_path):
+    """Labelled events keep their label in text and binary output."""
+
+    class Info:
+        name = "mod"
+        filename = "mod.py"
+        func_name = "f"
+
+    event = ("line", Info(), 3, "x = 1\n", None, "Task-7")
+    assert format_event(event) == "[Task-7] mod:3: x = 1\n"
+
+    path = tmp_path / "trace.bin"
+    sink = BinarySink(path)
+    sink.submit(event)
+    sink.submit(event[:5])
+    sink.close()
+    with path.open("rb") as stream:
+        assert "".join(decode(stream)) == "[Task-7] mod:3: x = 1\nmod:3: x = 1\n"
+
+
+def test_invalid_task_scoped():
+    """task_scoped must be a boolean."""
+    with pytest.raises(TypeError):
+        SpewConfig(task_scoped=1)
@@ -0,0 +1,179 @@
+"""Tests for tracing all threads."""
+
+import sys
+import threading
+
+import pytest  # type: ignore[import-untyped]
+
+from spewer import AsyncSink, MemorySink, SpewConfig, SpewContext
+from spewer.threads import ThreadBufferSink
+
+
+def work(value):
+    doubled = value * 2
+    return doubled + 1
+
+
+def run_in_threads(count):
+    threads = [
+        threading.Thread(target=work, args=(i,), name=f"worker-{i}")
+        for i in range(count)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_new_threads_are_traced_and_tagged(backend):
+    """Threads started while tracing are traced, tagged with their name."""
+    sink = MemorySink()
+    with SpewContext(
+        trace_names=[__name__], backend=backend, sink=sink, all_threads=True
+    ):
+        run_in_threads(3)
+
+    output = sink.getvalue()
+    for i in range(3):
+        assert f"[worker-{i} " in output
+    assert output.count("doubled = value * 2") == 3
+    tagged = [line for line in output.splitlines() if "doubled = value" in line]
+    assert all(line.startswith("[worker-") for line in tagged)
+
+
+@pytest.mark.skipif(
+    sys.version_info < (3, 12), reason="settrace_all_threads requires Python 3.12+"
+)
+def test_running_threads_are_traced(backend):
+    """Threads that were already running are traced on Python 3.12+."""
+    start = threading.Event()
+
+    def waiter():
+        start.wait(5)
+        work(7)
+
+    thread = threading.Thread(target=waiter, name="early")
+    thread.start()
+    sink = MemorySink()
+    with SpewContext(
+        trace_names=[__name__], backend=backend, sink=sink, all_threads=True
+    ):
+        start.set()
+        thread.join()
+    assert "[early " in sink.getvalue()
+    assert "doubled = value * 2" in sink.getvalue()
+
+
+def test_owner_thread_only_by_default(backend):
+    """Without all_threads, other threads are not traced."""
+    sink = MemorySink()
+    with SpewContext(trace_names=[__name__], backend=backend, sink=sink):
+        run_in_threads(2)
+    assert "doubled = value * 2" not in sink.getvalue()
+
+
+def test_tracing_removed_from_threads():
+    """unspew() removes the hook for new threads too."""
+    previous = (sys.gettrace(), threading._trace_hook, threading._profile_hook)
+    with SpewContext(backend="settrace", sink=MemorySink(), all_threads=True):
+        pass
+    assert (sys.gettrace(), threading._trace_hook, threading._profile_hook) == previous
+
+
+def test_other_threads_not_given_installers_tracer():
+    """unspew() does not hand the installing thread's trace function to others."""
+
+    def other(_frame, _event, _arg):
+        return None
+
+    started, removed = threading.Event(), threading.Event()
+    seen = []
+
+    def idle():
+        started.set()
+        removed.wait(5)
+        seen.append(sys.gettrace())
+
+    thread = threading.Thread(target=idle)
+    thread.start()
+    started.wait(5)
+    previous = sys.gettrace()
+    sys.settrace(other)
+    try:
+        with SpewContext(backend="settrace", sink=MemorySink(), all_threads=True):
+            pass
+        assert sys.gettrace() is other
+    finally:
+        sys.settrace(previous)
+        removed.set()
+        thread.join()
+    assert seen == [None]
+
+
+def test_writer_thread_not_traced(backend):
+    """AsyncSink's writer thread never traces itself."""
+    target = MemorySink()
+    sink = AsyncSink(target)
+    with SpewContext(
+        trace_names=[__name__, "spewer.sinks"],
+        backend=backend,
+        sink=sink,
+        all_threads=True,
+    ):
+        run_in_threads(2)
+    sink.close()
+    output = target.getvalue()
+    assert "[worker-0 " in output
+    assert "spewer-writer" not in output
+
+
+def test_thread_buffers_merge_in_time_order():
+    """Buffered events from several threads are merged by timestamp."""
+
+    class Info:
+        name = "mod"
+        func_name = "f"
+
+    target = MemorySink()
+    sink = ThreadBufferSink(target)
+    barrier = threading.Barrier(2)
+
+    def emit(lineno):
+        barrier.wait()
+        sink.submit(("line", Info(), lineno, f"line {lineno}", None))
+
+    sink.submit(("line", Info(), 1, "line 1", None))
+    thread = threading.Thread(target=emit, args=(2,), name="other")
+    thread.start()
+    barrier.wait()
+    thread.join()
+    sink.submit(("line", Info(), 3, "line 3", None))
+    assert target.getvalue() == ""
+
+    sink.flush()
+    lines = target.getvalue().splitlines()
+    assert [line.split(": ")[-1] for line in lines] == ["line 1", "line 2", "line 3"]
+    assert lines[1].startswith(f"[other {thread.ident}] mod:2: ")
+    assert lines[0].startswith("[MainThread ")
+    # Finished threads are forgotten once their events are written
+    assert len(sink._buffers) == 1
+
+
+def test_thread_buffer_flushes_when_full():
+    """A thread's buffer is written out once it holds buffer_size events."""
+    target = MemorySink()
+    sink = ThreadBufferSink(target, buffer_size=2)
+    sink.write("one\n")
+    assert target.getvalue() == ""
+    sink.write("two\n")
+    assert target.getvalue() == "one\ntwo\n"
+
+
+def test_invalid_all_threads():
+    """all_threads must be a boolean and buffers need a real sink."""
+    with pytest.raises(TypeError):
+        SpewConfig(all_threads="yes")
+    with pytest.raises(TypeError):
+        ThreadBufferSink(sys.stdout)
+    with pytest.raises(ValueError):
+        ThreadBufferSink(MemorySink(), buffer_size=0)
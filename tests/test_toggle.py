@@ -0,0 +1,169 @@
+"""Tests for the signal toggle and its environment configuration."""
+
+import dataclasses
+import json
+import os
+import signal
+import sys
+import threading
+
+import pytest  # type: ignore[import-untyped]
+
+from spewer import MemorySink, SpewConfig, install_signal_toggle, load_config
+from spewer import spewer as spewer_module
+from spewer import toggle as toggle_module
+from spewer.sinks import FileSink
+
+requires_signals = pytest.mark.skipif(
+    not hasattr(signal, "SIGUSR1"), reason="requires SIGUSR1 and SIGUSR2"
+)
+
+
+def work(value):
+    doubled = value * 2
+    return doubled + 1
+
+
+def wait_for_threads(*names):
+    for name in names:
+        for thread in threading.enumerate():
+            if thread.name == name:
+                thread.join()
+
+
+def wait_for_flush():
+    wait_for_threads("spewer-flush")
+
+
+def test_config_from_environment():
+    """SPEWER_* variables are converted to the option types."""
+    config = load_config(
+        environ={
+            "SPEWER_TRACE_NAMES": "myapp, otherapp",
+            "SPEWER_SHOW_VALUES": "off",
+            "SPEWER_MAX_DEPTH": "3",
+            "SPEWER_SAMPLE_RATE": "0.5",
+            "SPEWER_RATE_LIMIT": "",
+            "SPEWER_INDENT": "  ",
+            "SPEWER_BACKEND": "settrace ",
+            "SPEWER_VALUES_MODE": " diff\n",
+            "UNRELATED": "1",
+        }
+    )
+    assert config.trace_names == ["myapp", "otherapp"]
+    assert config.show_values is False
+    assert config.max_depth == 3
+    assert config.sample_rate == 0.5
+    assert config.rate_limit is None
+    assert config.indent == "  "
+    assert config.backend == "settrace"
+    assert config.values_mode == "diff"
+
+
+def test_every_option_has_a_type():
+    """Every option but the sink and renderer can be set from text."""
+    names = {field.name for field in dataclasses.fields(SpewConfig)}
+    assert set(toggle_module._OPTION_TYPES) == names - {"sink", "renderer"}
+    assert set(toggle_module._OPTIONAL_OPTIONS) <= set(toggle_module._OPTION_TYPES)
+
+
+def test_config_file_with_overrides(tmp_path):
+    """The SPEWER_CONFIG file is read first and variables override it."""
+    path = tmp_path / "spewer.json"
+    output = tmp_path / "trace.{pid}.log"
+    path.write_text(
+        json.dumps({"trace_names": ["myapp"], "functions_only": True}),
+        encoding="utf-8",
+    )
+    config = load_config(
+        environ={
+            "SPEWER_CONFIG": str(path),
+            "SPEWER_FUNCTIONS_ONLY": "0",
+            "SPEWER_OUTPUT": str(output),
+        }
+    )
+    assert config.trace_names == ["myapp"]
+    assert config.functions_only is False
+    assert isinstance(config.sink, FileSink)
+    assert config.sink.path == tmp_path / f"trace.{os.getpid()}.log"
+    config.sink.close()
+
+
+def test_invalid_environment(tmp_path):
+    """Bad values name the variable or option they came from."""
+    with pytest.raises(ValueError, match="SPEWER_STATS must be one of"):
+        load_config(environ={"SPEWER_STATS": "maybe"})
+    with pytest.raises(ValueError, match="SPEWER_SAMPLE_EVERY must be a number"):
+        load_config(environ={"SPEWER_SAMPLE_EVERY": "often"})
+    path = tmp_path / "spewer.json"
+    path.write_text('{"colour": true}', encoding="utf-8")
+    with pytest.raises(ValueError, match="unknown spewer options: colour"):
+        load_config(path, environ={})
+
+
+@requires_signals
+def test_signals_toggle_tracing():
+    """SIGUSR1 installs the hook in all threads and SIGUSR2 removes it."""
+    sink = MemorySink()
+    previous_trace = sys.gettrace()
+    toggle = install_signal_toggle(SpewConfig(trace_names=[__name__], sink=sink))
+    try:
+        work(1)
+        assert not toggle.active
+        assert spewer_module._active_hook is None
+
+        os.kill(os.getpid(), signal.SIGUSR1)
+        assert toggle.active
+        assert toggle.hook.config.all_threads
+        work(2)
+
+        os.kill(os.getpid(), signal.SIGUSR2)
+        assert not toggle.active
+        wait_for_flush()
+        work(3)
+    finally:
+        toggle.uninstall()
+
+    output = sink.getvalue()
+    assert "value=2" in output
+    assert "value=1" not in output
+    assert "value=3" not in output
+    assert sys.gettrace() is previous_trace
+    assert spewer_module._active_hook is None
+
+
+@requires_signals
+def test_signals_while_spewer_busy():
+    """A signal that interrupts spewer leaves the work to a thread."""
+    lock = spewer_module._installations_lock
+    toggle = install_signal_toggle(
+        SpewConfig(trace_names=[__name__], sink=MemorySink())
+    )
+    try:
+        with lock:
+            os.kill(os.getpid(), signal.SIGUSR1)
+            assert not toggle.active
+        wait_for_threads("spewer-toggle")
+        assert toggle.active
+        hook = toggle.hook
+
+        with lock:
+            os.kill(os.getpid(), signal.SIGUSR2)
+            assert spewer_module._active_hook is hook
+        wait_for_threads("spewer-toggle", "spewer-flush")
+        assert not toggle.active
+    finally:
+        toggle.uninstall()
+    assert spewer_module._active_hook is None
+
+
+@requires_signals
+def test_uninstall_restores_handlers():
+    """uninstall() turns tracing off and puts back the previous handlers."""
+    previous = signal.getsignal(signal.SIGUSR1)
+    toggle = install_signal_toggle(SpewConfig(sink=MemorySink()))
+    toggle.turn_on()
+    toggle.uninstall()
+    assert not toggle.active
+    assert spewer_module._active_hook is None
+    assert signal.getsignal(signal.SIGUSR1) is previous
@@ -0,0 +1,164 @@
+"""Tests for trigger-based activation."""
+
+import sys
+
+import pytest  # type: ignore[import-untyped]
+
+from spewer import MemorySink, SpewConfig, SpewContext
+from spewer import spewer as spewer_module
+from spewer.monitoring import AVAILABLE
+
+requires_monitoring = pytest.mark.skipif(
+    not AVAILABLE, reason="sys.monitoring requires Python 3.12+"
+)
+
+
+def leaf(value):
+    return value + 1
+
+
+def handler(value):
+    return leaf(value) * 2
+
+
+def other(value):
+    return leaf(value) - 1
+
+
+def failing_handler():
+    return leaf(None)
+
+
+def recursive_handler(levels):
+    return recursive_handler(levels - 1) if levels else leaf(levels)
+
+
+def local_tracer(seen):
+    seen.append(sys._getframe().f_trace)
+
+
+def watched_handler(seen):
+    local_tracer(seen)
+
+
+class Service:
+    def handle(self, value):
+        return leaf(value)
+
+
+def traced_lines(sink):
+    return [line for line in sink.getvalue().splitlines() if f"{__name__}:" in line]
+
+
+def test_traces_only_trigger_calls(backend):
+    """Only trigger calls and what they run are traced."""
+    sink = MemorySink()
+    with SpewContext(
+        trace_names=[__name__],
+        triggers=[f"{__name__}:handler"],
+        backend=backend,
+        sink=sink,
+    ):
+        other(1)
+        handler(1)
+        other(2)
+
+    lines = traced_lines(sink)
+    assert any("leaf(value) * 2" in line for line in lines)
+    assert sum("return value + 1" in line for line in lines) == 1
+    assert not any("leaf(value) - 1" in line for line in lines)
+
+
+def test_trigger_limit(backend):
+    """Only the first trigger_limit trigger calls fire."""
+    sink = MemorySink()
+    with SpewContext(
+        trace_names=[__name__],
+        triggers=[f"{__name__}:handler"],
+        trigger_limit=2,
+        backend=backend,
+        sink=sink,
+    ) as context:
+        for value in range(4):
+            handler(value)
+
+    assert context.hook._triggers.fired == 2
+    assert sum("leaf(value) * 2" in line for line in traced_lines(sink)) == 2
+
+
+def test_dormant_again_after_exception_and_recursion(backend):
+    """A trigger call ends when it raises, and nested trigger calls do not refire."""
+    sink = MemorySink()
+    with SpewContext(
+        trace_names=[__name__],
+        triggers=[f"{__name__}:failing_handler", f"{__name__}:recursive_handler"],
+        backend=backend,
+        sink=sink,
+    ) as context:
+        with pytest.raises(TypeError):
+            failing_handler()
+        other(1)
+        recursive_handler(2)
+        other(2)
+
+    assert context.hook._triggers.fired == 2
+    assert not context.hook._triggers.active
+    assert not any("leaf(value) - 1" in line for line in traced_lines(sink))
+
+
+def test_method_trigger():
+    """Methods are named by their qualified name."""
+    sink = MemorySink()
+    with SpewContext(
+        trace_names=[__name__], triggers=[f"{__name__}:Service.handle"], sink=sink
+    ):
+        Service().handle(1)
+        other(1)
+
+    lines = traced_lines(sink)
+    assert sum("return value + 1" in line for line in lines) == 1
+
+
+def test_dormant_frames_have_no_local_tracer():
+    """Under sys.settrace dormant frames get no line events at all."""
+    seen = []
+    with SpewContext(
+        trace_names=[__name__],
+        triggers=[f"{__name__}:watched_handler"],
+        backend="settrace",
+        sink=MemorySink(),
+    ) as context:
+        local_tracer(seen)
+        watched_handler(seen)
+
+    assert seen == [None, context.hook]
+
+
+@requires_monitoring
+def test_monitoring_switches_events():
+    """A dormant sys.monitoring hook listens to PY_START only, then to nothing."""
+    events = sys.monitoring.events
+    with SpewContext(
+        trace_names=[__name__],
+        triggers=[f"{__name__}:handler"],
+        trigger_limit=1,
+        backend="monitoring",
+        sink=MemorySink(),
+    ):
+        tool_id = spewer_module._monitoring_backend.tool_id
+        assert sys.monitoring.get_events(tool_id) == events.PY_START
+        handler(1)
+        # The limit is reached, so nothing can wake the hook again
+        assert sys.monitoring.get_events(tool_id) == 0
+
+
+def test_invalid_trigger_options():
+    """Triggers are module:qualname strings and the limit a positive integer."""
+    with pytest.raises(TypeError, match="triggers must be a list"):
+        SpewConfig(triggers="app:main")
+    with pytest.raises(ValueError, match="not of the form module:qualname"):
+        SpewConfig(triggers=["app.main"])
+    with pytest.raises(ValueError, match="trigger_limit must be at least 1"):
+        SpewConfig(triggers=["app:main"], trigger_limit=0)
+    with pytest.raises(ValueError, match="trigger_limit requires triggers"):
+        SpewConfig(trigger_limit=3)